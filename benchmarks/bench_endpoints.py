@@ -0,0 +1,347 @@
+"""
+End-to-end benchmark of the hot paths, compared against a stored baseline.
+
+Runs every case in CASES --repeat times (after --warmup) through the Flask
+test client, or in-process for the monthly rent update, and records per case:
+p50 / p95 latency, the most SQL statements in one run and peak Python memory
+(tracemalloc, one extra run so it does not slow down the timed ones).
+
+    python benchmarks/bench_endpoints.py --save            # write the baseline
+    python benchmarks/bench_endpoints.py                   # compare, exit 1 on regression
+    BENCH_DATABASE_URL=postgresql://localhost/rentana_bench python benchmarks/bench_endpoints.py
+
+Without BENCH_DATABASE_URL a scratch SQLite file is seeded with
+rentme.seed (--landlords / --tenants / --years). A BENCH_DATABASE_URL that
+already holds a `flask seed-bench` dataset is used as it is; an empty one is
+seeded first. Cases write payments and bump rent, so never point it at real
+data.
+
+A case regresses when its p95 is more than --p95-threshold above the
+baseline (and at least --p95-floor-ms slower), its peak memory more than
+--mem-threshold above, or its statement count more than --query-threshold
+above. Baselines only compare like with like: same machine class, database
+and dataset (the dataset is stored with the baseline and checked).
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import platform
+import statistics
+import tracemalloc
+from datetime import datetime
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "endpoints.json")
+XHR = {"X-Requested-With": "XMLHttpRequest"}
+
+
+def parse_args():
+    env = os.environ.get
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--repeat", type=int, default=30, help="Timed runs per case.")
+    p.add_argument("--warmup", type=int, default=3, help="Untimed runs per case first.")
+    p.add_argument("--case", action="append", help="Only these cases (by name). Default: all.")
+    p.add_argument("--baseline", default=env("BENCH_BASELINE", DEFAULT_BASELINE))
+    p.add_argument("--save", action="store_true", help="Write the results as the new baseline.")
+    p.add_argument("--p95-threshold", type=float, default=float(env("BENCH_P95_THRESHOLD", 0.25)),
+                   help="Allowed p95 increase as a fraction (0.25 = +25%%).")
+    p.add_argument("--p95-floor-ms", type=float, default=float(env("BENCH_P95_FLOOR_MS", 2.0)),
+                   help="Ignore p95 increases smaller than this (timer noise on fast cases).")
+    p.add_argument("--mem-threshold", type=float, default=float(env("BENCH_MEM_THRESHOLD", 0.25)),
+                   help="Allowed peak memory increase as a fraction.")
+    p.add_argument("--query-threshold", type=int, default=int(env("BENCH_QUERY_THRESHOLD", 0)),
+                   help="Allowed extra SQL statements per run.")
+    p.add_argument("--landlords", type=int, default=20, help="Seeding only.")
+    p.add_argument("--tenants", type=int, default=100, help="Seeding only: tenants per landlord.")
+    p.add_argument("--years", type=int, default=2, help="Seeding only.")
+    return p.parse_args()
+
+
+# ---------------------------------------------------------------------
+# App and data
+# ---------------------------------------------------------------------
+def build_app():
+    db_url = os.environ.get("BENCH_DATABASE_URL")
+    if not db_url:
+        db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ["DATABASE_URL"] = db_url
+    os.environ.setdefault("SECRET_KEY", "bench-endpoints")
+    if not os.environ.get("MASTER_ENCRYPTION_KEY"):
+        from cryptography.fernet import Fernet
+        os.environ["MASTER_ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ["AUDIT_MODE"] = "sync"
+    os.environ["TENANT_INDEX_WARM_ON_START"] = "0"
+    os.environ["PROFILING_ENABLED"] = "0"
+
+    from rentme.config import Config
+    from rentme.factory import create_app
+
+    class BenchConfig(Config):
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        RATELIMIT_ENABLED = False
+        SESSION_COOKIE_SECURE = False
+        MPESA_INGEST_MODE = "sync"
+
+    return create_app(BenchConfig)
+
+
+def ensure_seeded(args):
+    from rentme.extensions import db
+    from rentme.models import User
+    from rentme.seed import seed_bench
+
+    db.create_all()
+    if db.session.query(User.id).first() is None:
+        print(f"seeding {args.landlords} landlords x {args.tenants} tenants, {args.years} year(s)")
+        seed_bench(args.landlords, args.tenants, years=args.years, echo=print)
+
+
+def dataset():
+    from sqlalchemy import func
+    from rentme.extensions import db
+    from rentme.models import User, Tenant, Payment
+
+    return {
+        "dialect": db.engine.dialect.name,
+        "landlords": db.session.query(func.count(User.id)).scalar(),
+        "tenants": db.session.query(func.count(Tenant.id)).scalar(),
+        "payments": db.session.query(func.count(Payment.id)).scalar(),
+    }
+
+
+class Bench:
+    """The landlord the cases act as (the first one on a paybill) and a logged-in client."""
+
+    def __init__(self, app):
+        from rentme.extensions import db
+        from rentme.models import User, Tenant, LandlordSettings
+
+        settings = (LandlordSettings.query.filter(LandlordSettings.paybill_number.isnot(None))
+                    .order_by(LandlordSettings.user_id).first())
+        if settings is None:
+            sys.exit("no landlord with a paybill number in the dataset")
+        self.app = app
+        self.email = db.session.get(User, settings.user_id).email
+        self.paybill = settings.paybill_number
+        tenants = Tenant.query.filter_by(owner_id=settings.user_id).order_by(Tenant.id).all()
+        middle = tenants[len(tenants) // 2]
+        self.house_no = middle.house_no
+        self.search = middle.name.split()[0][:4]
+        self.bulk_ids = [str(t.id) for t in tenants[:20]]
+        self.tx = 0
+        self.client = None
+
+    def login(self):
+        """Outside any app context: each request must get its own, as in production."""
+        from rentme.seed import BENCH_PASSWORD
+
+        self.client = self.app.test_client()
+        resp = self.client.post("/login", data={"identifier": self.email, "password": BENCH_PASSWORD})
+        if resp.status_code != 302:
+            sys.exit(f"login as {self.email} failed ({resp.status_code}); not a seed-bench dataset?")
+
+    def next_tx(self) -> str:
+        self.tx += 1
+        return f"BENCH{os.getpid() % 10000:04d}{self.tx:06d}"
+
+
+# ---------------------------------------------------------------------
+# Cases: name -> (run(bench), prepare(bench) or None). prepare is untimed.
+# ---------------------------------------------------------------------
+def _http(method, path_fn, **kwargs):
+    def run(b):
+        path = path_fn(b) if callable(path_fn) else path_fn
+        extra = {k: v(b) if callable(v) else v for k, v in kwargs.items()}
+        resp = b.client.open(path, method=method, **extra)
+        if resp.status_code >= 400:
+            raise RuntimeError(f"{method} {path}: HTTP {resp.status_code}")
+        return resp
+    return run
+
+
+def _validation_payload(b):
+    return {"BusinessShortCode": b.paybill, "BillRefNumber": b.house_no, "TransAmount": "1000"}
+
+
+def _confirmation_payload(b):
+    return {
+        "TransID": b.next_tx(), "TransAmount": "1000", "MSISDN": "254700000000",
+        "BillRefNumber": f"{b.paybill}#{b.house_no}",
+    }
+
+
+def _monthly_rent(b):
+    from rentme.jobs import run_monthly_rent_job
+    with b.app.app_context():
+        return run_monthly_rent_job()["rows"]
+
+
+def _rewind_rent_month(b):
+    # Forget this month's run and charges so the update does its full work
+    from rentme.extensions import db
+    from rentme.models import JobLock, JobShard, RentCharge
+    from rentme.ledger import KIND_RENT, month_start, current_date
+
+    job_name = "monthly_rent_update"
+    this_month = month_start(current_date())
+    with b.app.app_context():
+        db.session.execute(db.delete(RentCharge).where(
+            RentCharge.period == this_month, RentCharge.kind == KIND_RENT,
+        ))
+        db.session.execute(db.delete(JobShard).where(JobShard.job_name == job_name))
+        db.session.execute(db.delete(JobLock).where(JobLock.job_name == job_name))
+        db.session.commit()
+
+
+CASES = {
+    "dashboard_data": (_http("GET", "/dashboard_data"), None),
+    "tenant_list_search": (_http("GET", lambda b: f"/tenants?q={b.search}", headers=XHR), None),
+    "payment_list": (_http("GET", "/payments"), None),
+    "export_tenants_csv": (_http("GET", "/export/tenants.csv"), None),
+    "export_payments_csv": (_http("GET", "/export/payments.csv"), None),
+    "mpesa_validation": (_http("POST", "/mpesa/payment_callback/validate", json=_validation_payload), None),
+    "mpesa_confirmation": (_http("POST", "/mpesa/payment_callback/confirmation", json=_confirmation_payload), None),
+    "monthly_rent_update": (_monthly_rent, _rewind_rent_month),
+    "bulk_pay": (_http("POST", "/bulk_pay", data=lambda b: {"tenant_ids": b.bulk_ids, "amount": "1000"}), None),
+}
+
+
+# ---------------------------------------------------------------------
+# Measuring
+# ---------------------------------------------------------------------
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def measure(bench, run, prepare, repeat, warmup, counter) -> dict:
+    for _ in range(warmup):
+        if prepare:
+            prepare(bench)
+        run(bench)
+
+    timings, queries = [], 0
+    for _ in range(repeat):
+        if prepare:
+            prepare(bench)
+        counter.count = 0
+        t0 = time.perf_counter()
+        run(bench)
+        timings.append((time.perf_counter() - t0) * 1000)
+        queries = max(queries, counter.count)
+
+    if prepare:
+        prepare(bench)
+    tracemalloc.start()
+    try:
+        run(bench)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 2),
+        "max_ms": round(timings[-1], 2),
+        "queries": queries,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def regressions(name, now, base, args) -> list:
+    out = []
+    p95, base_p95 = now["p95_ms"], base["p95_ms"]
+    if p95 > base_p95 * (1 + args.p95_threshold) and p95 - base_p95 >= args.p95_floor_ms:
+        out.append(f"p95 {base_p95:.1f} -> {p95:.1f} ms")
+    if now["peak_kib"] > base["peak_kib"] * (1 + args.mem_threshold):
+        out.append(f"peak memory {base['peak_kib']:.0f} -> {now['peak_kib']:.0f} KiB")
+    if now["queries"] > base["queries"] + args.query_threshold:
+        out.append(f"queries {base['queries']} -> {now['queries']}")
+    return out
+
+
+# ---------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------
+def main():
+    args = parse_args()
+    unknown = set(args.case or ()) - set(CASES)
+    if unknown:
+        sys.exit(f"unknown case(s): {', '.join(sorted(unknown))}; known: {', '.join(CASES)}")
+
+    app = build_app()
+    from sqlalchemy import event
+    from rentme import mpesa_handler
+    from rentme.extensions import db
+
+    # Receipts from the confirmation case go to scratch space, not static/
+    mpesa_handler.RECEIPT_DIR = tempfile.mkdtemp(prefix="bench-receipts-")
+
+    with app.app_context():
+        ensure_seeded(args)
+        data = dataset()
+        bench = Bench(app)
+        counter = StatementCounter()
+        event.listen(db.engine, "before_cursor_execute", counter)
+
+    bench.login()
+    results = {}
+    for name, (run, prepare) in CASES.items():
+        if args.case and name not in args.case:
+            continue
+        results[name] = measure(bench, run, prepare, args.repeat, args.warmup, counter)
+
+    baseline = None
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("dataset") != data:
+            print(f"warning: baseline dataset {baseline.get('dataset')} differs from {data}")
+
+    failures = 0
+    print(f"{'case':<22} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} {'peak KiB':>9}")
+    for name, r in results.items():
+        line = f"{name:<22} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['queries']:>8} {r['peak_kib']:>9.0f}"
+        base = (baseline or {}).get("results", {}).get(name)
+        if base:
+            problems = regressions(name, r, base, args)
+            if problems:
+                failures += 1
+                line += "  REGRESSED: " + "; ".join(problems)
+        print(line)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "repeat": args.repeat,
+                "dataset": data,
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+    elif baseline is None:
+        print(f"no baseline at {args.baseline}; run with --save to create one")
+
+    if failures:
+        sys.exit(f"{failures} case(s) regressed against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
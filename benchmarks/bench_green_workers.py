@@ -0,0 +1,211 @@
+"""
+Benchmark sync vs gevent gunicorn workers on an outbound-heavy endpoint.
+
+Starts a stub upstream that answers after --latency-ms (a slow Safaricom /
+SMS / mail API), then for each worker class runs gunicorn with
+gunicorn.conf.py and the real app plus one bench route that does what our
+outbound endpoints do: a DB query, then an HTTP call upstream. --concurrency
+client threads hit it for --duration seconds; throughput and latency are
+printed per worker class.
+
+    python benchmarks/bench_green_workers.py --latency-ms 300 --workers 2 --concurrency 50
+    BENCH_DATABASE_URL=postgresql://localhost/rentana_bench python benchmarks/bench_green_workers.py
+
+Without BENCH_DATABASE_URL a scratch SQLite file is used (not cooperative,
+so Postgres gives the fairer gevent number). Needs gunicorn and gevent.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_PATH = "/_bench/upstream"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--latency-ms", type=int, default=300, help="Upstream response delay.")
+    p.add_argument("--workers", type=int, default=2, help="Gunicorn worker processes.")
+    p.add_argument("--concurrency", type=int, default=50, help="Concurrent clients.")
+    p.add_argument("--duration", type=float, default=10.0, help="Seconds per worker class.")
+    p.add_argument("--worker-class", action="append", choices=("sync", "gevent"), help="Default: both.")
+    return p.parse_args()
+
+
+# ---------------------------------------------------------------------
+# Bench app (loaded by gunicorn: bench_green_workers:create_bench_app())
+# ---------------------------------------------------------------------
+def create_bench_app():
+    import requests
+    from sqlalchemy import text
+    from flask import jsonify
+    from rentme.factory import create_app
+    from rentme.extensions import db
+
+    app = create_app()
+    upstream = os.environ["BENCH_UPSTREAM_URL"]
+    http = requests.Session()
+    # One pooled upstream connection per in-flight greenlet
+    pool_size = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+    http.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=pool_size))
+
+    @app.route(BENCH_PATH)
+    def bench_upstream():
+        db.session.execute(text("SELECT 1"))
+        db.session.rollback()  # hand the connection back before waiting upstream
+        resp = http.get(upstream, timeout=30)
+        return jsonify({"upstream": resp.status_code})
+
+    return app
+
+
+# ---------------------------------------------------------------------
+# Stub upstream
+# ---------------------------------------------------------------------
+def start_upstream(latency_ms: int) -> str:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency_ms / 1000)
+            body = b'{"ResponseCode": "0"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, proc, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"gunicorn exited with {proc.returncode}")
+        try:
+            urllib.request.urlopen(url, timeout=5).read()
+            return
+        except Exception:
+            time.sleep(0.2)
+    sys.exit(f"gunicorn not ready after {timeout}s")
+
+
+# ---------------------------------------------------------------------
+# Load
+# ---------------------------------------------------------------------
+def run_load(url: str, concurrency: int, duration: float) -> dict:
+    deadline = time.monotonic() + duration
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def client():
+        while time.monotonic() < deadline:
+            t0 = time.perf_counter()
+            try:
+                urllib.request.urlopen(url, timeout=60).read()
+                ms = (time.perf_counter() - t0) * 1000
+                with lock:
+                    latencies.append(ms)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p95_ms": pct(0.95),
+        "max_ms": latencies[-1] if latencies else 0.0,
+    }
+
+
+def bench(worker_class: str, args, upstream: str, db_url: str) -> dict:
+    port = free_port()
+    env = dict(
+        os.environ,
+        GUNICORN_WORKER_CLASS=worker_class,
+        WEB_CONCURRENCY=str(args.workers),
+        BENCH_UPSTREAM_URL=upstream,
+        DATABASE_URL=db_url,
+        SECRET_KEY=os.environ.get("SECRET_KEY", "bench"),
+        TENANT_INDEX_WARM_ON_START="0",
+        AUDIT_MODE="sync",
+        QUERY_STATS_HEADERS="0",
+        LOG_LEVEL="WARNING",
+        PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+    )
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+            "--bind", f"127.0.0.1:{port}",
+            "--chdir", os.path.join(ROOT, "benchmarks"),
+            "bench_green_workers:create_bench_app()",
+        ],
+        cwd=ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{port}{BENCH_PATH}"
+    try:
+        wait_ready(url, proc)
+        return run_load(url, args.concurrency, args.duration)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    args = parse_args()
+    upstream = start_upstream(args.latency_ms)
+
+    db_url = os.environ.get("BENCH_DATABASE_URL")
+    if not db_url:
+        db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    results = {}
+    for worker_class in args.worker_class or ("sync", "gevent"):
+        results[worker_class] = r = bench(worker_class, args, upstream, db_url)
+        print(
+            f"{worker_class:>6}: {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.0f} ms  "
+            f"p95 {r['p95_ms']:7.0f} ms  max {r['max_ms']:7.0f} ms  "
+            f"({r['requests']} ok, {r['errors']} errors)"
+        )
+
+    print(json.dumps({
+        "latency_ms": args.latency_ms, "workers": args.workers,
+        "concurrency": args.concurrency, "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark the monthly rent update.
+
+Seeds a scratch database with N tenants spread over M landlords, then times
+`run_monthly_rent_job()` (rentme/jobs.py) posting this month's rent charges
+and rebuilding the aging rollup, shard by shard.
+
+    BENCH_DATABASE_URL=postgresql://localhost/rentana_bench \
+        python benchmarks/bench_monthly_rent.py --tenants 1000000 --owners 10000
+
+The target database is dropped and recreated. Never point it at real data.
+"""
+
+import os
+import sys
+import time
+import random
+import resource
+import argparse
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--tenants", type=int, default=1_000_000)
+    p.add_argument("--owners", type=int, default=10_000)
+    p.add_argument("--owners-per-chunk", type=int, default=500)
+    p.add_argument("--batch", type=int, default=10_000, help="rows per seed INSERT")
+    p.add_argument("--seed", type=int, default=42)
+    return p.parse_args()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def seed(db, User, Tenant, n_tenants, n_owners, batch, rng):
+    db.drop_all()
+    db.create_all()
+
+    now = datetime.utcnow()
+    db.session.execute(db.insert(User), [
+        {"email": f"bench-{i}@example.com", "password_hash": "x", "created_at": now}
+        for i in range(n_owners)
+    ])
+    db.session.commit()
+    owner_ids = [r[0] for r in db.session.query(User.id).all()]
+
+    for start in range(0, n_tenants, batch):
+        rows = []
+        for i in range(start, min(start + batch, n_tenants)):
+            rows.append({
+                "owner_id": owner_ids[i % len(owner_ids)],
+                "name": f"Tenant {i}",
+                "phone": f"07{i:08d}",
+                "house_no": f"H{i}",
+                "monthly_rent": float(rng.choice((5000, 8000, 12000, 15000))),
+                "move_in_date": date(2024, 1, 1),
+                "created_at": now,
+            })
+        db.session.execute(db.insert(Tenant), rows)
+        db.session.commit()
+
+
+def main():
+    args = parse_args()
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if not url:
+        sys.exit("Set BENCH_DATABASE_URL to a scratch database (it is dropped and recreated).")
+
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("TENANT_INDEX_WARM_ON_START", "0")
+    os.environ["RENT_UPDATE_OWNERS_PER_CHUNK"] = str(args.owners_per_chunk)
+
+    from rentme.factory import create_app
+    from rentme.extensions import db
+    from rentme.models import User, Tenant
+    from rentme.jobs import run_monthly_rent_job
+
+    app = create_app(web=False)
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        t0 = time.perf_counter()
+        seed(db, User, Tenant, args.tenants, args.owners, args.batch, rng)
+        print(f"seeded {args.tenants:,} tenants / {args.owners:,} owners in {time.perf_counter() - t0:.1f}s")
+
+        t0 = time.perf_counter()
+        result = run_monthly_rent_job()
+        elapsed = time.perf_counter() - t0
+        posted = result["rows"]
+        print(
+            f"sharded: {posted:,} rent charges in {result['shards']} shards, {elapsed:.2f}s "
+            f"({posted / elapsed:,.0f}/s), peak RSS {peak_rss_mb():.0f} MB"
+        )
+
+        again = run_monthly_rent_job()
+        print(f"re-run same month: skipped={again.get('skipped', False)} (expected True)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Cold-start import budget.
+
+Imports the web entry point (rentme.app, which builds the app) and the
+worker's factory path in a fresh interpreter under `python -X importtime`,
+prints the slowest modules and exits 1 when the total goes over budget.
+
+    python benchmarks/check_importtime.py --budget-ms 1500
+    IMPORT_BUDGET_MS=1500 python benchmarks/check_importtime.py --top 25
+
+Timings are cumulative import time in microseconds as reported by CPython,
+so a regression shows up as the top-level module that got slower. Run it a
+couple of times: the first run after a checkout also pays for .pyc writes.
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "web": "import rentme.app",
+    "worker": "from rentme.factory import create_app; create_app(web=False)",
+}
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", 2000)))
+    p.add_argument("--target", choices=sorted(TARGETS), action="append", help="Default: all.")
+    p.add_argument("--top", type=int, default=15, help="Slowest modules to print.")
+    return p.parse_args()
+
+
+def measure(code: str):
+    """[(module, self_us, cumulative_us, depth)] for one cold interpreter."""
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "importtime-check")
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env.setdefault("TENANT_INDEX_WARM_ON_START", "0")
+    if not env.get("MASTER_ENCRYPTION_KEY"):
+        from cryptography.fernet import Fernet
+        env["MASTER_ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+
+def main():
+    args = parse_args()
+    failed = False
+
+    for name in args.target or sorted(TARGETS):
+        rows = measure(TARGETS[name])
+        # Depth-0 entries are what the target imported directly; their sum is the cold start
+        total_ms = sum(cum for _, _, cum, depth in rows if depth == 0) / 1000
+
+        print(f"\n{name}: {total_ms:.0f} ms in imports ({len(rows)} modules, budget {args.budget_ms:.0f} ms)")
+        for module, self_us, cum_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+            print(f"  {cum_us / 1000:8.1f} ms  {self_us / 1000:7.1f} ms self  {module}")
+
+        if total_ms > args.budget_ms:
+            print(f"❌ {name} import time {total_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
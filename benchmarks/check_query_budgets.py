@@ -0,0 +1,242 @@
+"""
+N+1 guard: SQL statement budgets per endpoint.
+
+Seeds a scratch database with two landlords, one with --small tenants and one
+with --large tenants (each with rent charges and --payments payments), logs
+in as each through the Flask test client and calls every endpoint in
+ENDPOINTS. An endpoint fails when either landlord's request runs more
+statements than its budget, or when the large landlord's request runs more
+than the small one's: the count must not grow with the number of rows. The
+offending statements are printed (repeated ones first) and the exit code is 1.
+
+    python benchmarks/check_query_budgets.py
+    python benchmarks/check_query_budgets.py --large 200 --show 40
+    BENCH_DATABASE_URL=postgresql://localhost/rentana_bench python benchmarks/check_query_budgets.py
+
+Budgets include the audit insert (AUDIT_MODE=sync); the session user comes
+from the identity cache (rentme/identity.py) after login.
+When an endpoint legitimately needs another query, raise its budget here in
+the same change. The target database is dropped and recreated.
+"""
+
+import os
+import re
+import sys
+import argparse
+import tempfile
+from collections import Counter
+from datetime import date, datetime
+
+from dateutil.relativedelta import relativedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CSRF_INPUT = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+PASSWORD = "budget-check"
+
+# (name, method, path, form builder or None, max statements). Mutating
+# endpoints come last; their forms get the landlord's tenant ids.
+ENDPOINTS = [
+    ("dashboard", "GET", "/", None, 1),
+    ("dashboard_data", "GET", "/dashboard_data", None, 5),
+    ("tenant_list", "GET", "/tenants", None, 5),
+    ("tenant_rows", "XHR", "/tenants?page=1", None, 5),
+    ("payment_list", "GET", "/payments", None, 2),
+    ("export_tenants_csv", "GET", "/export/tenants.csv", None, 5),
+    ("export_payments_csv", "GET", "/export/payments.csv", None, 2),
+    ("report_aging", "GET", "/reports/aging", None, 6),
+    ("bulk_pay", "POST", "/bulk_pay", lambda ids: {"tenant_ids": ids, "amount": "1000"}, 8),
+    ("tenant_bulk_delete", "POST", "/tenants/bulk-delete", lambda ids: {"tenant_ids": ids}, 9),
+]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--small", type=int, default=5, help="Tenants of the small landlord.")
+    p.add_argument("--large", type=int, default=60, help="Tenants of the large landlord.")
+    p.add_argument("--payments", type=int, default=3, help="Payments per tenant.")
+    p.add_argument("--show", type=int, default=25, help="Statements to print per failure.")
+    p.add_argument("--endpoint", action="append", help="Only these (by name). Default: all.")
+    return p.parse_args()
+
+
+# ---------------------------------------------------------------------
+# App and data
+# ---------------------------------------------------------------------
+def build_app():
+    db_url = os.environ.get("BENCH_DATABASE_URL")
+    if not db_url:
+        db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'budgets.db')}"
+    os.environ["DATABASE_URL"] = db_url
+    os.environ.setdefault("SECRET_KEY", "query-budgets")
+    if not os.environ.get("MASTER_ENCRYPTION_KEY"):
+        from cryptography.fernet import Fernet
+        os.environ["MASTER_ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["AUDIT_MODE"] = "sync"
+    os.environ["TENANT_INDEX_WARM_ON_START"] = "0"
+    os.environ["PROFILING_ENABLED"] = "0"
+
+    from rentme.config import Config
+    from rentme.factory import create_app
+
+    class BudgetConfig(Config):
+        TESTING = True
+        RATELIMIT_ENABLED = False
+        SESSION_COOKIE_SECURE = False
+
+    return create_app(BudgetConfig)
+
+
+def seed(app, sizes, payments_per_tenant):
+    """One landlord per size; returns [(email, [tenant ids])]."""
+    from rentme.extensions import db
+    from rentme.models import User, Tenant, Payment
+    from rentme.ledger import generate_rent_charges
+    from rentme.aging import rebuild_owner_range
+
+    db.drop_all()
+    db.create_all()
+
+    move_in = date.today().replace(day=1) - relativedelta(months=3)
+    now = datetime.utcnow()
+    landlords = []
+    for n, size in enumerate(sizes):
+        user = User(email=f"budget-{n}@example.com")
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.flush()
+        db.session.execute(db.insert(Tenant), [
+            {
+                "owner_id": user.id, "name": f"Tenant {n}-{i}", "phone": f"07{n}{i:07d}",
+                "house_no": f"H{n}-{i}", "monthly_rent": 10000.0, "move_in_date": move_in,
+                "created_at": now,
+            }
+            for i in range(size)
+        ])
+        ids = [t for (t,) in db.session.query(Tenant.id).filter_by(owner_id=user.id).order_by(Tenant.id)]
+        db.session.execute(db.insert(Payment), [
+            {
+                "tenant_id": tid, "amount": 9000.0, "note": "seed", "created_at": now,
+                "paid_at": datetime.combine(move_in + relativedelta(months=k), datetime.min.time()),
+                "transaction_id": f"SEED{n}-{tid}-{k}",
+            }
+            for tid in ids for k in range(payments_per_tenant)
+        ])
+        landlords.append((user.email, [str(t) for t in ids]))
+
+    generate_rent_charges()
+    rebuild_owner_range(0, 2**31 - 1)
+    db.session.commit()
+    return landlords
+
+
+# ---------------------------------------------------------------------
+# Statement capture
+# ---------------------------------------------------------------------
+class Recorder:
+    def __init__(self):
+        self.statements = None
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.statements is not None:
+            self.statements.append(statement)
+
+    def run(self, fn):
+        self.statements = []
+        try:
+            response = fn()
+        finally:
+            captured, self.statements = self.statements, None
+        return response, captured
+
+
+def csrf_token(client, path):
+    m = CSRF_INPUT.search(client.get(path).get_data(as_text=True))
+    if not m:
+        sys.exit(f"no csrf_token on {path}")
+    return m.group(1)
+
+
+def login(client, email):
+    token = csrf_token(client, "/login")
+    resp = client.post("/login", data={"identifier": email, "password": PASSWORD, "csrf_token": token})
+    if resp.status_code != 302:
+        sys.exit(f"login failed for {email} ({resp.status_code})")
+
+
+def call(client, method, path, form, token):
+    if method == "XHR":
+        return client.get(path, headers={"X-Requested-With": "XMLHttpRequest"})
+    if method == "POST":
+        return client.post(path, data=dict(form, csrf_token=token))
+    return client.get(path)
+
+
+def describe(statements, limit):
+    """Repeated statements first (the usual N+1 signature), then the rest in order."""
+    lines = []
+    for sql, n in Counter(statements).most_common():
+        if n > 1:
+            lines.append(f"    {n:4d}x {' '.join(sql.split())[:200]}")
+    for sql in statements:
+        if statements.count(sql) == 1:
+            lines.append(f"       1x {' '.join(sql.split())[:200]}")
+    if len(lines) > limit:
+        lines = lines[:limit] + [f"    ... {len(lines) - limit} more"]
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------
+def main():
+    args = parse_args()
+    if args.large <= args.small:
+        sys.exit("--large must be bigger than --small")
+
+    app = build_app()
+    from sqlalchemy import event
+    from rentme.extensions import db
+
+    with app.app_context():
+        landlords = seed(app, (args.small, args.large), args.payments)
+        recorder = Recorder()
+        event.listen(db.engine, "before_cursor_execute", recorder)
+
+    endpoints = [e for e in ENDPOINTS if not args.endpoint or e[0] in args.endpoint]
+    counts = {}
+    for email, tenant_ids in landlords:
+        client = app.test_client()
+        login(client, email)
+        token = csrf_token(client, "/tenant/add")
+        for name, method, path, build_form, _ in endpoints:
+            form = build_form(tenant_ids) if build_form else None
+            resp, statements = recorder.run(lambda: call(client, method, path, form, token))
+            if resp.status_code >= 400:
+                sys.exit(f"{name}: HTTP {resp.status_code} for {email}")
+            counts.setdefault(name, []).append(statements)
+
+    failures = 0
+    print(f"{'endpoint':<22} {'budget':>6} {'small':>6} {'large':>6}")
+    for name, _, _, _, budget in endpoints:
+        small, large = counts[name]
+        problems = []
+        if len(large) > budget or len(small) > budget:
+            problems.append(f"over budget ({budget})")
+        if len(large) > len(small):
+            problems.append(f"grows with rows ({args.small} -> {args.large} tenants)")
+        flag = "  FAIL: " + ", ".join(problems) if problems else ""
+        print(f"{name:<22} {budget:>6} {len(small):>6} {len(large):>6}{flag}")
+        if problems:
+            failures += 1
+            print(describe(large, args.show))
+
+    if failures:
+        sys.exit(f"{failures} endpoint(s) over their query budget")
+    print("all endpoints within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Gunicorn settings (`gunicorn -c gunicorn.conf.py app:app`).
+
+GUNICORN_WORKER_CLASS=sync    one request per worker process (default)
+GUNICORN_WORKER_CLASS=gevent  green threads: a worker keeps serving while
+                              requests wait on Safaricom / SMS / mail APIs.
+                              rentme.factory makes psycopg2 cooperative and
+                              raises the DB pool defaults (rentme/green.py).
+
+See benchmarks/bench_green_workers.py for sync vs gevent under upstream latency.
+
+Prometheus runs in multiprocess mode: every worker writes its samples to
+PROMETHEUS_MULTIPROC_DIR and /metrics (rentme/metrics.py) merges them. The
+directory is wiped when the master starts; dead workers' gauges are dropped.
+"""
+
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+if worker_class == "gevent":
+    # Concurrent requests per worker. Those needing the database beyond
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW wait up to DB_POOL_TIMEOUT for a connection.
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+
+# Must be set before any worker imports prometheus_client
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "rentana-prometheus"))
+
+
+def on_starting(server):
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
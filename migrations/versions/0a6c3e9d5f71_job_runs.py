@@ -0,0 +1,45 @@
+"""job runs history
+
+Revision ID: 0a6c3e9d5f71
+Revises: f4a07b2c8e19
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6c3e9d5f71'
+down_revision = 'f4a07b2c8e19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # apscheduler_jobs is created by APScheduler's SQLAlchemyJobStore on first start
+    op.create_table('job_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_name', sa.String(length=100), nullable=False),
+    sa.Column('scheduled_for', sa.DateTime(), nullable=True),
+    sa.Column('holder', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=True),
+    sa.Column('error', sa.String(length=500), nullable=True),
+    sa.Column('catch_up', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('duration_ms', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.create_index('ix_job_runs_job_started', ['job_name', 'started_at'], unique=False)
+        batch_op.create_index('ix_job_runs_job_scheduled', ['job_name', 'scheduled_for'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_runs_job_scheduled')
+        batch_op.drop_index('ix_job_runs_job_started')
+
+    op.drop_table('job_runs')
@@ -0,0 +1,37 @@
+"""penalty rules
+
+Revision ID: 2b8d4f6a0c13
+Revises: 0a6c3e9d5f71
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8d4f6a0c13'
+down_revision = '0a6c3e9d5f71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('penalty_rule',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('enabled', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('grace_days', sa.Integer(), nullable=False),
+    sa.Column('fixed_amount', sa.Float(), nullable=False),
+    sa.Column('percent', sa.Float(), nullable=False),
+    sa.Column('max_amount', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('penalty_rule')
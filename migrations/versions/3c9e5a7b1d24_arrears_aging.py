@@ -0,0 +1,66 @@
+"""arrears aging rollups
+
+Revision ID: 3c9e5a7b1d24
+Revises: 2b8d4f6a0c13
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e5a7b1d24'
+down_revision = '2b8d4f6a0c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Empty until the next monthly job or `flask rebuild-aging`
+    op.create_table('tenant_aging',
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('days_0_30', sa.Float(), nullable=False),
+    sa.Column('days_31_60', sa.Float(), nullable=False),
+    sa.Column('days_61_90', sa.Float(), nullable=False),
+    sa.Column('days_90_plus', sa.Float(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('as_of', sa.Date(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('tenant_id')
+    )
+    with op.batch_alter_table('tenant_aging', schema=None) as batch_op:
+        batch_op.create_index('ix_tenant_aging_owner_total', ['owner_id', 'total'], unique=False)
+        batch_op.create_index('ix_tenant_aging_owner_0_30', ['owner_id', 'days_0_30'], unique=False)
+        batch_op.create_index('ix_tenant_aging_owner_31_60', ['owner_id', 'days_31_60'], unique=False)
+        batch_op.create_index('ix_tenant_aging_owner_61_90', ['owner_id', 'days_61_90'], unique=False)
+        batch_op.create_index('ix_tenant_aging_owner_90_plus', ['owner_id', 'days_90_plus'], unique=False)
+
+    op.create_table('arrears_aging',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('tenants', sa.Integer(), nullable=False),
+    sa.Column('days_0_30', sa.Float(), nullable=False),
+    sa.Column('days_31_60', sa.Float(), nullable=False),
+    sa.Column('days_61_90', sa.Float(), nullable=False),
+    sa.Column('days_90_plus', sa.Float(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('as_of', sa.Date(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('owner_id')
+    )
+
+
+def downgrade():
+    op.drop_table('arrears_aging')
+    with op.batch_alter_table('tenant_aging', schema=None) as batch_op:
+        batch_op.drop_index('ix_tenant_aging_owner_90_plus')
+        batch_op.drop_index('ix_tenant_aging_owner_61_90')
+        batch_op.drop_index('ix_tenant_aging_owner_31_60')
+        batch_op.drop_index('ix_tenant_aging_owner_0_30')
+        batch_op.drop_index('ix_tenant_aging_owner_total')
+
+    op.drop_table('tenant_aging')
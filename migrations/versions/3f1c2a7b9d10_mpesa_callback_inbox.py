@@ -0,0 +1,43 @@
+"""mpesa callback inbox
+
+Revision ID: 3f1c2a7b9d10
+Revises: 0d24769609bd
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7b9d10'
+down_revision = '0d24769609bd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('mpesa_callback',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('tx_id', sa.String(length=100), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('mpesa_callback', schema=None) as batch_op:
+        batch_op.create_index('ix_mpesa_callback_status_id', ['status', 'id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_mpesa_callback_tx_id'), ['tx_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('mpesa_callback', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_mpesa_callback_tx_id'))
+        batch_op.drop_index('ix_mpesa_callback_status_id')
+
+    op.drop_table('mpesa_callback')
@@ -0,0 +1,40 @@
+"""collections rollup and payment.paid_at BRIN index
+
+Revision ID: 4d0f6b8c2e35
+Revises: 3c9e5a7b1d24
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d0f6b8c2e35'
+down_revision = '3c9e5a7b1d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by the nightly job or `flask rebuild-collections`
+    op.create_table('collection_month',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('collected', sa.Float(), nullable=False),
+    sa.Column('expected', sa.Float(), nullable=False),
+    sa.Column('tenants_charged', sa.Integer(), nullable=False),
+    sa.Column('tenants_paid', sa.Integer(), nullable=False),
+    sa.Column('median_days_late', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('owner_id', 'period')
+    )
+
+    # BRIN on Postgres; a plain index elsewhere
+    op.create_index('ix_payment_paid_at_brin', 'payment', ['paid_at'], unique=False, postgresql_using='brin')
+
+
+def downgrade():
+    op.drop_index('ix_payment_paid_at_brin', table_name='payment')
+    op.drop_table('collection_month')
@@ -0,0 +1,135 @@
+"""partition payment by month on paid_at
+
+Revision ID: 5e1a7c9d3f46
+Revises: 4d0f6b8c2e35
+Create Date: 2026-10-19 20:00:00.000000
+
+Postgres only (SQLite keeps the plain table). The table is rebuilt as
+monthly range partitions on paid_at, one per month from the oldest payment
+to PARTITION_MONTHS_AHEAD (3) months ahead, plus a default partition. Rows
+are copied inside the migration's transaction, so payments are locked for
+the duration of the copy; run it in a quiet window.
+
+A unique constraint on a partitioned table must include the partition key,
+so transaction_id uniqueness moves to `payment_txn` (transaction_id primary
+key), maintained by a row trigger on payment for every insert path,
+including the raw SQL in mpesa_handler. A duplicate transaction_id still
+fails the INSERT with a unique violation.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1a7c9d3f46'
+down_revision = '4d0f6b8c2e35'
+branch_labels = None
+depends_on = None
+
+
+MONTHS_AHEAD = 3
+
+INDEXES = (
+    "CREATE INDEX ix_payment_tenant_id ON payment (tenant_id)",
+    "CREATE INDEX ix_payment_checkout_request_id ON payment (checkout_request_id)",
+    "CREATE INDEX ix_payment_tenant_paid_at ON payment (tenant_id, paid_at)",
+    "CREATE INDEX ix_payment_paid_at_brin ON payment USING brin (paid_at)",
+)
+
+SYNC_FUNCTION = """
+CREATE FUNCTION payment_txn_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM payment_txn WHERE transaction_id = OLD.transaction_id AND payment_id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO payment_txn (transaction_id, payment_id, paid_at)
+        VALUES (NEW.transaction_id, NEW.id, NEW.paid_at);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def _next_month(d):
+    return date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    first = bind.execute(sa.text("SELECT min(paid_at) FROM payment")).scalar()
+    today = date.today().replace(day=1)
+    period = first.date().replace(day=1) if first else today
+    last = today
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+
+    op.execute(
+        "CREATE TABLE payment_new (LIKE payment INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (paid_at)"
+    )
+    op.execute("ALTER TABLE payment_new ADD CONSTRAINT payment_new_pkey PRIMARY KEY (id, paid_at)")
+    op.execute("ALTER TABLE payment_new ADD FOREIGN KEY (tenant_id) REFERENCES tenant (id)")
+    op.execute('ALTER TABLE payment_new ADD FOREIGN KEY (user_id) REFERENCES "user" (id)')
+
+    while period <= last:
+        op.execute(
+            f"CREATE TABLE payment_{period:%Y_%m} PARTITION OF payment_new "
+            f"FOR VALUES FROM ('{period.isoformat()}') TO ('{_next_month(period).isoformat()}')"
+        )
+        period = _next_month(period)
+    op.execute("CREATE TABLE payment_default PARTITION OF payment_new DEFAULT")
+
+    op.execute("INSERT INTO payment_new SELECT * FROM payment")
+
+    op.create_table('payment_txn',
+    sa.Column('transaction_id', sa.String(length=100), nullable=False),
+    sa.Column('payment_id', sa.Integer(), nullable=False),
+    sa.Column('paid_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('transaction_id')
+    )
+    op.execute("INSERT INTO payment_txn (transaction_id, payment_id, paid_at) SELECT transaction_id, id, paid_at FROM payment")
+
+    # The id sequence is owned by the old table; move it before dropping
+    op.execute("ALTER SEQUENCE payment_id_seq OWNED BY payment_new.id")
+    op.execute("DROP TABLE payment")
+    op.execute("ALTER TABLE payment_new RENAME TO payment")
+    op.execute("ALTER TABLE payment RENAME CONSTRAINT payment_new_pkey TO payment_pkey")
+
+    for stmt in INDEXES:
+        op.execute(stmt)
+    # Lookups by transaction id (not unique per partition; payment_txn is)
+    op.execute("CREATE INDEX ix_payment_transaction_id ON payment (transaction_id)")
+
+    op.execute(SYNC_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER payment_txn_sync AFTER INSERT OR UPDATE OR DELETE ON payment "
+        "FOR EACH ROW EXECUTE FUNCTION payment_txn_sync()"
+    )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE TABLE payment_plain (LIKE payment INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO payment_plain SELECT * FROM payment")
+    op.execute("ALTER SEQUENCE payment_id_seq OWNED BY payment_plain.id")
+    op.execute("DROP TABLE payment")  # drops every partition and the trigger
+    op.execute("DROP FUNCTION payment_txn_sync()")
+    op.drop_table('payment_txn')
+
+    op.execute("ALTER TABLE payment_plain RENAME TO payment")
+    op.execute("ALTER TABLE payment ADD CONSTRAINT payment_pkey PRIMARY KEY (id)")
+    op.execute("ALTER TABLE payment ADD CONSTRAINT payment_transaction_id_key UNIQUE (transaction_id)")
+    op.execute("ALTER TABLE payment ADD FOREIGN KEY (tenant_id) REFERENCES tenant (id)")
+    op.execute('ALTER TABLE payment ADD FOREIGN KEY (user_id) REFERENCES "user" (id)')
+    for stmt in INDEXES:
+        op.execute(stmt)
@@ -0,0 +1,96 @@
+"""partition audit_log by month on created_at
+
+Revision ID: 6f2b8d0e4a57
+Revises: 5e1a7c9d3f46
+Create Date: 2026-10-19 21:00:00.000000
+
+On Postgres audit_log is rebuilt as monthly range partitions on created_at
+(oldest event to 3 months ahead, plus a default partition) with primary key
+(id, created_at); rentme/partitions.py creates later months. Elsewhere only
+the indexes are added.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2b8d0e4a57'
+down_revision = '5e1a7c9d3f46'
+branch_labels = None
+depends_on = None
+
+
+MONTHS_AHEAD = 3
+
+INDEXES = (
+    "CREATE INDEX ix_audit_log_user_created ON audit_log (user_id, created_at)",
+    "CREATE INDEX ix_audit_log_created ON audit_log (created_at)",
+)
+
+
+def _next_month(d):
+    return date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+
+
+def upgrade():
+    op.execute("UPDATE audit_log SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        with op.batch_alter_table('audit_log', schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+            batch_op.create_index('ix_audit_log_user_created', ['user_id', 'created_at'], unique=False)
+            batch_op.create_index('ix_audit_log_created', ['created_at'], unique=False)
+        return
+
+    first = bind.execute(sa.text("SELECT min(created_at) FROM audit_log")).scalar()
+    today = date.today().replace(day=1)
+    period = first.date().replace(day=1) if first else today
+    last = today
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+
+    op.execute(
+        "CREATE TABLE audit_log_new (LIKE audit_log INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER TABLE audit_log_new ALTER COLUMN created_at SET NOT NULL")
+    op.execute("ALTER TABLE audit_log_new ADD CONSTRAINT audit_log_new_pkey PRIMARY KEY (id, created_at)")
+    op.execute('ALTER TABLE audit_log_new ADD FOREIGN KEY (user_id) REFERENCES "user" (id)')
+
+    while period <= last:
+        op.execute(
+            f"CREATE TABLE audit_log_{period:%Y_%m} PARTITION OF audit_log_new "
+            f"FOR VALUES FROM ('{period.isoformat()}') TO ('{_next_month(period).isoformat()}')"
+        )
+        period = _next_month(period)
+    op.execute("CREATE TABLE audit_log_default PARTITION OF audit_log_new DEFAULT")
+
+    op.execute("INSERT INTO audit_log_new SELECT * FROM audit_log")
+    op.execute("ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log_new.id")
+    op.execute("DROP TABLE audit_log")
+    op.execute("ALTER TABLE audit_log_new RENAME TO audit_log")
+    op.execute("ALTER TABLE audit_log RENAME CONSTRAINT audit_log_new_pkey TO audit_log_pkey")
+    for stmt in INDEXES:
+        op.execute(stmt)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        with op.batch_alter_table('audit_log', schema=None) as batch_op:
+            batch_op.drop_index('ix_audit_log_created')
+            batch_op.drop_index('ix_audit_log_user_created')
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+        return
+
+    op.execute("CREATE TABLE audit_log_plain (LIKE audit_log INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO audit_log_plain SELECT * FROM audit_log")
+    op.execute("ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log_plain.id")
+    op.execute("DROP TABLE audit_log")
+    op.execute("ALTER TABLE audit_log_plain RENAME TO audit_log")
+    op.execute("ALTER TABLE audit_log ALTER COLUMN created_at DROP NOT NULL")
+    op.execute("ALTER TABLE audit_log ADD CONSTRAINT audit_log_pkey PRIMARY KEY (id)")
+    op.execute('ALTER TABLE audit_log ADD FOREIGN KEY (user_id) REFERENCES "user" (id)')
@@ -0,0 +1,43 @@
+"""mpesa callback inbox: retry backoff, one row per TransID
+
+Revision ID: 7b3d9e1f5a68
+Revises: 6f2b8d0e4a57
+Create Date: 2026-10-20 09:00:00.000000
+
+Duplicate TransIDs already in the inbox (Daraja retries) keep their oldest row.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3d9e1f5a68'
+down_revision = '6f2b8d0e4a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM mpesa_callback WHERE tx_id IS NOT NULL AND id NOT IN "
+        "(SELECT min_id FROM (SELECT min(id) AS min_id FROM mpesa_callback "
+        "WHERE tx_id IS NOT NULL GROUP BY tx_id) AS keep)"
+    )
+    with op.batch_alter_table('mpesa_callback', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE mpesa_callback SET next_attempt_at = received_at")
+    with op.batch_alter_table('mpesa_callback', schema=None) as batch_op:
+        batch_op.alter_column('next_attempt_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.drop_index('ix_mpesa_callback_status_id')
+        batch_op.create_index('ix_mpesa_callback_status_due', ['status', 'next_attempt_at'], unique=False)
+        batch_op.drop_index(batch_op.f('ix_mpesa_callback_tx_id'))
+        batch_op.create_index(batch_op.f('ix_mpesa_callback_tx_id'), ['tx_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('mpesa_callback', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_mpesa_callback_tx_id'))
+        batch_op.create_index(batch_op.f('ix_mpesa_callback_tx_id'), ['tx_id'], unique=False)
+        batch_op.drop_index('ix_mpesa_callback_status_due')
+        batch_op.create_index('ix_mpesa_callback_status_id', ['status', 'id'], unique=False)
+        batch_op.drop_column('next_attempt_at')
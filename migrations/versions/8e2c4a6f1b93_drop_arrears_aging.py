@@ -0,0 +1,42 @@
+"""drop arrears_aging: landlord aging sums are added up from tenant_aging
+
+Revision ID: 8e2c4a6f1b93
+Revises: 7b3d9e1f5a68
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2c4a6f1b93'
+down_revision = '7b3d9e1f5a68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_table('arrears_aging')
+
+
+def downgrade():
+    op.create_table('arrears_aging',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('tenants', sa.Integer(), nullable=False),
+    sa.Column('days_0_30', sa.Float(), nullable=False),
+    sa.Column('days_31_60', sa.Float(), nullable=False),
+    sa.Column('days_61_90', sa.Float(), nullable=False),
+    sa.Column('days_90_plus', sa.Float(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('as_of', sa.Date(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('owner_id')
+    )
+    op.execute(
+        "INSERT INTO arrears_aging (owner_id, tenants, days_0_30, days_31_60, days_61_90, days_90_plus, "
+        "total, as_of, updated_at) "
+        "SELECT owner_id, count(*), sum(days_0_30), sum(days_31_60), sum(days_61_90), sum(days_90_plus), "
+        "sum(total), min(as_of), max(updated_at) FROM tenant_aging GROUP BY owner_id"
+    )
@@ -0,0 +1,37 @@
+"""drop tenant.amount_due / last_rent_update: balances come from the rent_charge ledger
+
+Revision ID: 9a1d5c3e7f20
+Revises: 8e2c4a6f1b93
+Create Date: 2026-10-21 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a1d5c3e7f20'
+down_revision = '8e2c4a6f1b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tenant', schema=None) as batch_op:
+        batch_op.drop_column('amount_due')
+        batch_op.drop_column('last_rent_update')
+
+
+def downgrade():
+    with op.batch_alter_table('tenant', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_rent_update', sa.Date(), nullable=False,
+                                      server_default=sa.text('CURRENT_DATE')))
+        batch_op.add_column(sa.Column('amount_due', sa.Float(), nullable=False, server_default='0'))
+
+    # Arrears as the ledger sees them
+    op.execute(
+        "UPDATE tenant SET amount_due = "
+        "COALESCE((SELECT sum(amount) FROM rent_charge WHERE rent_charge.tenant_id = tenant.id), 0) - "
+        "COALESCE((SELECT sum(amount) FROM payment WHERE payment.tenant_id = tenant.id), 0)"
+    )
+    op.execute("UPDATE tenant SET amount_due = 0 WHERE amount_due < 0")
@@ -0,0 +1,56 @@
+"""arrears reminder campaigns
+
+Revision ID: b5d91e3f7a20
+Revises: 8a4e6d2c1b37
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d91e3f7a20'
+down_revision = '8a4e6d2c1b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reminder_campaign',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=30), nullable=False),
+    sa.Column('period', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('cursor', sa.Integer(), nullable=False),
+    sa.Column('selected', sa.Integer(), nullable=False),
+    sa.Column('queued', sa.Integer(), nullable=False),
+    sa.Column('deferred', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'period', name='uq_reminder_campaign_kind_period')
+    )
+
+    with op.batch_alter_table('landlord_settings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('arrears_reminders_enabled', sa.Boolean(), server_default=sa.false(), nullable=False))
+        batch_op.add_column(sa.Column('reminder_quiet_start', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('reminder_quiet_end', sa.Integer(), nullable=True))
+
+    # Per-tenant SUM(amount) used by balance queries
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.create_index('ix_payment_tenant_id', ['tenant_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_tenant_id')
+
+    with op.batch_alter_table('landlord_settings', schema=None) as batch_op:
+        batch_op.drop_column('reminder_quiet_end')
+        batch_op.drop_column('reminder_quiet_start')
+        batch_op.drop_column('arrears_reminders_enabled')
+
+    op.drop_table('reminder_campaign')
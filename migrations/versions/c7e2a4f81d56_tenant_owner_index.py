@@ -0,0 +1,25 @@
+"""tenant owner_id index for set-based rent updates
+
+Revision ID: c7e2a4f81d56
+Revises: b5d91e3f7a20
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a4f81d56'
+down_revision = 'b5d91e3f7a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tenant', schema=None) as batch_op:
+        batch_op.create_index('ix_tenant_owner_id', ['owner_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tenant', schema=None) as batch_op:
+        batch_op.drop_index('ix_tenant_owner_id')
@@ -0,0 +1,55 @@
+"""job leases and shards
+
+Revision ID: d3f8b61a9c42
+Revises: c7e2a4f81d56
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f8b61a9c42'
+down_revision = 'c7e2a4f81d56'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('job_locks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('holder', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('lease_until', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+    op.create_table('job_shards',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_name', sa.String(length=100), nullable=False),
+    sa.Column('run_key', sa.String(length=20), nullable=False),
+    sa.Column('shard_no', sa.Integer(), nullable=False),
+    sa.Column('range_lo', sa.Integer(), nullable=False),
+    sa.Column('range_hi', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('holder', sa.String(length=100), nullable=True),
+    sa.Column('lease_until', sa.DateTime(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('rows_affected', sa.Integer(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('job_name', 'run_key', 'shard_no', name='uq_job_shards_run_shard')
+    )
+    with op.batch_alter_table('job_shards', schema=None) as batch_op:
+        batch_op.create_index('ix_job_shards_claim', ['job_name', 'run_key', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_shards', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_shards_claim')
+
+    op.drop_table('job_shards')
+
+    with op.batch_alter_table('job_locks', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('lease_until')
+        batch_op.drop_column('holder')
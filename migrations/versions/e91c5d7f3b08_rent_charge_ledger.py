@@ -0,0 +1,56 @@
+"""rent charge ledger
+
+Revision ID: e91c5d7f3b08
+Revises: d3f8b61a9c42
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91c5d7f3b08'
+down_revision = 'd3f8b61a9c42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rent_charge',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('tenant_id', 'period', 'kind', name='uq_rent_charge_tenant_period_kind')
+    )
+    with op.batch_alter_table('rent_charge', schema=None) as batch_op:
+        batch_op.create_index('ix_rent_charge_owner_period', ['owner_id', 'period'], unique=False)
+
+    # Backfill every month each tenant has lived through (Postgres; elsewhere
+    # run `flask generate-rent-charges`)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            INSERT INTO rent_charge (tenant_id, owner_id, period, kind, amount, created_at)
+            SELECT t.id, t.owner_id, CAST(p.period AS date), 'rent', t.monthly_rent, now()
+            FROM tenant t
+            CROSS JOIN LATERAL generate_series(
+                date_trunc('month', t.move_in_date),
+                date_trunc('month', (now() AT TIME ZONE 'Africa/Nairobi')),
+                interval '1 month'
+            ) AS p(period)
+            ON CONFLICT (tenant_id, period, kind) DO NOTHING
+        """)
+
+
+def downgrade():
+    with op.batch_alter_table('rent_charge', schema=None) as batch_op:
+        batch_op.drop_index('ix_rent_charge_owner_period')
+
+    op.drop_table('rent_charge')
@@ -0,0 +1,67 @@
+"""month close snapshots
+
+Revision ID: f4a07b2c8e19
+Revises: e91c5d7f3b08
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a07b2c8e19'
+down_revision = 'e91c5d7f3b08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('month_close',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('tenants', sa.Integer(), nullable=False),
+    sa.Column('opening', sa.Float(), nullable=False),
+    sa.Column('charged', sa.Float(), nullable=False),
+    sa.Column('paid', sa.Float(), nullable=False),
+    sa.Column('closing', sa.Float(), nullable=False),
+    sa.Column('closed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner_id', 'period', name='uq_month_close_owner_period')
+    )
+    op.create_table('tenant_month_snapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('tenant_name', sa.String(length=180), nullable=True),
+    sa.Column('house_no', sa.String(length=80), nullable=True),
+    sa.Column('opening', sa.Float(), nullable=False),
+    sa.Column('charged', sa.Float(), nullable=False),
+    sa.Column('paid', sa.Float(), nullable=False),
+    sa.Column('closing', sa.Float(), nullable=False),
+    sa.Column('days_late', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('tenant_id', 'period', name='uq_tenant_month_snapshot_tenant_period')
+    )
+    with op.batch_alter_table('tenant_month_snapshot', schema=None) as batch_op:
+        batch_op.create_index('ix_tenant_month_snapshot_owner_period', ['owner_id', 'period'], unique=False)
+
+    # Payments in a month for the close job and monthly reports
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.create_index('ix_payment_tenant_paid_at', ['tenant_id', 'paid_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_tenant_paid_at')
+
+    with op.batch_alter_table('tenant_month_snapshot', schema=None) as batch_op:
+        batch_op.drop_index('ix_tenant_month_snapshot_owner_period')
+
+    op.drop_table('tenant_month_snapshot')
+    op.drop_table('month_close')
@@ -19,20 +19,11 @@ from flask import Flask, render_template, request, jsonify
 # =======================================================
 # LOGGING SETUP
 # =======================================================
+# Handlers are installed by rentme.logging_setup (by the web app, or below
+# when this file is run directly) — never at import time.
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 LOG_FILE = os.path.join(BASE_DIR, "daraja_register.log")
-os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
 logger = logging.getLogger(__name__)
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logger.addHandler(console_handler)
 
 # =======================================================
 # UTILITIES
@@ -157,50 +148,57 @@ def run_registration_interactive():
 # =======================================================
 # FLASK WEB UI MODE
 # =======================================================
-app = Flask(__name__)
-
-@app.route("/")
-def index():
-    return """
-    <h2>Daraja Registration Portal</h2>
-    <ul>
-      <li><a href='/register_sandbox'>Register Sandbox</a></li>
-      <li><a href='/register_live'>Register Live</a></li>
-    </ul>
-    """
-
-@app.route("/register_live")
-def register_live():
-    return render_template("register_live.html")
-
-@app.route("/register_sandbox")
-def register_sandbox():
-    return render_template("register_sandbox.html")
-
-@app.route("/api/register", methods=["POST"])
-def api_register():
-    data = request.get_json()
-    env = data.get("env", "sandbox").lower()
-    key = data.get("consumer_key")
-    secret = data.get("consumer_secret")
-    shortcode = data.get("shortcode")
-    callback = data.get("callback_url")
-
-    if not all([key, secret, shortcode, callback]):
-        return jsonify({"status": "error", "message": "All fields are required"}), 400
-
-    live = env == "live"
-    base_url = "https://api.safaricom.co.ke" if live else "https://sandbox.safaricom.co.ke"
-
-    result = register_urls(env.upper(), base_url, key, secret, shortcode, callback, live)
-    return jsonify(result)
+def create_web_app():
+    """The portal app; built only in `web` mode so importing register_urls stays cheap."""
+    app = Flask(__name__)
+
+    @app.route("/")
+    def index():
+        return """
+        <h2>Daraja Registration Portal</h2>
+        <ul>
+          <li><a href='/register_sandbox'>Register Sandbox</a></li>
+          <li><a href='/register_live'>Register Live</a></li>
+        </ul>
+        """
+
+    @app.route("/register_live")
+    def register_live():
+        return render_template("register_live.html")
+
+    @app.route("/register_sandbox")
+    def register_sandbox():
+        return render_template("register_sandbox.html")
+
+    @app.route("/api/register", methods=["POST"])
+    def api_register():
+        data = request.get_json()
+        env = data.get("env", "sandbox").lower()
+        key = data.get("consumer_key")
+        secret = data.get("consumer_secret")
+        shortcode = data.get("shortcode")
+        callback = data.get("callback_url")
+
+        if not all([key, secret, shortcode, callback]):
+            return jsonify({"status": "error", "message": "All fields are required"}), 400
+
+        live = env == "live"
+        base_url = "https://api.safaricom.co.ke" if live else "https://sandbox.safaricom.co.ke"
+
+        result = register_urls(env.upper(), base_url, key, secret, shortcode, callback, live)
+        return jsonify(result)
+
+    return app
 
 # =======================================================
 # ENTRYPOINT
 # =======================================================
 if __name__ == "__main__":
+    from rentme.logging_setup import configure_logging
+    configure_logging(log_file=LOG_FILE)
+
     if len(sys.argv) > 1 and sys.argv[1] == "web":
         print("🌍 Starting Flask Daraja UI at http://127.0.0.1:5005")
-        app.run(debug=True, port=5005)
+        create_web_app().run(debug=True, port=5005)
     else:
         run_registration_interactive()
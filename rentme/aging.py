@@ -0,0 +1,213 @@
+# rentme/aging.py
+"""
+Arrears aging buckets (0-30 / 31-60 / 61-90 / 90+ days).
+
+Payments settle the oldest charges first, so a tenant's arrears are their
+newest charges: walking charges from newest to oldest, each is unpaid up to
+whatever arrears remain. The age of a charge is counted from its due date
+(the 1st, or the move-in day in the move-in month). This is computed in SQL
+with a running sum over rent_charge (a window function), grouped per tenant.
+
+Results live in the tenant_aging rollup: one row per tenant in arrears,
+indexed (owner_id, bucket) so the top tenants per bucket are an index read.
+Landlord sums are added up from it when read (one range scan of the
+landlord's tenants in arrears); there is no per-landlord row, so payments
+for different tenants of one landlord never wait on each other.
+
+Payment inserts / edits / deletes refresh the affected tenants in the same
+transaction (event hooks in models.py), and so does every charge insert
+(sync_tenant_charges, month close, the CLI backfills); rows are upserted, so
+concurrent refreshes of one tenant cannot collide on the primary key. The
+monthly job rebuilds the table per owner range, which also moves balances
+into older buckets as time passes.
+
+Provides:
+- BUCKETS
+- refresh_tenants(tenant_ids, connection=None, today=None)
+- forget_tenants(tenant_ids, connection=None)
+- rebuild_owner_range(owner_lo, owner_hi, today=None) -> int   # no commit
+- owner_totals(owner_id) -> dict                                # buckets, total, tenants, as_of
+- aging_report(owner_id, top=5) -> dict
+- tenant_aging_map(owner_id=None) -> {tenant_id: TenantAging}
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, case, delete, and_, literal, Date, DateTime
+
+from rentme.extensions import db
+from rentme.models import Tenant, Payment, RentCharge, TenantAging, upsert
+from rentme.ledger import current_date
+
+
+BUCKETS = ("days_0_30", "days_31_60", "days_61_90", "days_90_plus")
+
+
+# ---------------------------------------------------------------------
+# Computation (set-based)
+# ---------------------------------------------------------------------
+def _aging_select(today, *tenant_conds):
+    """Per-tenant buckets for tenants matching `tenant_conds`, arrears only."""
+    due = case((RentCharge.period < Tenant.move_in_date, Tenant.move_in_date), else_=RentCharge.period)
+    charges = (
+        select(
+            RentCharge.tenant_id,
+            Tenant.owner_id,
+            RentCharge.amount,
+            due.label("due"),
+            func.sum(RentCharge.amount).over(
+                partition_by=RentCharge.tenant_id,
+                order_by=(RentCharge.period.desc(), RentCharge.id.desc()),
+            ).label("newer"),
+            func.sum(RentCharge.amount).over(partition_by=RentCharge.tenant_id).label("charged"),
+        )
+        .join(Tenant, Tenant.id == RentCharge.tenant_id)
+        .where(*tenant_conds)
+        .subquery()
+    )
+    paid = (
+        select(Payment.tenant_id, func.sum(Payment.amount).label("paid"))
+        .join(Tenant, Tenant.id == Payment.tenant_id)
+        .where(*tenant_conds)
+        .group_by(Payment.tenant_id)
+        .subquery()
+    )
+
+    # Part of this charge still unpaid: arrears left after the newer charges
+    left = charges.c.charged - func.coalesce(paid.c.paid, 0.0) - charges.c.newer + charges.c.amount
+    unpaid = case((left <= 0, 0.0), (left >= charges.c.amount, charges.c.amount), else_=left)
+
+    d30, d60, d90 = (today - timedelta(days=n) for n in (30, 60, 90))
+    ranges = {
+        "days_0_30": charges.c.due >= d30,
+        "days_31_60": and_(charges.c.due >= d60, charges.c.due < d30),
+        "days_61_90": and_(charges.c.due >= d90, charges.c.due < d60),
+        "days_90_plus": charges.c.due < d90,
+    }
+    total = func.sum(unpaid)
+    return (
+        select(
+            charges.c.tenant_id,
+            charges.c.owner_id,
+            *(func.round(func.sum(case((cond, unpaid), else_=0.0)), 2).label(name) for name, cond in ranges.items()),
+            func.round(total, 2).label("total"),
+        )
+        .select_from(charges.outerjoin(paid, paid.c.tenant_id == charges.c.tenant_id))
+        .group_by(charges.c.tenant_id, charges.c.owner_id)
+        .having(total > 0.005)
+    )
+
+
+# ---------------------------------------------------------------------
+# Incremental refresh (payment and charge writes)
+# ---------------------------------------------------------------------
+def refresh_tenants(tenant_ids, connection=None, today=None):
+    """Recompute aging for a few tenants. No commit."""
+    tenant_ids = [t for t in set(tenant_ids) if t]
+    if not tenant_ids:
+        return
+    execute = (connection or db.session).execute
+    today = today or current_date()
+
+    rows = [dict(r._mapping) for r in execute(_aging_select(today, Tenant.id.in_(tenant_ids)))]
+    if rows:
+        now = datetime.utcnow()
+        execute(upsert(TenantAging, ["tenant_id"]), [dict(r, as_of=today, updated_at=now) for r in rows])
+
+    # Tenants no longer in arrears
+    settled = set(tenant_ids) - {r["tenant_id"] for r in rows}
+    if settled:
+        execute(delete(TenantAging).where(TenantAging.tenant_id.in_(settled)))
+
+
+def forget_tenants(tenant_ids, connection=None):
+    """Remove deleted tenants from the rollup (one pass for any number)."""
+    tenant_ids = [t for t in set(tenant_ids) if t]
+    if tenant_ids:
+        execute = (connection or db.session).execute
+        execute(delete(TenantAging).where(TenantAging.tenant_id.in_(tenant_ids)))
+
+
+# ---------------------------------------------------------------------
+# Rebuild (monthly job)
+# ---------------------------------------------------------------------
+def rebuild_owner_range(owner_lo: int, owner_hi: int, today=None) -> int:
+    """Recompute the rollup for owners in [lo, hi). Does not commit. Returns tenants in arrears."""
+    today = today or current_date()
+    now = datetime.utcnow()
+    in_range = (Tenant.owner_id >= owner_lo, Tenant.owner_id < owner_hi)
+
+    # Upsert, then drop the rows it did not touch (tenants no longer in
+    # arrears), so payments refreshing a tenant meanwhile do not collide
+    sel = _aging_select(today, *in_range).subquery()
+    written = db.session.execute(
+        upsert(TenantAging, ["tenant_id"]).from_select(
+            ["tenant_id", "owner_id", *BUCKETS, "total", "as_of", "updated_at"],
+            select(
+                sel.c.tenant_id, sel.c.owner_id, *(sel.c[b] for b in BUCKETS), sel.c.total,
+                literal(today, Date), literal(now, DateTime),
+            ).where(sel.c.total > 0),   # a WHERE keeps SQLite's ON CONFLICT unambiguous
+        )
+    ).rowcount or 0
+    db.session.execute(
+        delete(TenantAging).where(
+            TenantAging.owner_id >= owner_lo, TenantAging.owner_id < owner_hi, TenantAging.updated_at < now,
+        )
+    )
+    return written
+
+
+# ---------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------
+def owner_totals(owner_id: int) -> dict:
+    """A landlord's sums over its tenants in arrears (zeros when none)."""
+    row = db.session.execute(
+        select(
+            func.count(),
+            *(func.coalesce(func.sum(getattr(TenantAging, b)), 0.0) for b in BUCKETS),
+            func.coalesce(func.sum(TenantAging.total), 0.0),
+            func.min(TenantAging.as_of),
+        ).where(TenantAging.owner_id == owner_id)
+    ).one()
+    return {
+        "tenants": row[0],
+        **{b: round(v, 2) for b, v in zip(BUCKETS, row[1:5])},
+        "total": round(row[5], 2),
+        "as_of": row[6],
+    }
+
+
+def aging_report(owner_id: int, top: int = 5) -> dict:
+    """Landlord buckets and the `top` tenants owing most in each bucket."""
+    summary = owner_totals(owner_id)
+    out = {
+        "as_of": summary["as_of"].isoformat() if summary["as_of"] else None,
+        "tenants_in_arrears": summary["tenants"],
+        "total": summary["total"],
+        "buckets": {},
+    }
+    for bucket in BUCKETS:
+        col = getattr(TenantAging, bucket)
+        rows = db.session.execute(
+            select(TenantAging.tenant_id, Tenant.name, Tenant.house_no, col, TenantAging.total)
+            .join(Tenant, Tenant.id == TenantAging.tenant_id)
+            .where(TenantAging.owner_id == owner_id, col > 0)
+            .order_by(col.desc())
+            .limit(top)
+        ).all()
+        out["buckets"][bucket] = {
+            "amount": summary[bucket],
+            "top_tenants": [
+                {"tenant_id": r[0], "name": r[1], "house_no": r[2], "amount": r[3], "total": r[4]}
+                for r in rows
+            ],
+        }
+    return out
+
+
+def tenant_aging_map(owner_id=None) -> dict:
+    q = TenantAging.query
+    if owner_id is not None:
+        q = q.filter(TenantAging.owner_id == owner_id)
+    return {a.tenant_id: a for a in q}
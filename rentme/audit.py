@@ -0,0 +1,205 @@
+# rentme/audit.py
+"""
+Buffered audit log writer.
+
+`audit()` only appends the event to an in-process buffer; a background
+thread writes the buffer to `audit_log` in multi-row INSERTs, every
+AUDIT_FLUSH_INTERVAL seconds or as soon as AUDIT_BATCH_SIZE events are
+waiting. Requests no longer pay a commit per audited action. The buffer is
+flushed on interpreter exit (atexit), and each process (gunicorn worker,
+worker.py) starts its own flusher on first use, also after a fork.
+
+If the database is unavailable the batch is kept and retried; past
+AUDIT_BUFFER_MAX events the oldest are dropped with a warning. A batch the
+database rejects (DataError / IntegrityError, e.g. an event for a user
+deleted meanwhile) is retried row by row, and only the rows that still fail
+are logged and dropped, so one bad event cannot wedge the buffer. AUDIT_MODE
+= "sync" writes each event immediately (handy in a shell or a one-off
+script).
+
+Events are stored in `audit_log`, range-partitioned by month on created_at
+on Postgres (rentme/partitions.py) and indexed on (user_id, created_at) for
+the keyset-paginated viewer (`audit_page()`, route /audit).
+
+Provides:
+- audit(user, action, meta="")
+- flush() -> int
+- audit_page(user_id=None, before=None, limit=50) -> (rows, next_cursor)
+"""
+
+import os
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import DataError, IntegrityError
+
+from rentme.extensions import db
+from rentme.models import AuditLog
+
+
+log = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------
+# Buffer
+# ---------------------------------------------------------------------
+class _AuditBuffer:
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.events = deque()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.app = None
+        self.dropped = 0
+
+    def _cfg(self, name, default):
+        return self.app.config.get(name, default) if self.app else default
+
+    def add(self, app, event: dict):
+        if os.getpid() != self.pid:
+            # Forked (gunicorn): the parent's thread and lock are not ours
+            self._reset()
+        self.app = self.app or app
+
+        with self.lock:
+            self.events.append(event)
+            overflow = len(self.events) - int(self._cfg("AUDIT_BUFFER_MAX", 10000))
+            for _ in range(max(overflow, 0)):
+                self.events.popleft()
+                self.dropped += 1
+            waiting = len(self.events)
+
+        if overflow > 0:
+            log.warning("Audit buffer full, dropped %s oldest event(s)", overflow)
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+            self.thread.start()
+        if waiting >= int(self._cfg("AUDIT_BATCH_SIZE", 200)):
+            self.wake.set()
+
+    def _run(self):
+        while True:
+            self.wake.wait(float(self._cfg("AUDIT_FLUSH_INTERVAL", 2.0)))
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Audit flush failed; will retry")
+
+    def flush(self) -> int:
+        """Write everything buffered so far. Returns events written."""
+        if os.getpid() != self.pid or self.app is None:
+            return 0
+        batch_size = int(self._cfg("AUDIT_BATCH_SIZE", 200))
+        written = 0
+        while True:
+            with self.lock:
+                batch = [self.events.popleft() for _ in range(min(batch_size, len(self.events)))]
+            if not batch:
+                return written
+            try:
+                with self.app.app_context():
+                    try:
+                        with db.engine.begin() as conn:
+                            conn.execute(AuditLog.__table__.insert(), batch)
+                        written += len(batch)
+                    except (DataError, IntegrityError):
+                        # Retrying the same batch would fail forever: isolate the bad rows
+                        written += self._insert_one_by_one(batch)
+            except Exception:
+                # Put the batch back in front, in order, and let the next tick retry
+                with self.lock:
+                    self.events.extendleft(reversed(batch))
+                raise
+
+    def _insert_one_by_one(self, batch) -> int:
+        written = 0
+        while batch:
+            event = batch[0]
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(AuditLog.__table__.insert(), [event])
+                written += 1
+            except (DataError, IntegrityError) as e:
+                self.dropped += 1
+                log.error("Dropping audit event the database rejects: %s %r: %s",
+                          event.get("action"), event.get("meta"), e.orig)
+            # Anything else propagates; flush() requeues what is left in `batch`
+            batch.pop(0)
+        return written
+
+
+_buffer = _AuditBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        _buffer.flush()
+    except Exception:
+        log.exception("Audit flush on exit failed; %s event(s) lost", len(_buffer.events))
+
+
+# ---------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------
+def audit(user, action, meta=""):
+    """Record an audit event. Never raises."""
+    event = {
+        "user_id": getattr(user, "id", None) if user else None,
+        "action": str(action)[:200],
+        "meta": str(meta)[:1000],
+        "created_at": datetime.utcnow(),
+    }
+    app = current_app._get_current_object() if has_app_context() else None
+    if app is not None and app.config.get("AUDIT_MODE", "buffered") != "sync":
+        try:
+            _buffer.add(app, event)
+        except Exception as e:
+            log.warning("Audit log failed: %s", e)
+        return
+
+    try:
+        db.session.execute(AuditLog.__table__.insert(), [event])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        log.warning("Audit log failed: %s", e)
+
+
+def flush() -> int:
+    return _buffer.flush()
+
+
+def audit_page(user_id=None, before=None, limit: int = 50):
+    """
+    Newest first, keyset-paginated on (created_at, id). `before` is the
+    cursor returned by the previous page ("<iso created_at>|<id>").
+    Returns (rows, next_cursor or None).
+    """
+    q = AuditLog.query
+    if user_id is not None:
+        q = q.filter(AuditLog.user_id == user_id)
+    if before:
+        ts, _, last_id = before.partition("|")
+        ts, last_id = datetime.fromisoformat(ts), int(last_id)
+        q = q.filter(or_(
+            AuditLog.created_at < ts,
+            and_(AuditLog.created_at == ts, AuditLog.id < last_id),
+        ))
+    rows = q.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1].created_at.isoformat()}|{rows[-1].id}"
+    return rows, next_cursor
@@ -0,0 +1,262 @@
+# rentme/campaigns.py
+"""
+Arrears reminder campaigns.
+
+A campaign is one platform-wide pass for a (kind, period), e.g. the arrears
+reminders for "2026-10". Tenants of landlords who opted in are read in
+tenant-id order, `ARREARS_CHUNK_SIZE` at a time; each chunk is a single
+query that computes balances in SQL from the ledger (payments minus rent
+charges, rentme/ledger.py) and keeps only tenants in arrears. Messages are
+rendered per tenant and written to the SMS outbox with `queue_sms_bulk()`;
+the outbox rows and the campaign cursor are committed together, so a crashed run resumes after the last committed
+chunk and never queues a tenant twice (the outbox also dedupes on
+recipient + template + period).
+
+Tenants whose landlord is inside their quiet hours are still queued, with
+`next_attempt_at` set to the end of the quiet window. Delivery speed is
+governed by the worker and SMS_RATE_LIMITS, not by this module.
+
+Provides:
+- run_arrears_campaign(period=None, chunk_size=None) -> ReminderCampaign or None
+- campaign_status(period=None) -> dict
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+import pytz
+from flask import current_app
+from sqlalchemy import select, update, or_
+
+from rentme.extensions import db
+from rentme.models import Tenant, LandlordSettings, ReminderCampaign, insert_ignore
+from rentme.ledger import charged_sql, paid_sql
+from rentme.sms import queue_sms_bulk
+
+
+log = logging.getLogger(__name__)
+
+KENYA_TZ = pytz.timezone("Africa/Nairobi")
+
+KIND_ARREARS = "arrears"
+TEMPLATE_ARREARS = "arrears_reminder"
+
+DEFAULT_MESSAGE = (
+    "Dear {name}, your rent balance for house {house_no} is KES {amount}. "
+    "Please pay{pay_to} to clear your arrears. Thank you."
+)
+
+
+# ---------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------
+def _cfg(name: str, default):
+    return current_app.config.get(name, default)
+
+
+def current_period(now: datetime = None) -> str:
+    now = now or datetime.now(KENYA_TZ)
+    return now.strftime("%Y-%m")
+
+
+def in_quiet_hours(hour: int, start, end) -> bool:
+    """Quiet window [start, end) in local hours; may wrap midnight (21 -> 8)."""
+    if start is None or end is None or start == end:
+        return False
+    if start < end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def quiet_until(now_local: datetime, start, end):
+    """Naive UTC time the quiet window ends, or None when sending is allowed now."""
+    if not in_quiet_hours(now_local.hour, start, end):
+        return None
+    resume = now_local.replace(hour=end, minute=0, second=0, microsecond=0)
+    if resume <= now_local:
+        resume += timedelta(days=1)
+    return resume.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def _pay_to(paybill, till, send_money, house_no) -> str:
+    if paybill:
+        return f" via M-Pesa Paybill {paybill}, account {house_no}"
+    if till:
+        return f" via M-Pesa Till {till}"
+    if send_money:
+        return f" via M-Pesa to {send_money}"
+    return ""
+
+
+def render_message(template: str, row) -> str:
+    fields = {
+        "name": (row.name or "").split(" ")[0] or "tenant",
+        "house_no": row.house_no,
+        "amount": f"{abs(row.balance):,.0f}",
+        "pay_to": _pay_to(row.paybill_number, row.till_number, row.send_money_number, row.house_no),
+    }
+    try:
+        return template.format(**fields)
+    except (KeyError, IndexError, ValueError):
+        log.warning("Bad ARREARS_REMINDER_TEMPLATE, using the default")
+        return DEFAULT_MESSAGE.format(**fields)
+
+
+# ---------------------------------------------------------------------
+# Selection (one query per chunk, keyset on tenant id)
+# ---------------------------------------------------------------------
+def _arrears_chunk(after_id: int, limit: int, min_amount: float):
+    balance = paid_sql() - charged_sql()
+
+    stmt = (
+        select(
+            Tenant.id, Tenant.name, Tenant.phone, Tenant.house_no,
+            balance.label("balance"),
+            LandlordSettings.paybill_number,
+            LandlordSettings.till_number,
+            LandlordSettings.send_money_number,
+            LandlordSettings.reminder_quiet_start,
+            LandlordSettings.reminder_quiet_end,
+        )
+        .join(LandlordSettings, LandlordSettings.user_id == Tenant.owner_id)
+        .where(
+            LandlordSettings.arrears_reminders_enabled.is_(True),
+            Tenant.id > after_id,
+            balance <= -min_amount,
+        )
+        .order_by(Tenant.id)
+        .limit(limit)
+    )
+    return db.session.execute(stmt).all()
+
+
+# ---------------------------------------------------------------------
+# Campaign lifecycle
+# ---------------------------------------------------------------------
+def _claim(kind: str, period: str):
+    """
+    Create the campaign row if needed and take its lease. Returns the row, or
+    None when it is finished or another process holds a live lease.
+    """
+    now = datetime.utcnow()
+    db.session.execute(
+        insert_ignore(ReminderCampaign, ["kind", "period"]),
+        [{
+            "kind": kind, "period": period, "status": "running",
+            "cursor": 0, "selected": 0, "queued": 0, "deferred": 0,
+            "started_at": now,
+        }],
+    )
+
+    lease = timedelta(seconds=_cfg("CAMPAIGN_LEASE_SECONDS", 300))
+    claimed = db.session.execute(
+        update(ReminderCampaign)
+        .where(
+            ReminderCampaign.kind == kind,
+            ReminderCampaign.period == period,
+            ReminderCampaign.status != "done",
+            or_(ReminderCampaign.locked_at.is_(None), ReminderCampaign.locked_at < now - lease),
+        )
+        .values(status="running", locked_at=now, last_error=None)
+    ).rowcount
+    db.session.commit()
+
+    if not claimed:
+        return None
+    return ReminderCampaign.query.filter_by(kind=kind, period=period).one()
+
+
+def run_arrears_campaign(period: str = None, chunk_size: int = None):
+    """
+    Queue arrears reminders for `period` (default: this month, EAT).
+    Resumes from the stored cursor. Returns the campaign row, or None when
+    the campaign already finished or is running elsewhere.
+    """
+    now_local = datetime.now(KENYA_TZ)
+    period = period or current_period(now_local)
+    chunk_size = chunk_size or _cfg("ARREARS_CHUNK_SIZE", 1000)
+    min_amount = float(_cfg("ARREARS_MIN_AMOUNT", 1.0))
+    template = _cfg("ARREARS_REMINDER_TEMPLATE", None) or DEFAULT_MESSAGE
+    provider = _cfg("ARREARS_SMS_PROVIDER", None)
+
+    campaign = _claim(KIND_ARREARS, period)
+    if campaign is None:
+        log.info("Arrears campaign %s already done or running elsewhere", period)
+        return None
+
+    if campaign.cursor:
+        log.info("Resuming arrears campaign %s after tenant %s", period, campaign.cursor)
+
+    try:
+        while True:
+            rows = _arrears_chunk(campaign.cursor, chunk_size, min_amount)
+            if not rows:
+                break
+
+            messages, deferred = [], 0
+            for row in rows:
+                not_before = quiet_until(now_local, row.reminder_quiet_start, row.reminder_quiet_end)
+                deferred += 1 if not_before else 0
+                messages.append({
+                    "recipient": row.phone,
+                    "message": render_message(template, row),
+                    "template": TEMPLATE_ARREARS,
+                    "period": period,
+                    "provider": provider,
+                    "not_before": not_before,
+                })
+
+            queued = queue_sms_bulk(messages)
+
+            # Outbox rows and checkpoint commit together
+            campaign.cursor = rows[-1].id
+            campaign.selected += len(rows)
+            campaign.queued += queued
+            campaign.deferred += deferred
+            campaign.locked_at = datetime.utcnow()
+            db.session.commit()
+
+            log.info(
+                "Arrears campaign %s: chunk of %s queued (cursor=%s)",
+                period, queued, campaign.cursor,
+            )
+
+        campaign.status = "done"
+        campaign.locked_at = None
+        campaign.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        log.exception("Arrears campaign %s failed at cursor %s", period, campaign.cursor)
+        campaign = db.session.get(ReminderCampaign, campaign.id)
+        campaign.status = "failed"
+        campaign.locked_at = None
+        campaign.last_error = str(e)[:500]
+        db.session.commit()
+        raise
+
+    log.info(
+        "Arrears campaign %s done: %s selected, %s queued, %s deferred",
+        period, campaign.selected, campaign.queued, campaign.deferred,
+    )
+    return campaign
+
+
+def campaign_status(period: str = None, kind: str = KIND_ARREARS) -> dict:
+    period = period or current_period()
+    c = ReminderCampaign.query.filter_by(kind=kind, period=period).first()
+    if not c:
+        return {"kind": kind, "period": period, "status": "not_started"}
+    return {
+        "kind": c.kind,
+        "period": c.period,
+        "status": c.status,
+        "cursor": c.cursor,
+        "selected": c.selected,
+        "queued": c.queued,
+        "deferred": c.deferred,
+        "last_error": c.last_error,
+        "started_at": c.started_at.isoformat() if c.started_at else None,
+        "finished_at": c.finished_at.isoformat() if c.finished_at else None,
+    }
@@ -0,0 +1,231 @@
+# rentme/cli.py
+"""
+`flask` CLI commands (create-admin, update-monthly-rent, close-month, seed-bench, ...).
+
+Registered on both the web app and the worker by create_app(); each command
+runs inside the app context. Job modules are imported inside the command so
+listing the commands stays cheap.
+"""
+
+from datetime import datetime
+
+import click
+from flask import Blueprint, current_app
+
+from rentme.extensions import db
+from rentme.models import User
+
+
+# Commands attach to the top-level `flask` group, not `flask cli ...`
+bp = Blueprint("cli", __name__, cli_group=None)
+
+
+@bp.cli.command("create-admin")
+def create_admin():
+    """Create an admin user (manual, production-safe)."""
+    import getpass
+
+    email = input("Admin email: ").strip().lower()
+    if not email:
+        print("❌ Email required.")
+        return
+
+    if User.query.filter_by(email=email).first():
+        print("❌ User already exists.")
+        return
+
+    pwd = getpass.getpass("Password: ")
+    pwd2 = getpass.getpass("Confirm password: ")
+
+    if not pwd or pwd != pwd2:
+        print("❌ Passwords do not match.")
+        return
+
+    confirm = input("Type YES to confirm admin creation: ")
+    if confirm != "YES":
+        print("❌ Aborted.")
+        return
+
+    user = User(email=email, is_admin=True)
+    user.set_password(pwd)
+
+    db.session.add(user)
+    db.session.commit()
+
+    print("✅ Admin created successfully.")
+
+
+@bp.cli.command("update-monthly-rent")
+def update_monthly_rent_cli():
+    """
+    Monthly rent update (CRON SAFE).
+    Can run alongside workers and other invocations: each claims owner-id
+    shards until none are left (rentme/jobs.py).
+    """
+    from rentme.jobs import run_monthly_rent_job
+
+    try:
+        result = run_monthly_rent_job()
+        if result.get("skipped"):
+            print("⏭ Monthly rent already updated this month.")
+            return
+        print(
+            f"✅ Monthly rent posted successfully "
+            f"({result['rows']} rent charges in {result['shards']} shards)."
+        )
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("❌ Monthly rent update failed")
+        raise e
+
+
+@bp.cli.command("generate-rent-charges")
+@click.option("--since", default=None, help="First period YYYY-MM (default: each tenant's move-in month).")
+def generate_rent_charges_cli(since):
+    """Backfill the rent-charge ledger up to the current month. Idempotent."""
+    from rentme.ledger import generate_rent_charges
+
+    since_date = datetime.strptime(since, "%Y-%m").date() if since else None
+    inserted = generate_rent_charges(since=since_date)
+    if inserted:
+        _rebuild_aging()
+    db.session.commit()
+    print(f"✅ {inserted} rent charge(s) created.")
+
+
+@bp.cli.command("assess-late-fees")
+@click.option("--period", default=None, help="Month YYYY-MM (default: last month).")
+def assess_late_fees_cli(period):
+    """Charge late fees for a month under each landlord's penalty rule. Idempotent."""
+    from rentme.penalties import assess_late_fees, previous_month
+
+    period_date = datetime.strptime(period, "%Y-%m").date() if period else previous_month()
+    inserted = assess_late_fees(period_date)
+    if inserted:
+        _rebuild_aging()
+    db.session.commit()
+    print(f"✅ {inserted} late fee(s) charged for {period_date:%Y-%m}.")
+
+
+def _rebuild_aging():
+    """Aging rollup for every landlord; None when there are no tenants. No commit."""
+    from rentme.aging import rebuild_owner_range
+    from rentme.models import owner_id_bounds
+
+    lo, hi = owner_id_bounds()
+    if lo is None:
+        return None
+    return rebuild_owner_range(lo, hi + 1)
+
+
+@bp.cli.command("rebuild-aging")
+def rebuild_aging_cli():
+    """Recompute the arrears aging rollup for every landlord."""
+    tenants = _rebuild_aging()
+    if tenants is None:
+        print("⏭ No tenants.")
+        return
+    db.session.commit()
+    print(f"✅ Aging rebuilt: {tenants} tenant(s) in arrears.")
+
+
+@bp.cli.command("rebuild-collections")
+@click.option("--months", default=24, type=int, help="How many months back, this month included.")
+def rebuild_collections_cli(months):
+    """Recompute the collections rollup for every landlord."""
+    from rentme.collection_stats import rebuild_recent
+
+    rows = rebuild_recent(months=months)
+    db.session.commit()
+    print(f"✅ {rows} landlord-month row(s) written.")
+
+
+@bp.cli.command("partitions")
+@click.option("--table", default="payment", help="Partitioned table.")
+@click.option("--detach", "detach_period", default=None, help="Detach month YYYY-MM (rows stop counting!).")
+def partitions_cli(table, detach_period):
+    """List monthly partitions and create upcoming ones (Postgres only)."""
+    from rentme.partitions import ensure_partitions, list_partitions, detach_partition, is_partitioned
+
+    if not is_partitioned(table):
+        print(f"⏭ {table} is not partitioned on this database.")
+        return
+    if detach_period:
+        name = detach_partition(table, datetime.strptime(detach_period, "%Y-%m").date())
+        print(f"✅ Detached {name}.")
+        return
+    created = ensure_partitions(table)
+    for name, period, tablespace in list_partitions(table):
+        print(f"{name}  {period:%Y-%m}  {tablespace or 'default tablespace'}")
+    print(f"✅ {len(created)} partition(s) created.")
+
+
+@bp.cli.command("close-month")
+@click.option("--period", default=None, help="Month to close YYYY-MM (default: last month).")
+@click.option("--owner", "owner_id", default=None, type=int, help="Close a single landlord only.")
+def close_month_cli(period, owner_id):
+    """Write month-end snapshots. Re-runnable: closed landlords are skipped."""
+    from rentme.month_close import close_month, close_month_all, previous_period
+
+    period_date = datetime.strptime(period, "%Y-%m").date() if period else previous_period()
+    if owner_id:
+        closed = close_month(owner_id, period_date)
+        print("✅ Closed." if closed else "⏭ Already closed.")
+        return
+    counts = close_month_all(period_date)
+    print(f"✅ {period_date:%Y-%m}: {counts['closed']} closed, {counts['skipped']} already closed, {counts['failed']} failed.")
+
+
+@bp.cli.command("run-job")
+@click.argument("job_id")
+def run_job_cli(job_id):
+    """Run a registered periodic job now and record it in job_runs."""
+    from rentme.scheduler import JOBS, run_job
+
+    if job_id not in JOBS:
+        print(f"❌ Unknown job. Registered: {', '.join(sorted(JOBS))}")
+        return
+    run_job(job_id)
+
+
+@bp.cli.command("send-arrears-reminders")
+@click.option("--period", default=None, help="Campaign period YYYY-MM (default: this month, EAT).")
+@click.option("--chunk-size", default=None, type=int, help="Tenants per batch.")
+def send_arrears_reminders_cli(period, chunk_size):
+    """
+    Queue SMS reminders for tenants in arrears (opted-in landlords only).
+    Safe to re-run: resumes an interrupted campaign, skips a finished one.
+    """
+    from rentme.campaigns import run_arrears_campaign
+
+    campaign = run_arrears_campaign(period=period, chunk_size=chunk_size)
+    if campaign is None:
+        print("⏭ Campaign already finished or running elsewhere.")
+        return
+    print(
+        f"✅ Arrears campaign {campaign.period}: {campaign.selected} tenants, "
+        f"{campaign.queued} queued, {campaign.deferred} deferred by quiet hours."
+    )
+
+
+@bp.cli.command("seed-bench")
+@click.option("--landlords", default=100, type=int, help="Landlords to create.")
+@click.option("--tenants", default=20, type=int, help="Tenants per landlord.")
+@click.option("--years", default=2, type=int, help="Years of payment and audit history.")
+@click.option("--seed", default=42, type=int, help="Same seed, same data.")
+@click.option("--jobs", default=1, type=int, help="Loader processes (Postgres only).")
+@click.option("--batch", default=200_000, type=int, help="Payments per COPY / commit.")
+@click.option("--no-rollups", is_flag=True, help="Skip rent charges and the aging / collections rollups.")
+def seed_bench_cli(landlords, tenants, years, seed, jobs, batch, no_rollups):
+    """Bulk-load a synthetic dataset for scale testing. Empty databases only."""
+    from rentme.seed import seed_bench, BENCH_PASSWORD
+
+    if db.session.query(User.id).first() is not None:
+        raise click.ClickException("seed-bench only loads into an empty database (users found).")
+
+    print(f"🌱 Seeding {landlords:,} landlords x {tenants:,} tenants, {years} year(s) of history (seed {seed})")
+    counts = seed_bench(
+        landlords, tenants, years=years, seed=seed, jobs=jobs, batch=batch,
+        rollups=not no_rollups, echo=print,
+    )
+    print(f"✅ Done: {', '.join(f'{n:,} {t}' for t, n in counts.items())}. Password: {BENCH_PASSWORD}")
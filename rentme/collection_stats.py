@@ -0,0 +1,177 @@
+# rentme/collection_stats.py
+"""
+Collections per landlord and month.
+
+`collection_month` holds one row per (landlord, month): rent collected
+(payments dated in the month), rent expected (charges for the month), how
+many tenants were charged / paid, and the median days late across charged
+tenants (days until the month's payments covered the month's charge, see
+ledger.days_late; earlier credit is not counted).
+
+A month is computed from two range reads: the month's charges through
+ix_rent_charge_owner_period and the month's payments through the BRIN index
+on payment.paid_at. Payment writes add what they changed to collected and
+tenants_paid in the same transaction (event hooks in models.py), with one
+INSERT ... ON CONFLICT DO UPDATE, so concurrent payments for a landlord
+never collide on the row and no write rescans the month. expected,
+tenants_charged and median_days_late come from the nightly job, which
+rebuilds the current and previous month for everyone (and so also corrects
+tenants_paid after concurrent first payments of one tenant).
+
+Provides:
+- rebuild_month(period, owner_range=None, connection=None) -> int   # no commit
+- add_payment_deltas(deltas, connection=None)   # {(tenant_id, period): [amount, payments]}
+- rebuild_recent(months=2) -> int                                   # no commit
+- collections_series(owner_id, months=24) -> list of dicts
+"""
+
+import statistics
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select, func, delete, and_
+
+from rentme.extensions import db
+from rentme.models import Tenant, Payment, RentCharge, CollectionMonth, upsert
+from rentme.ledger import month_start, next_month, current_date, days_late
+
+
+def _months_back(period: date, n: int) -> date:
+    for _ in range(n):
+        period = month_start(period - timedelta(days=1))
+    return period
+
+
+def rebuild_month(period: date, owner_range=None, connection=None) -> int:
+    """Recompute `period` for owners in [lo, hi) (default: everyone). Returns rows written."""
+    execute = (connection or db.session).execute
+    period = month_start(period)
+    start_dt, end_dt = datetime.combine(period, time.min), datetime.combine(next_month(period), time.min)
+
+    charge_q = (
+        select(RentCharge.owner_id, RentCharge.tenant_id, Tenant.move_in_date, func.sum(RentCharge.amount))
+        .join(Tenant, Tenant.id == RentCharge.tenant_id)
+        .where(RentCharge.period == period)
+        .group_by(RentCharge.owner_id, RentCharge.tenant_id, Tenant.move_in_date)
+    )
+    payment_q = (
+        select(Tenant.owner_id, Payment.tenant_id, Payment.amount, Payment.paid_at)
+        .join(Tenant, Tenant.id == Payment.tenant_id)
+        .where(Payment.paid_at >= start_dt, Payment.paid_at < end_dt)
+        .order_by(Payment.tenant_id, Payment.paid_at, Payment.id)
+    )
+    if owner_range is not None:
+        lo, hi = owner_range
+        charge_q = charge_q.where(RentCharge.owner_id >= lo, RentCharge.owner_id < hi)
+        payment_q = payment_q.where(Tenant.owner_id >= lo, Tenant.owner_id < hi)
+
+    payments = {}
+    owners = {}
+    for owner_id, tenant_id, amount, paid_at in execute(payment_q):
+        payments.setdefault(tenant_id, []).append((amount, paid_at))
+        o = owners.setdefault(owner_id, {"collected": 0.0, "expected": 0.0, "paid": set(), "late": []})
+        o["collected"] += amount or 0.0
+        o["paid"].add(tenant_id)
+
+    for owner_id, tenant_id, move_in, charged in execute(charge_q):
+        o = owners.setdefault(owner_id, {"collected": 0.0, "expected": 0.0, "paid": set(), "late": []})
+        o["expected"] += charged or 0.0
+        o["late"].append(days_late(period, max(period, move_in), 0.0, charged or 0.0, payments.get(tenant_id, ())))
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "owner_id": owner_id,
+            "period": period,
+            "collected": round(o["collected"], 2),
+            "expected": round(o["expected"], 2),
+            "tenants_charged": len(o["late"]),
+            "tenants_paid": len(o["paid"]),
+            "median_days_late": float(statistics.median(o["late"])) if o["late"] else None,
+            "updated_at": now,
+        }
+        for owner_id, o in owners.items()
+    ]
+    if rows:
+        execute(upsert(CollectionMonth, ["owner_id", "period"]), rows)
+
+    # Landlords with nothing charged or paid this month any more
+    stale_q = delete(CollectionMonth).where(CollectionMonth.period == period, CollectionMonth.updated_at < now)
+    if owner_range is not None:
+        stale_q = stale_q.where(CollectionMonth.owner_id >= owner_range[0], CollectionMonth.owner_id < owner_range[1])
+    execute(stale_q)
+    return len(rows)
+
+
+def add_payment_deltas(deltas, connection=None):
+    """
+    Add payment changes to the (landlord, month) rows. `deltas` maps
+    (tenant_id, period) to [amount, payments] gained (negative: lost) in
+    this transaction. A tenant counts towards tenants_paid while it has a
+    payment in the month. No commit.
+    """
+    execute = (connection or db.session).execute
+    totals = {}
+    for period in sorted({p for _, p in deltas}):
+        start_dt, end_dt = datetime.combine(period, time.min), datetime.combine(next_month(period), time.min)
+        tenant_ids = [t for t, p in deltas if p == period]
+        # Owner and payments in the month now (this transaction's included)
+        counts = execute(
+            select(Tenant.id, Tenant.owner_id, func.count(Payment.id))
+            .outerjoin(Payment, and_(
+                Payment.tenant_id == Tenant.id, Payment.paid_at >= start_dt, Payment.paid_at < end_dt,
+            ))
+            .where(Tenant.id.in_(tenant_ids))
+            .group_by(Tenant.id, Tenant.owner_id)
+        )
+        for tenant_id, owner_id, payments in counts:
+            amount, added = deltas[(tenant_id, period)]
+            t = totals.setdefault((owner_id, period), [0.0, 0])
+            t[0] += amount
+            t[1] += (payments > 0) - (payments - added > 0)
+
+    rows = [
+        {"owner_id": owner_id, "period": period, "collected": round(amount, 2), "tenants_paid": paid}
+        for (owner_id, period), (amount, paid) in sorted(totals.items())
+        if amount or paid
+    ]
+    if not rows:
+        return
+    now = datetime.utcnow()
+    execute(
+        upsert(CollectionMonth, ["owner_id", "period"], set_=lambda new: {
+            "collected": func.round(CollectionMonth.collected + new.collected, 2),
+            "tenants_paid": CollectionMonth.tenants_paid + new.tenants_paid,
+            "updated_at": new.updated_at,
+        }),
+        [dict(r, expected=0.0, tenants_charged=0, updated_at=now) for r in rows],
+    )
+
+
+def rebuild_recent(months: int = 2) -> int:
+    """Rebuild the last `months` months (this one included) for every landlord."""
+    period = month_start(current_date())
+    rows = 0
+    for n in range(months):
+        rows += rebuild_month(_months_back(period, n))
+    return rows
+
+
+def collections_series(owner_id: int, months: int = 24) -> list:
+    """Oldest first, one entry per month up to this month; gaps are zeros."""
+    last = month_start(current_date())
+    first = _months_back(last, months - 1)
+    found = {
+        r.period: r for r in
+        CollectionMonth.query
+        .filter(CollectionMonth.owner_id == owner_id, CollectionMonth.period >= first)
+        .order_by(CollectionMonth.period)
+    }
+    out, period = [], first
+    while period <= last:
+        r = found.get(period)
+        out.append(r.to_dict() if r else {
+            "period": period.strftime("%Y-%m"), "collected": 0.0, "expected": 0.0,
+            "tenants_charged": 0, "tenants_paid": 0, "median_days_late": None,
+        })
+        period = next_month(period)
+    return out
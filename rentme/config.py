@@ -5,6 +5,45 @@ from flask_wtf.csrf import CSRFProtect
 # Load .env file
 load_dotenv()
 
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+
+def engine_options(url: str = None, green: bool = False) -> dict:
+    """
+    SQLALCHEMY_ENGINE_OPTIONS from DB_* env vars. Postgres only; SQLite
+    (development) keeps SQLAlchemy's defaults.
+
+    DB_POOL_MODE=queue      a pool per process (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    DB_POOL_MODE=pgbouncer  NullPool: PgBouncer in transaction mode pools for
+                            us. No startup options either (PgBouncer rejects
+                            them), so set statement_timeout on the role.
+
+    `green` (gevent workers) raises the pool defaults: one process serves
+    many requests at once. Size Postgres max_connections for
+    workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+    """
+    if not url or not url.startswith(("postgres://", "postgresql")):
+        return {}
+
+    env = os.environ.get
+    connect_args = {"application_name": env("DB_APPLICATION_NAME", "rentana")}
+
+    if env("DB_POOL_MODE", "queue").lower() in ("pgbouncer", "null"):
+        from sqlalchemy.pool import NullPool
+        return {"poolclass": NullPool, "connect_args": connect_args}
+
+    timeout_ms = int(env("DB_STATEMENT_TIMEOUT_MS", 30000))
+    if timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={timeout_ms}"
+    return {
+        "pool_size": int(env("DB_POOL_SIZE", 20 if green else 5)),
+        "max_overflow": int(env("DB_MAX_OVERFLOW", 30 if green else 10)),
+        # Green: fail fast rather than queue hundreds of greenlets on the pool
+        "pool_timeout": int(env("DB_POOL_TIMEOUT", 10 if green else 30)),
+        "pool_recycle": int(env("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": env("DB_POOL_PRE_PING", "1") == "1",
+        "connect_args": connect_args,
+    }
 
 
 class Config:
@@ -24,11 +63,72 @@ class Config:
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = 3600
 
+    # ------------------------------------------------------------------
+    # Rate limiting (rentme/ratelimit.py)
+    # ------------------------------------------------------------------
+    # Limits are per client IP. Behind a reverse proxy (Render's load
+    # balancer is one hop) every request comes from the proxy, so werkzeug's
+    # ProxyFix takes the client from the last PROXY_FIX_X_FOR entries of
+    # X-Forwarded-For (and the scheme from X-Forwarded-Proto). Set both to 0
+    # when clients connect directly: the headers would then be spoofable.
+    PROXY_FIX_X_FOR = int(os.environ.get("PROXY_FIX_X_FOR", 1))
+    PROXY_FIX_X_PROTO = int(os.environ.get("PROXY_FIX_X_PROTO", 1))
+    # Redis so limits hold across gunicorn workers; memory:// is per process
+    RATELIMIT_STORAGE_URI = (
+        os.environ.get("RATELIMIT_STORAGE_URI") or os.environ.get("REDIS_URL") or "memory://"
+    )
+    RATELIMIT_STRATEGY = os.environ.get("RATELIMIT_STRATEGY", "moving-window")
+    # Redis down: count in memory per process instead of failing requests
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
+    # Share of a limit each worker leases per Redis hit and spends locally; 0 = off
+    RATELIMIT_LEASE_FRACTION = float(os.environ.get("RATELIMIT_LEASE_FRACTION", 0.05))
+    # Per route, per client IP ("10/minute;100/hour"); empty = unlimited
+    RATELIMIT_LOGIN = os.environ.get("RATELIMIT_LOGIN", "10/minute;50/hour")
+    RATELIMIT_REGISTER = os.environ.get("RATELIMIT_REGISTER", "10/hour")
+    RATELIMIT_FORGOT_PASSWORD = os.environ.get("RATELIMIT_FORGOT_PASSWORD", "5/minute;20/hour")
+    RATELIMIT_RESET_PASSWORD = os.environ.get("RATELIMIT_RESET_PASSWORD", "5/minute")
+    # Daraja calls from a handful of Safaricom IPs, so these are per gateway
+    RATELIMIT_MPESA_VALIDATION = os.environ.get("RATELIMIT_MPESA_VALIDATION", "1200/minute")
+    RATELIMIT_MPESA_CONFIRMATION = os.environ.get("RATELIMIT_MPESA_CONFIRMATION", "1200/minute")
+
     # ------------------------------------------------------------------
     # Database
     # ------------------------------------------------------------------
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLALCHEMY_ENGINE_OPTIONS: built by create_app() from engine_options()
+
+    # Per-request query count / DB time (rentme/querystats.py)
+    QUERY_STATS_HEADERS = os.environ.get("QUERY_STATS_HEADERS", "1") == "1"
+    # Requests issuing more queries than this are logged as warnings
+    QUERY_STATS_WARN_QUERIES = int(os.environ.get("QUERY_STATS_WARN_QUERIES", 50))
+
+    # Request profiling (rentme/profiling.py): Server-Timing, slow-request log, sampled cProfile
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+    PROFILING_SLOW_MS = float(os.environ.get("PROFILING_SLOW_MS", 500))
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.0))  # 0.01 = 1% of requests
+    PROFILE_ENDPOINTS = os.environ.get("PROFILE_ENDPOINTS", "")  # e.g. "dashboard_data,tenant_list"; empty = all
+    PROFILE_DIR = os.environ.get("PROFILE_DIR")  # default: <instance path>/profiles
+
+    # Prometheus (rentme/metrics.py): web serves /metrics to scrapers sending
+    # "Authorization: Bearer <METRICS_TOKEN>" (unset = refused); the worker
+    # listens on WORKER_METRICS_PORT (unset = off)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    WORKER_METRICS_PORT = os.environ.get("WORKER_METRICS_PORT")
+
+    # ------------------------------------------------------------------
+    # Logging (rentme/logging_setup.py)
+    # ------------------------------------------------------------------
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    # stdout only unless set (e.g. instance/rentme.log); rotated by size
+    LOG_FILE = os.environ.get("LOG_FILE") or None
+    LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+    LOG_MAX_MESSAGE_CHARS = int(os.environ.get("LOG_MAX_MESSAGE_CHARS", 2000))
+    LOG_REDACT_MSISDN = os.environ.get("LOG_REDACT_MSISDN", "1")
+    LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+    # e.g. "/mpesa/payment_callback=0.1,/dashboard_data=0"
+    LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "")
 
     # ------------------------------------------------------------------
     # Email (mail-api.dev)
@@ -44,6 +144,56 @@ class Config:
     AT_API_KEY = os.environ.get("AFRICASTALKING_API_KEY")
     AT_SENDER = os.environ.get("AT_SENDER", "Rentana")
 
+    # ------------------------------------------------------------------
+    # SMS outbox (rentme/sms.py, drained by worker.py)
+    # ------------------------------------------------------------------
+    SMS_PROVIDER = os.environ.get("SMS_PROVIDER", "africastalking")
+    # messages per second, per provider, shared by every worker through
+    # SMS_RATE_STORAGE_URL (Redis); without it each worker process gets the full rate
+    SMS_RATE_LIMITS = os.environ.get("SMS_RATE_LIMITS", "africastalking=20,twilio=1")
+    SMS_RATE_STORAGE_URL = os.environ.get("SMS_RATE_STORAGE_URL") or os.environ.get("REDIS_URL")
+    SMS_BATCH_SIZE = int(os.environ.get("SMS_BATCH_SIZE", 500))
+    SMS_MAX_ATTEMPTS = int(os.environ.get("SMS_MAX_ATTEMPTS", 5))
+    SMS_RETRY_BASE_SECONDS = int(os.environ.get("SMS_RETRY_BASE_SECONDS", 30))
+    SMS_RETRY_MAX_SECONDS = int(os.environ.get("SMS_RETRY_MAX_SECONDS", 3600))
+    SMS_LEASE_SECONDS = int(os.environ.get("SMS_LEASE_SECONDS", 300))
+
+    # ------------------------------------------------------------------
+    # Monthly rent update (jobs.run_monthly_rent_job)
+    # ------------------------------------------------------------------
+    RENT_UPDATE_OWNERS_PER_CHUNK = int(os.environ.get("RENT_UPDATE_OWNERS_PER_CHUNK", 500))
+    # Shard lease for sharded jobs (rentme/jobs.py); must outlast one shard
+    JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", 300))
+
+    # Late fees (rentme/penalties.py): smallest outstanding balance that is charged
+    LATE_FEE_MIN_BALANCE = float(os.environ.get("LATE_FEE_MIN_BALANCE", 1.0))
+
+    # Audit log writer (rentme/audit.py): "buffered" or "sync"
+    AUDIT_MODE = os.environ.get("AUDIT_MODE", "buffered")
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", 2.0))  # seconds
+    AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", 200))
+    AUDIT_BUFFER_MAX = int(os.environ.get("AUDIT_BUFFER_MAX", 10000))
+
+    # Monthly partitions (rentme/partitions.py, Postgres only)
+    PARTITION_MONTHS_AHEAD = int(os.environ.get("PARTITION_MONTHS_AHEAD", 3))
+    PARTITION_ARCHIVE_AFTER_MONTHS = int(os.environ.get("PARTITION_ARCHIVE_AFTER_MONTHS", 24))
+    PARTITION_ARCHIVE_TABLESPACE = os.environ.get("PARTITION_ARCHIVE_TABLESPACE")  # unset = keep in place
+
+    # Worker scheduler (rentme/scheduler.py)
+    # Missed fire times within this window run once when a worker starts
+    SCHEDULER_CATCHUP_DAYS = int(os.environ.get("SCHEDULER_CATCHUP_DAYS", 35))
+    SCHEDULER_MISFIRE_GRACE_SECONDS = int(os.environ.get("SCHEDULER_MISFIRE_GRACE_SECONDS", 3600))
+
+    # ------------------------------------------------------------------
+    # Arrears reminder campaigns (rentme/campaigns.py)
+    # ------------------------------------------------------------------
+    ARREARS_CHUNK_SIZE = int(os.environ.get("ARREARS_CHUNK_SIZE", 1000))
+    ARREARS_MIN_AMOUNT = float(os.environ.get("ARREARS_MIN_AMOUNT", 1.0))
+    # placeholders: {name} {house_no} {amount} {pay_to}
+    ARREARS_REMINDER_TEMPLATE = os.environ.get("ARREARS_REMINDER_TEMPLATE")
+    ARREARS_SMS_PROVIDER = os.environ.get("ARREARS_SMS_PROVIDER")
+    CAMPAIGN_LEASE_SECONDS = int(os.environ.get("CAMPAIGN_LEASE_SECONDS", 300))
+
     # ------------------------------------------------------------------
     # MPESA
     # ------------------------------------------------------------------
@@ -61,6 +211,35 @@ class Config:
 
     CALLBACK_BASE = os.environ.get("CALLBACK_BASE")
 
+    # Confirmation ingestion: "sync" processes inside the request,
+    # "queue" stores the payload, acks immediately and lets worker.py process it
+    MPESA_INGEST_MODE = os.environ.get("MPESA_INGEST_MODE", "sync").lower()
+
+    # Backpressure on /payment_callback/validate when consumers fall behind
+    MPESA_QUEUE_SLOW_DEPTH = int(os.environ.get("MPESA_QUEUE_SLOW_DEPTH", 500))
+    MPESA_QUEUE_REJECT_DEPTH = int(os.environ.get("MPESA_QUEUE_REJECT_DEPTH", 5000))
+    MPESA_QUEUE_SLOW_DELAY_MS = int(os.environ.get("MPESA_QUEUE_SLOW_DELAY_MS", 250))
+    MPESA_QUEUE_DEPTH_TTL = float(os.environ.get("MPESA_QUEUE_DEPTH_TTL", 2))
+
+    # C2B validation index (rentme/tenant_index.py)
+    TENANT_INDEX_TTL = float(os.environ.get("TENANT_INDEX_TTL", 60))
+    TENANT_INDEX_MAX_OWNERS = int(os.environ.get("TENANT_INDEX_MAX_OWNERS", 5000))
+    # Load every partition with the first validation in each web process
+    TENANT_INDEX_WARM_ON_START = os.environ.get("TENANT_INDEX_WARM_ON_START", "1") == "1"
+
+    # Session identity cache (rentme/identity.py): Redis when a URL is set,
+    # per process otherwise; TTL 0 queries the user on every request
+    IDENTITY_CACHE_URL = os.environ.get("IDENTITY_CACHE_URL") or os.environ.get("REDIS_URL")
+    IDENTITY_CACHE_TTL = int(os.environ.get("IDENTITY_CACHE_TTL", 300))
+
+    # Consumer tuning (worker.py)
+    MPESA_QUEUE_BATCH_SIZE = int(os.environ.get("MPESA_QUEUE_BATCH_SIZE", 50))
+    MPESA_QUEUE_MAX_ATTEMPTS = int(os.environ.get("MPESA_QUEUE_MAX_ATTEMPTS", 5))
+    MPESA_QUEUE_LEASE_SECONDS = int(os.environ.get("MPESA_QUEUE_LEASE_SECONDS", 300))
+    # Failed rows wait base * 2^(attempts-1) seconds, capped, before the next try
+    MPESA_QUEUE_RETRY_BASE_SECONDS = int(os.environ.get("MPESA_QUEUE_RETRY_BASE_SECONDS", 30))
+    MPESA_QUEUE_RETRY_MAX_SECONDS = int(os.environ.get("MPESA_QUEUE_RETRY_MAX_SECONDS", 1800))
+
     @property
     def MPESA_CALLBACK_URL(self):
         return f"{self.CALLBACK_BASE.rstrip('/')}/stkpush"
@@ -1,12 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_wtf import CSRFProtect
 from flask_mail import Mail
 
+from rentme.ratelimit import SharedLimiter
+
 db = SQLAlchemy()
 login_manager = LoginManager()
-limiter = Limiter(key_func=get_remote_address)  # do NOT reference app.config here
+limiter = SharedLimiter(key_func=get_remote_address)  # do NOT reference app.config here
 csrf = CSRFProtect()
 mail = Mail()
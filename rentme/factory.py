@@ -0,0 +1,133 @@
+# rentme/factory.py
+"""
+Application factory.
+
+`create_app()` builds a configured Flask app. Nothing heavy happens at import
+time: blueprints (and the modules behind them: M-Pesa handler, settings,
+views) are imported when the app is built, SMS SDKs and the Daraja
+registrar when first used.
+
+- create_app()            # web app: extensions, login, CSRF, limiter, blueprints
+- create_app(web=False)   # worker / scripts: config, logging, db, mail, CLI only
+"""
+
+import os
+import json
+
+from dotenv import load_dotenv
+from flask import Flask, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from rentme.config import Config, engine_options
+from rentme.extensions import db, mail, csrf, limiter, login_manager
+from rentme.green import is_green, make_psycopg2_green
+from rentme.logging_setup import configure_logging
+from rentme.querystats import init_query_stats
+from rentme.profiling import init_profiling
+from rentme.metrics import init_metrics
+
+
+def create_app(config_object=Config, web: bool = True) -> Flask:
+    load_dotenv()
+
+    app = Flask(__name__, static_folder="static", template_folder="templates")
+    app.config.from_object(config_object)
+    configure_logging(app)
+
+    # -----------------------
+    # Environment overrides
+    # -----------------------
+    secret_key = os.getenv("SECRET_KEY")
+    if not secret_key:
+        raise RuntimeError("SECRET_KEY not set")
+
+    app.config["SECRET_KEY"] = secret_key
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL") or app.config.get("SQLALCHEMY_DATABASE_URI")
+
+    # Under gunicorn's gevent worker the stdlib is already patched; psycopg2 needs its own hook
+    green = is_green()
+    if green:
+        make_psycopg2_green()
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config["SQLALCHEMY_DATABASE_URI"], green=green)
+    )
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["MAX_CONTENT_LENGTH"] = 20 * 1024 * 1024
+
+    # -----------------------
+    # Extensions (web and worker)
+    # -----------------------
+    db.init_app(app)
+    mail.init_app(app)
+
+    from rentme.cli import bp as cli_bp
+    app.register_blueprint(cli_bp)
+
+    if web:
+        _init_web(app)
+    return app
+
+
+def _init_web(app: Flask):
+    from flask_migrate import Migrate
+
+    # Client IP / scheme from the trusted proxy headers (rate limit keys, url_for)
+    x_for, x_proto = app.config.get("PROXY_FIX_X_FOR", 0), app.config.get("PROXY_FIX_X_PROTO", 0)
+    if x_for or x_proto:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=x_for, x_proto=x_proto)
+
+    csrf.init_app(app)
+    limiter.init_app(app)
+    init_query_stats(app)
+    init_profiling(app)
+    init_metrics(app)
+    Migrate(app, db)
+
+    login_manager.init_app(app)
+    login_manager.login_view = "login"
+    login_manager.login_message_category = "warning"
+
+    # current_user from a cached identity instead of a query per request
+    from rentme.identity import init_identity
+    init_identity(app)
+
+    _register_blueprints(app)
+
+    # C2B validation lookup index (invalidated on tenant / settings writes)
+    from rentme.tenant_index import init_tenant_index
+    init_tenant_index(app)
+
+    if app.config.get("ENV") == "development":
+        app.before_request(_log_request_info)
+
+
+def _register_blueprints(app: Flask):
+    from rentme.views import bp as main_bp
+    from rentme.mpesa_handler import mpesa_bp
+    from rentme.landlord_settings import landlord_settings_bp
+
+    app.register_blueprint(main_bp)
+    app.register_blueprint(mpesa_bp, url_prefix="/mpesa")
+    app.register_blueprint(landlord_settings_bp, url_prefix="/settings")
+
+    # Safaricom callbacks carry no CSRF token
+    csrf.exempt(mpesa_bp)
+    app.logger.info("✅ M-Pesa Blueprint active at /mpesa")
+
+
+# -----------------------
+# Development-only request logging
+# -----------------------
+def _log_request_info():
+    print("\n====== 📥 NEW REQUEST ======")
+    print(f"➡️ Path:   {request.path}")
+    print(f"➡️ Method: {request.method}")
+
+    try:
+        data = request.get_json(force=True, silent=True)
+        if data:
+            print(f"➡️ Body:\n{json.dumps(data, indent=2)}")
+        else:
+            print("➡️ Body: None")
+    except Exception as e:
+        print(f"⚠️ JSON parse error: {e}")
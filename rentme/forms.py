@@ -4,14 +4,18 @@ from wtforms import (
     StringField,
     PasswordField,
     SubmitField,
-    SelectField
+    SelectField,
+    BooleanField,
+    IntegerField,
+    FloatField
 )
 from wtforms.validators import (
     DataRequired,
     Email,
     EqualTo,
     Optional,
-    Length
+    Length,
+    NumberRange
 )
 
 # ======================================================
@@ -260,6 +264,40 @@ class MPesaSettingsForm(FlaskForm):
         }
     )
 
+    arrears_reminders_enabled = BooleanField("Send SMS reminders to tenants in arrears")
+
+    reminder_quiet_start = IntegerField(
+        "Quiet hours start (0-23)",
+        validators=[Optional(), NumberRange(min=0, max=23)]
+    )
+
+    reminder_quiet_end = IntegerField(
+        "Quiet hours end (0-23)",
+        validators=[Optional(), NumberRange(min=0, max=23)]
+    )
+
+    late_fee_enabled = BooleanField("Charge a late fee when rent is unpaid after the grace period")
+
+    late_fee_grace_days = IntegerField(
+        "Grace period (day of month, 1-28)",
+        validators=[Optional(), NumberRange(min=1, max=28)]
+    )
+
+    late_fee_fixed = FloatField(
+        "Fixed late fee (KES)",
+        validators=[Optional(), NumberRange(min=0)]
+    )
+
+    late_fee_percent = FloatField(
+        "Late fee (% of unpaid rent)",
+        validators=[Optional(), NumberRange(min=0, max=100)]
+    )
+
+    late_fee_max = FloatField(
+        "Maximum late fee per month (KES, optional)",
+        validators=[Optional(), NumberRange(min=0)]
+    )
+
     submit = SubmitField("Save Settings")
 
 
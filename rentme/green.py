@@ -0,0 +1,48 @@
+# rentme/green.py
+"""
+Green-thread (gevent) support.
+
+gunicorn's gevent worker monkey-patches the stdlib (socket, ssl, threading,
+time) before it loads the app, so requests / urllib3 (Daraja, mail-api.dev,
+Africa's Talking, Twilio), redis and smtplib already yield while they wait
+on an upstream. psycopg2 is the exception: it talks to Postgres from C, and
+without a wait callback one slow query stalls every greenlet in the worker.
+
+Provides:
+- is_green() -> bool            # running under gevent's monkey patches
+- make_psycopg2_green()         # idempotent; called by create_app()
+"""
+
+import sys
+
+
+def is_green() -> bool:
+    monkey = sys.modules.get("gevent.monkey")
+    return bool(monkey and monkey.is_module_patched("socket"))
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback: poll the connection, yield to the hub while it blocks."""
+    from psycopg2 import extensions, OperationalError
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state!r}")
+
+
+def make_psycopg2_green():
+    """Route psycopg2 I/O through gevent. Connections opened afterwards are cooperative."""
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        return
+    if extensions.get_wait_callback() is not gevent_wait_callback:
+        extensions.set_wait_callback(gevent_wait_callback)
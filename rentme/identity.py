@@ -0,0 +1,254 @@
+# rentme/identity.py
+"""
+Session identity without a user query per request.
+
+Flask-Login calls load_user on every authenticated request (the dashboard
+polls every 15 s). Instead of loading the User row it reads a compact
+identity (id, is_admin, email, last_logout) from a cache:
+
+- IDENTITY_CACHE_URL / REDIS_URL set: one Redis key per user, shared by all
+  workers, so a logout or password change is seen everywhere at once
+- otherwise a per-process dict; another process notices a logout after at
+  most IDENTITY_CACHE_TTL seconds
+
+IDENTITY_CACHE_TTL=0 turns the cache off (one identity query per request).
+
+Sessions carry created_at (set at login); a session older than the user's
+last_logout is rejected. Logging out and changing the password both move
+last_logout (User.set_password). A write to those columns marks the user in
+the session (mapper event) and the cached identity is dropped once the
+transaction commits; dropping it at flush would let a request still reading
+the old row cache it again before the commit.
+
+current_user is a LazyUser: id, is_admin, email and the Flask-Login
+properties come from the identity; anything else (check_password, setting
+last_logout, ...) loads the User row once for the request.
+
+Provides:
+- init_identity(app)
+- load_identity(user_id) -> LazyUser or None    # the user_loader
+- mark_session_start()                          # call right after login_user
+- forget(user_id)
+"""
+
+import json
+import time
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from flask import abort, session
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+
+from rentme.extensions import db
+from rentme.models import User
+
+
+log = logging.getLogger(__name__)
+
+Identity = namedtuple("Identity", "id is_admin email last_logout")   # last_logout: epoch seconds or 0
+KEY_PREFIX = "rentme:ident:"
+WATCHED = ("is_admin", "email", "last_logout", "password_hash")
+
+
+def _epoch(dt) -> float:
+    return dt.replace(tzinfo=timezone.utc).timestamp() if dt else 0.0
+
+
+# ---------------------------------------------------------------------
+# Stores
+# ---------------------------------------------------------------------
+class _LocalStore:
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = {}   # user id -> (expires at, Identity)
+
+    def get(self, user_id):
+        hit = self._items.get(user_id)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+        return None
+
+    def put(self, ident: Identity):
+        with self._lock:
+            self._items[ident.id] = (time.monotonic() + self.ttl, ident)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+
+class _RedisStore:
+    def __init__(self, url: str, ttl: int):
+        import redis
+
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, user_id):
+        raw = self._redis.get(f"{KEY_PREFIX}{user_id}")
+        return Identity(*json.loads(raw)) if raw else None
+
+    def put(self, ident: Identity):
+        self._redis.setex(f"{KEY_PREFIX}{ident.id}", self.ttl, json.dumps(ident))
+
+    def delete(self, user_id):
+        self._redis.delete(f"{KEY_PREFIX}{user_id}")
+
+
+_store = None
+
+
+def _cache(op, *args):
+    """Run a store operation; a cache outage only costs the query it would have saved."""
+    if _store is None:
+        return None
+    try:
+        return getattr(_store, op)(*args)
+    except Exception as e:
+        log.warning("Identity cache %s failed: %s", op, e)
+        return None
+
+
+# ---------------------------------------------------------------------
+# Identity
+# ---------------------------------------------------------------------
+def _identity_for(user_id: int):
+    ident = _cache("get", user_id)
+    if ident is not None:
+        return ident
+    row = (
+        db.session.query(User.id, User.is_admin, User.email, User.last_logout)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    ident = Identity(row.id, bool(row.is_admin), row.email, _epoch(row.last_logout))
+    _cache("put", ident)
+    return ident
+
+
+def forget(user_id):
+    _cache("delete", user_id)
+
+
+def mark_session_start():
+    session["created_at"] = time.time()
+
+
+class LazyUser(UserMixin):
+    """current_user backed by an Identity; the User row loads on first use of anything else."""
+
+    def __init__(self, ident: Identity):
+        object.__setattr__(self, "_ident", ident)
+        object.__setattr__(self, "_row", None)
+
+    @property
+    def id(self):
+        return self._ident.id
+
+    @property
+    def is_admin(self):
+        return self._ident.is_admin
+
+    @property
+    def email(self):
+        return self._ident.email
+
+    def get_id(self):
+        return str(self._ident.id)
+
+    def _load(self) -> User:
+        row = self._row
+        if row is None:
+            row = db.session.get(User, self._ident.id)
+            if row is None:
+                forget(self._ident.id)
+                abort(401)
+            object.__setattr__(self, "_row", row)
+        return row
+
+    def __getattr__(self, name):
+        # Only reached for attributes not defined above
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __repr__(self):
+        return f"<LazyUser {self._ident.id}>"
+
+
+def load_identity(user_id):
+    try:
+        ident = _identity_for(int(user_id))
+    except ValueError:
+        return None
+    if ident is None:
+        return None
+
+    # Reject sessions created before the user's last logout / password change
+    created_at = session.get("created_at")
+    if isinstance(created_at, str):
+        # Sessions from before epoch timestamps
+        try:
+            created_at = _epoch(datetime.fromisoformat(created_at))
+        except ValueError:
+            created_at = None
+    if created_at is not None and created_at < ident.last_logout:
+        return None
+    return LazyUser(ident)
+
+
+# ---------------------------------------------------------------------
+# Setup
+# ---------------------------------------------------------------------
+def _on_user_write(mapper, connection, target):
+    state = inspect(target)
+    if state.deleted or any(state.attrs[col].history.has_changes() for col in WATCHED):
+        session = object_session(target)
+        if session is None:
+            forget(target.id)
+        else:
+            session.info.setdefault("identity_changed", set()).add(target.id)
+
+
+def _after_commit(session):
+    for user_id in session.info.pop("identity_changed", ()):
+        forget(user_id)
+
+
+def _after_rollback(session):
+    session.info.pop("identity_changed", None)
+
+
+_listeners_installed = False
+
+
+def init_identity(app):
+    global _store, _listeners_installed
+
+    ttl = int(app.config.get("IDENTITY_CACHE_TTL", 300))
+    url = app.config.get("IDENTITY_CACHE_URL")
+    if ttl <= 0:
+        _store = None
+    elif url:
+        _store = _RedisStore(url, ttl)
+    else:
+        _store = _LocalStore(ttl)
+
+    if not _listeners_installed:
+        event.listen(User, "after_update", _on_user_write)
+        event.listen(User, "after_delete", _on_user_write)
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_rollback", _after_rollback)
+        _listeners_installed = True
+
+    log.info("Session identity cache: %s", type(_store).__name__.strip("_") if _store else "off")
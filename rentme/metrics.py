@@ -0,0 +1,185 @@
+# rentme/metrics.py
+"""
+Prometheus metrics.
+
+Web: GET /metrics with bearer METRICS_TOKEN (refused while no token is
+configured). Worker: its own HTTP listener on WORKER_METRICS_PORT. Under gunicorn every worker process writes
+its samples to PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py) and
+/metrics merges them, so counters and histograms add up across workers no
+matter which one serves the scrape.
+
+Metrics:
+- rentme_http_request_duration_seconds{method,endpoint,status}
+- rentme_mpesa_callbacks_total{kind,outcome}     ok / duplicate_tx / tenant_not_found / db_error / ...
+- rentme_outbound_request_duration_seconds{provider}, rentme_outbound_errors_total{provider}
+- rentme_db_pool_checked_out, rentme_db_pool_overflow   (summed over live processes)
+- rentme_job_duration_seconds{job,status}, rentme_job_last_success_timestamp_seconds{job}
+- rentme_queue_depth{queue}                       mpesa_inbox / sms_outbox, sampled per scrape
+
+Provides:
+- init_metrics(app) / start_worker_metrics(app)
+- record_callback(kind, outcome)
+- observe_outbound(provider, seconds, error=False) / timed_outbound(provider)
+- observe_job(job_id, status, seconds, completed=True)
+"""
+
+import os
+import hmac
+import time
+import logging
+from contextlib import contextmanager
+
+from flask import g, request, Response, abort, current_app
+from prometheus_client import (
+    Counter, Histogram, Gauge, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest, multiprocess,
+)
+
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# ---------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------
+HTTP_LATENCY = Histogram(
+    "rentme_http_request_duration_seconds", "Request latency by endpoint.",
+    ["method", "endpoint", "status"], buckets=LATENCY_BUCKETS,
+)
+CALLBACKS = Counter(
+    "rentme_mpesa_callbacks_total", "M-Pesa callbacks by outcome.", ["kind", "outcome"],
+)
+OUTBOUND_LATENCY = Histogram(
+    "rentme_outbound_request_duration_seconds", "Calls to Daraja / SMS / mail providers.",
+    ["provider"], buckets=LATENCY_BUCKETS,
+)
+OUTBOUND_ERRORS = Counter(
+    "rentme_outbound_errors_total", "Failed provider calls.", ["provider"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "rentme_db_pool_checked_out", "Connections in use.", multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "rentme_db_pool_overflow", "Connections opened beyond pool_size.", multiprocess_mode="livesum",
+)
+JOB_DURATION = Histogram(
+    "rentme_job_duration_seconds", "Scheduled job runs.", ["job", "status"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+JOB_LAST_SUCCESS = Gauge(
+    "rentme_job_last_success_timestamp_seconds", "Last successful run (unix time).", ["job"],
+    multiprocess_mode="max",
+)
+QUEUE_DEPTH = Gauge(
+    "rentme_queue_depth", "Rows waiting to be processed.", ["queue"], multiprocess_mode="mostrecent",
+)
+
+
+# ---------------------------------------------------------------------
+# Recording helpers (cheap; safe outside a request)
+# ---------------------------------------------------------------------
+def record_callback(kind: str, outcome: str):
+    CALLBACKS.labels(kind, outcome or "unknown").inc()
+
+
+def observe_outbound(provider: str, seconds: float, error: bool = False):
+    OUTBOUND_LATENCY.labels(provider).observe(seconds)
+    if error:
+        OUTBOUND_ERRORS.labels(provider).inc()
+
+
+@contextmanager
+def timed_outbound(provider: str):
+    """Time a provider call; an exception counts as an error and is re-raised."""
+    started = time.monotonic()
+    try:
+        yield
+    except Exception:
+        observe_outbound(provider, time.monotonic() - started, error=True)
+        raise
+    observe_outbound(provider, time.monotonic() - started)
+
+
+def observe_job(job_id: str, status: str, seconds: float, completed: bool = True):
+    """`completed`: False when a cooperative run left the closing to another process."""
+    JOB_DURATION.labels(job_id, status).observe(seconds)
+    if status == "success" and completed:
+        JOB_LAST_SUCCESS.labels(job_id).set(time.time())
+
+
+def _sample_pool():
+    from rentme.extensions import db
+
+    pool = db.engine.pool
+    # NullPool (PgBouncer mode) keeps no counts
+    if hasattr(pool, "checkedout"):
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def _sample_queues():
+    from sqlalchemy import func
+    from rentme.extensions import db
+    from rentme.models import SmsOutbox
+    from rentme.mpesa_queue import queue_depth
+
+    try:
+        QUEUE_DEPTH.labels("mpesa_inbox").set(queue_depth())
+        QUEUE_DEPTH.labels("sms_outbox").set(
+            db.session.query(func.count(SmsOutbox.id)).filter(SmsOutbox.status == "pending").scalar() or 0
+        )
+    except Exception:
+        db.session.rollback()
+        log.exception("Queue depth sampling failed")
+
+
+# ---------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------
+def _registry():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    from prometheus_client import REGISTRY
+    return REGISTRY
+
+
+def metrics_view():
+    token = current_app.config.get("METRICS_TOKEN")
+    given = request.headers.get("Authorization", "")
+    if not token or not hmac.compare_digest(given.encode(), f"Bearer {token}".encode()):
+        abort(403)
+    _sample_pool()
+    _sample_queues()
+    return Response(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _metrics_observe(response):
+        started = g.get("_metrics_start")
+        if started is not None and request.endpoint not in ("static", "metrics"):
+            HTTP_LATENCY.labels(
+                request.method, request.endpoint or "unmatched", str(response.status_code)
+            ).observe(time.perf_counter() - started)
+            _sample_pool()
+        return response
+
+
+def start_worker_metrics(app):
+    """Serve /metrics from worker.py on WORKER_METRICS_PORT (unset = off)."""
+    port = app.config.get("WORKER_METRICS_PORT")
+    if not port:
+        return
+    from prometheus_client import start_http_server
+
+    start_http_server(int(port), registry=_registry())
+    log.info("Worker metrics on :%s/metrics", port)
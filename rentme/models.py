@@ -1,10 +1,10 @@
 # models.py
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
-import pytz
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import Column, DateTime
+from sqlalchemy import Column, DateTime, event, inspect
+from sqlalchemy.orm import object_session
 from rentme.extensions import db 
 
 
@@ -16,9 +16,73 @@ class JobLock(db.Model):
     last_run = db.Column(db.Date, nullable=True)
     locked_at = db.Column(db.DateTime, nullable=True)
 
+    # Lease: the holder must heartbeat before lease_until or others may take over
+    holder = db.Column(db.String(100), nullable=True)
+    lease_until = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
     def __repr__(self):
         return f"<JobLock {self.job_name}>"
 
+
+class JobRun(db.Model):
+    """One execution of a scheduled job (rentme/scheduler.py)."""
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        db.Index("ix_job_runs_job_started", "job_name", "started_at"),
+        db.Index("ix_job_runs_job_scheduled", "job_name", "scheduled_for"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False)
+    scheduled_for = db.Column(db.DateTime, nullable=True)   # UTC fire time this run covers
+    holder = db.Column(db.String(100), nullable=True)
+
+    # running | success | skipped | failed
+    status = db.Column(db.String(20), nullable=False, default="running")
+    rows = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.String(500), nullable=True)
+    catch_up = db.Column(db.Boolean, nullable=False, default=False)
+
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_ms = db.Column(db.Integer, nullable=True)
+
+    def __repr__(self):
+        return f"<JobRun {self.job_name} {self.status} {self.duration_ms}ms>"
+
+
+class JobShard(db.Model):
+    """
+    One unit of a sharded job run: [range_lo, range_hi) of some key
+    (owner id for rent jobs). Claimed with a lease; done shards are skipped.
+    """
+    __tablename__ = "job_shards"
+    __table_args__ = (
+        db.UniqueConstraint("job_name", "run_key", "shard_no", name="uq_job_shards_run_shard"),
+        db.Index("ix_job_shards_claim", "job_name", "run_key", "status"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False)
+    run_key = db.Column(db.String(20), nullable=False)     # e.g. "2026-10-01"
+    shard_no = db.Column(db.Integer, nullable=False)
+    range_lo = db.Column(db.Integer, nullable=False)
+    range_hi = db.Column(db.Integer, nullable=False)
+
+    # pending | running | done
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    holder = db.Column(db.String(100), nullable=True)
+    lease_until = db.Column(db.DateTime, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    rows_affected = db.Column(db.Integer, nullable=True)
+
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<JobShard {self.job_name} {self.run_key} #{self.shard_no} {self.status}>"
+
 class MpesaCredential(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -97,6 +161,8 @@ class User(db.Model, UserMixin):
     # Auth helpers
     def set_password(self, pwd: str):
         self.password_hash = generate_password_hash(pwd)
+        # A new password ends every session opened before it (rentme/identity.py)
+        self.last_logout = datetime.utcnow()
 
     def check_password(self, pwd: str) -> bool:
         return check_password_hash(self.password_hash, pwd)
@@ -127,6 +193,11 @@ class LandlordSettings(db.Model):
     mpesa_mode = db.Column(db.String(20), default="production", nullable=False)  # 'production' or 'sandbox'
     callback_url = db.Column(db.String(512), nullable=True)  # optional per-landlord callback override
 
+    # Arrears reminder campaigns (rentme/campaigns.py)
+    arrears_reminders_enabled = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    reminder_quiet_start = db.Column(db.Integer, nullable=True)  # hour 0-23, EAT
+    reminder_quiet_end = db.Column(db.Integer, nullable=True)    # hour 0-23, EAT
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -137,13 +208,38 @@ class LandlordSettings(db.Model):
         return f"<LandlordSettings user_id={self.user_id} mpesa_mode={self.mpesa_mode}>"
 
 
+class PenaltyRule(db.Model):
+    """
+    Per-landlord late fee (rentme/penalties.py): when a month's rent is still
+    outstanding after `grace_days`, charge fixed_amount + percent of that
+    month's unpaid rent, capped at max_amount.
+    """
+    __tablename__ = "penalty_rule"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, unique=True)
+    enabled = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    grace_days = db.Column(db.Integer, nullable=False, default=5)        # fee if unpaid after day N
+    fixed_amount = db.Column(db.Float, nullable=False, default=0.0)      # KES
+    percent = db.Column(db.Float, nullable=False, default=0.0)           # % of the month's unpaid rent
+    max_amount = db.Column(db.Float, nullable=True)                      # cap per month, KES
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = db.relationship("User", backref=db.backref("penalty_rule", uselist=False))
+
+    def __repr__(self):
+        return f"<PenaltyRule user_id={self.user_id} grace={self.grace_days} enabled={self.enabled}>"
+
+
 # ==============================================================
 # TENANT MODEL (Each tenant belongs to a specific user)
 # ==============================================================
 class Tenant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
-    owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
     name = db.Column(db.String(180), nullable=False)
     phone = db.Column(db.String(80), nullable=False)
     national_id = db.Column(db.String(80))
@@ -153,17 +249,38 @@ class Tenant(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    last_rent_update = db.Column(db.Date, nullable=False, default=date.today)
-    amount_due = db.Column(db.Float, nullable=False, default=0.0)
-
     # Relationship
     payments = db.relationship("Payment", backref="tenant", cascade="all, delete-orphan")
+    charges = db.relationship("RentCharge", backref="tenant", cascade="all, delete-orphan")
 
     # -----------------------
     # Tenant Rent Calculations
+    # Ledger based: balance = SUM(payments) - SUM(rent charges).
+    # List views prefetch both sums with ledger.attach_balances().
     # -----------------------
+    def _cached_totals(self):
+        return self.__dict__.get("_ledger_totals")
+
     def total_paid(self) -> float:
-        return sum((p.amount or 0.0) for p in self.payments) if self.payments else 0.0
+        cached = self._cached_totals()
+        if cached is not None:
+            return cached[1]
+        return float(
+            db.session.query(db.func.coalesce(db.func.sum(Payment.amount), 0.0))
+            .filter(Payment.tenant_id == self.id)
+            .scalar()
+        )
+
+    def total_charged(self, upto: date = None) -> float:
+        cached = self._cached_totals()
+        if cached is not None and upto is None:
+            return cached[0]
+        q = db.session.query(db.func.coalesce(db.func.sum(RentCharge.amount), 0.0)).filter(
+            RentCharge.tenant_id == self.id
+        )
+        if upto is not None:
+            q = q.filter(RentCharge.period <= upto)
+        return float(q.scalar())
 
     def months_since_move_in(self, upto: date = None) -> int:
         upto = upto or date.today()
@@ -173,103 +290,449 @@ class Tenant(db.Model):
         return rd.years * 12 + rd.months + (1 if rd.days >= 0 else 0)
 
     def total_due_since(self, upto: date = None) -> float:
-        return self.months_since_move_in(upto) * float(self.monthly_rent)
+        return self.total_charged(upto)
 
     def balance_calc(self, upto: date = None) -> float:
-        return round(self.total_paid() - self.total_due_since(upto), 2)
+        return round(self.total_paid() - self.total_charged(upto), 2)
 
     @property
     def balance(self) -> float:
         return self.balance_calc()
 
+    @property
+    def amount_due(self) -> float:
+        """Arrears owed (0 when in credit); the ledger is the only balance source."""
+        return max(0.0, -self.balance)
+
     def formatted_balance(self) -> str:
         bal = self.balance
         sign = "+" if bal >= 0 else "-"
         return f"{sign}{abs(bal):,.2f}"
 
-    def update_monthly_due(self):
-        today = date.today()
-        if self.last_rent_update.month == today.month and self.last_rent_update.year == today.year:
-            return
-
-        months_behind = (
-            (today.year - self.last_rent_update.year) * 12 +
-            (today.month - self.last_rent_update.month)
-        )
-        if months_behind > 0:
-            self.amount_due += self.monthly_rent * months_behind
-            self.last_rent_update = today
-            db.session.commit()
-
-
 
 # ==============================================================
 # PAYMENT MODEL
 # Used for SendMoney, Paybill, Till, and Daraja STK Push
 # ==============================================================
+# On Postgres `payment` is range-partitioned by month on paid_at (migration
+# 5e1a7c9d3f46, rentme/partitions.py): the real primary key is (id, paid_at)
+# and transaction_id uniqueness is enforced through the `payment_txn`
+# companion table, kept in sync by a trigger. The ORM mapping is unchanged.
 class Payment(db.Model):
+    __table_args__ = (
+        db.Index("ix_payment_tenant_paid_at", "tenant_id", "paid_at"),
+        # Payments arrive in time order: a BRIN index keeps month range scans cheap at almost no size
+        db.Index("ix_payment_paid_at_brin", "paid_at", postgresql_using="brin"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     transaction_id = db.Column(db.String(100), unique=True, nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    paid_at = db.Column(db.DateTime, nullable=False)
+    # active_history: the rollup hooks need the old amount / month / tenant
+    # even when the row was expired before the change
+    amount = db.column_property(db.Column(db.Float, nullable=False), active_history=True)
+    paid_at = db.column_property(db.Column(db.DateTime, nullable=False), active_history=True)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
     note = db.Column(db.String(255))
 
     # Foreign Keys
-    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'))
+    tenant_id = db.column_property(db.Column(db.Integer, db.ForeignKey('tenant.id'), index=True), active_history=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
 
     # CheckoutRequestID for Daraja callbacks routing
     checkout_request_id = db.Column(db.String(100), index=True, nullable=True)
 
-    def apply_payment(self):
-        """Reduce tenant’s amount_due when payment is made"""
-        if self.tenant:
-            self.tenant.amount_due = max(0.0, self.tenant.amount_due - self.amount)
-            self.tenant.last_rent_update = date.today()
-            db.session.commit()
+
+
+# ==============================================================
+# RENT CHARGE LEDGER
+# One row per tenant, billing period (first of month) and kind (rentme/ledger.py)
+# ==============================================================
+class RentCharge(db.Model):
+    __tablename__ = "rent_charge"
+    __table_args__ = (
+        db.UniqueConstraint("tenant_id", "period", "kind", name="uq_rent_charge_tenant_period_kind"),
+        db.Index("ix_rent_charge_owner_period", "owner_id", "period"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey("tenant.id", ondelete="CASCADE"), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    period = db.Column(db.Date, nullable=False)
+    kind = db.Column(db.String(20), nullable=False, default="rent")
+    amount = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<RentCharge tenant={self.tenant_id} {self.period} {self.kind} {self.amount}>"
 
 
 
+# ==============================================================
+# MONTHLY CLOSE
+# One MonthClose per (landlord, period) and one snapshot per tenant in it.
+# Written once by rentme/month_close.py; never updated afterwards.
+# ==============================================================
+class MonthClose(db.Model):
+    __tablename__ = "month_close"
+    __table_args__ = (
+        db.UniqueConstraint("owner_id", "period", name="uq_month_close_owner_period"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    period = db.Column(db.Date, nullable=False)    # first day of the month
+
+    tenants = db.Column(db.Integer, nullable=False, default=0)
+    opening = db.Column(db.Float, nullable=False, default=0.0)
+    charged = db.Column(db.Float, nullable=False, default=0.0)
+    paid = db.Column(db.Float, nullable=False, default=0.0)
+    closing = db.Column(db.Float, nullable=False, default=0.0)
+
+    closed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<MonthClose owner={self.owner_id} {self.period}>"
+
+
+class TenantMonthSnapshot(db.Model):
+    __tablename__ = "tenant_month_snapshot"
+    __table_args__ = (
+        db.UniqueConstraint("tenant_id", "period", name="uq_tenant_month_snapshot_tenant_period"),
+        db.Index("ix_tenant_month_snapshot_owner_period", "owner_id", "period"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # No FK on tenant_id: history outlives deleted tenants
+    tenant_id = db.Column(db.Integer, nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    period = db.Column(db.Date, nullable=False)
+    tenant_name = db.Column(db.String(180), nullable=True)
+    house_no = db.Column(db.String(80), nullable=True)
+
+    # Balances use the Tenant.balance sign: paid - charged (negative = arrears)
+    opening = db.Column(db.Float, nullable=False, default=0.0)
+    charged = db.Column(db.Float, nullable=False, default=0.0)
+    paid = db.Column(db.Float, nullable=False, default=0.0)
+    closing = db.Column(db.Float, nullable=False, default=0.0)
+    days_late = db.Column(db.Integer, nullable=False, default=0)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "tenant_id": self.tenant_id,
+            "name": self.tenant_name,
+            "house_no": self.house_no,
+            "period": self.period.strftime("%Y-%m"),
+            "opening": self.opening,
+            "charged": self.charged,
+            "paid": self.paid,
+            "closing": self.closing,
+            "days_late": self.days_late,
+        }
+
+
+@event.listens_for(MonthClose, "before_update")
+@event.listens_for(MonthClose, "before_delete")
+@event.listens_for(TenantMonthSnapshot, "before_update")
+@event.listens_for(TenantMonthSnapshot, "before_delete")
+def _closed_months_are_immutable(mapper, connection, target):
+    raise RuntimeError(f"{target!r} belongs to a closed month and cannot be changed")
+
+
+# ==============================================================
+# ARREARS AGING ROLLUP (rentme/aging.py)
+# Per-tenant buckets of unpaid charges by age; landlord sums are added up on
+# read. Kept current on payment / charge writes and rebuilt by the monthly job.
+# ==============================================================
+class TenantAging(db.Model):
+    __tablename__ = "tenant_aging"
+    __table_args__ = (
+        db.Index("ix_tenant_aging_owner_total", "owner_id", "total"),
+        db.Index("ix_tenant_aging_owner_0_30", "owner_id", "days_0_30"),
+        db.Index("ix_tenant_aging_owner_31_60", "owner_id", "days_31_60"),
+        db.Index("ix_tenant_aging_owner_61_90", "owner_id", "days_61_90"),
+        db.Index("ix_tenant_aging_owner_90_plus", "owner_id", "days_90_plus"),
+    )
+
+    # Only tenants in arrears have a row
+    tenant_id = db.Column(db.Integer, db.ForeignKey("tenant.id", ondelete="CASCADE"), primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    days_0_30 = db.Column(db.Float, nullable=False, default=0.0)
+    days_31_60 = db.Column(db.Float, nullable=False, default=0.0)
+    days_61_90 = db.Column(db.Float, nullable=False, default=0.0)
+    days_90_plus = db.Column(db.Float, nullable=False, default=0.0)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    as_of = db.Column(db.Date, nullable=False)      # ages are counted to this date
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TenantAging tenant={self.tenant_id} total={self.total}>"
+
+
+# ==============================================================
+# COLLECTIONS ROLLUP (rentme/collection_stats.py)
+# Collected vs expected per landlord and month, for the collections chart.
+# ==============================================================
+class CollectionMonth(db.Model):
+    __tablename__ = "collection_month"
+
+    owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    period = db.Column(db.Date, primary_key=True)     # first day of the month
+    collected = db.Column(db.Float, nullable=False, default=0.0)
+    expected = db.Column(db.Float, nullable=False, default=0.0)
+    tenants_charged = db.Column(db.Integer, nullable=False, default=0)
+    tenants_paid = db.Column(db.Integer, nullable=False, default=0)
+    median_days_late = db.Column(db.Float, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "period": self.period.strftime("%Y-%m"),
+            "collected": self.collected,
+            "expected": self.expected,
+            "tenants_charged": self.tenants_charged,
+            "tenants_paid": self.tenants_paid,
+            "median_days_late": self.median_days_late,
+        }
+
+
+# Payments written in a flush refresh the rollups in the same transaction
+# (after the flush, so every payment in it is visible): the tenants' aging,
+# and the amount / payment count each (tenant, month) gained or lost, added
+# to the collections rollup.
+def _payment_delta(session, tenant_id, paid_at, amount, count):
+    if tenant_id and paid_at:
+        key = (tenant_id, paid_at.date().replace(day=1))
+        d = session.info.setdefault("payment_deltas", {}).setdefault(key, [0.0, 0])
+        d[0] += (amount or 0.0) * count
+        d[1] += count
+
+
+def _previous(state, attr):
+    history = state.attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(state.object, attr)
+
+
+@event.listens_for(Payment, "after_insert")
+def _payment_inserted(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _payment_delta(session, target.tenant_id, target.paid_at, target.amount, 1)
+
+
+@event.listens_for(Payment, "after_update")
+def _payment_updated(mapper, connection, target):
+    session = object_session(target)
+    state = inspect(target)
+    if session is None or not any(state.attrs[a].history.has_changes() for a in ("tenant_id", "paid_at", "amount")):
+        return
+    # A payment moved to another tenant or month counts as a delete and an insert
+    _payment_delta(session, _previous(state, "tenant_id"), _previous(state, "paid_at"), _previous(state, "amount"), -1)
+    _payment_delta(session, target.tenant_id, target.paid_at, target.amount, 1)
+
+
+@event.listens_for(Payment, "after_delete")
+def _payment_deleted(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        state = inspect(target)
+        _payment_delta(session, _previous(state, "tenant_id"), _previous(state, "paid_at"), _previous(state, "amount"), -1)
+
+
+# Tenant aging rows go before the tenant rows (the FK only cascades on
+# Postgres): all deleted tenants of a flush in one pass, then per row for
+# tenants that only became deletes during the flush (orphans).
+@event.listens_for(db.session, "before_flush")
+def _drop_deleted_tenants_aging(session, flush_context, instances):
+    ids = {o.id for o in session.deleted if isinstance(o, Tenant) and o.id}
+    if ids:
+        from rentme.aging import forget_tenants
+        forget_tenants(ids, connection=session.connection())
+        session.info.setdefault("aging_forgotten", set()).update(ids)
+
+
+@event.listens_for(Tenant, "before_delete")
+def _drop_tenant_aging(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and target.id in session.info.get("aging_forgotten", ()):
+        return
+    from rentme.aging import forget_tenants
+    forget_tenants([target.id], connection=connection)
+
+
+@event.listens_for(db.session, "after_flush")
+def _refresh_payment_rollups(session, flush_context):
+    forgotten = session.info.pop("aging_forgotten", ())
+    deltas = session.info.pop("payment_deltas", None)
+    # Payments of tenants deleted in this flush: the nightly rebuild drops them
+    if deltas and forgotten:
+        deltas = {k: d for k, d in deltas.items() if k[0] not in forgotten}
+    if deltas:
+        from rentme.aging import refresh_tenants
+        from rentme.collection_stats import add_payment_deltas
+        connection = session.connection()
+        refresh_tenants({t for t, _ in deltas}, connection=connection)
+        add_payment_deltas(deltas, connection=connection)
+
+
 # ==============================================================
 # AUDIT LOG MODEL
 # ==============================================================
+# Written in batches by rentme/audit.py. On Postgres the table is range-
+# partitioned by month on created_at (migration 6f2b8d0e4a57), so the real
+# primary key is (id, created_at).
 class AuditLog(db.Model):
+    __table_args__ = (
+        db.Index("ix_audit_log_user_created", "user_id", "created_at"),
+        db.Index("ix_audit_log_created", "created_at"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
     action = db.Column(db.String(200), nullable=False)
     meta = db.Column(db.String(1000))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+
+# ==============================================================
+# MPESA CALLBACK INBOX
+# Confirmations accepted in "queue" ingest mode, drained by worker.py
+# ==============================================================
+class MpesaCallback(db.Model):
+    __tablename__ = "mpesa_callback"
+    __table_args__ = (
+        db.Index("ix_mpesa_callback_status_due", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default="confirmation")
+    # Daraja retries a confirmation it saw no ack for: one row per TransID
+    tx_id = db.Column(db.String(100), nullable=True, unique=True, index=True)
+    payload = db.Column(db.Text, nullable=False)
+
+    # pending | processing | done | failed
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(500), nullable=True)
+
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<MpesaCallback {self.id} tx={self.tx_id} status={self.status}>"
+
+
+
+# ==============================================================
+# SMS OUTBOX
+# Written on the request path, drained by worker.py (rentme/sms.py)
+# ==============================================================
+class SmsOutbox(db.Model):
+    __tablename__ = "sms_outbox"
+    __table_args__ = (
+        db.Index("ix_sms_outbox_status_due", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(20), nullable=False, default="africastalking")
+    recipient = db.Column(db.String(20), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+
+    # (recipient, template, period) -> at most one message
+    template = db.Column(db.String(50), nullable=True)
+    period = db.Column(db.String(50), nullable=True)
+    dedupe_key = db.Column(db.String(160), unique=True, nullable=True)
+
+    # pending | sending | sent | failed
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(500), nullable=True)
+    provider_message_id = db.Column(db.String(100), nullable=True)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<SmsOutbox {self.id} to={self.recipient} status={self.status}>"
+
+
+
+# ==============================================================
+# REMINDER CAMPAIGNS
+# One row per (kind, period); `cursor` is the last tenant id handled
+# ==============================================================
+class ReminderCampaign(db.Model):
+    __tablename__ = "reminder_campaign"
+    __table_args__ = (
+        db.UniqueConstraint("kind", "period", name="uq_reminder_campaign_kind_period"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False, default="arrears")
+    period = db.Column(db.String(20), nullable=False)   # e.g. "2026-10"
+
+    # running | done | failed
+    status = db.Column(db.String(20), nullable=False, default="running")
+    cursor = db.Column(db.Integer, nullable=False, default=0)
+    selected = db.Column(db.Integer, nullable=False, default=0)
+    queued = db.Column(db.Integer, nullable=False, default=0)
+    deferred = db.Column(db.Integer, nullable=False, default=0)  # held back by quiet hours
+    last_error = db.Column(db.String(500), nullable=True)
+
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)    # heartbeat of the running process
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ReminderCampaign {self.kind} {self.period} status={self.status} cursor={self.cursor}>"
+
+
+
+# ==============================================================
+# INSERT ... ON CONFLICT DO NOTHING (Postgres / SQLite)
+# ==============================================================
+def _dialect_insert(model):
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"ON CONFLICT not supported on {dialect}")
+    return insert(model.__table__)
+
+
+def insert_ignore(model, conflict_cols):
+    """Return an INSERT for `model` that skips rows hitting a unique key."""
+    return _dialect_insert(model).on_conflict_do_nothing(index_elements=list(conflict_cols))
+
+
+def upsert(model, conflict_cols, set_=None):
+    """
+    Return an INSERT for `model` that updates rows hitting a unique key.
+    `set_(excluded)` returns the values to SET from `excluded` (the row that
+    was not inserted); by default every other column is overwritten.
+    """
+    stmt = _dialect_insert(model)
+    if set_ is None:
+        values = {c.name: stmt.excluded[c.name] for c in model.__table__.columns if c.name not in conflict_cols}
+    else:
+        values = set_(stmt.excluded)
+    return stmt.on_conflict_do_update(index_elements=list(conflict_cols), set_=values)
 
 
 
 # ==============================================================
-# AUTO RENT UPDATER (Kenya Time)
+# OWNER RANGES
+# Sharded jobs (rentme/jobs.py) split the work by owner_id range
 # ==============================================================
-def auto_update_all_unpaid_rents():
-    kenya_tz = pytz.timezone("Africa/Nairobi")
-    now = datetime.now(kenya_tz)
-    today = now.date()
-
-    tenants = Tenant.query.all()
-    updated = 0
-
-    for t in tenants:
-        months_behind = (today.year - t.last_rent_update.year) * 12 + (today.month - t.last_rent_update.month)
-        if months_behind > 0:
-            t.amount_due += t.monthly_rent * months_behind
-            t.last_rent_update = today
-            updated += 1
-
-    if updated > 0:
-        db.session.commit()
-        db.session.add(AuditLog(
-            user_id=None,
-            action="Auto rent update",
-            meta=f"{updated} tenants updated on {today.isoformat()} (EAT)"
-        ))
-        db.session.commit()
-
-    return updated
+def owner_id_bounds():
+    """(min, max) tenant owner_id, or (None, None) when there are no tenants."""
+    return db.session.query(db.func.min(Tenant.owner_id), db.func.max(Tenant.owner_id)).one()
@@ -0,0 +1,210 @@
+# rentme/month_close.py
+"""
+Month-end close.
+
+Closing (landlord, month) writes one `tenant_month_snapshot` row per tenant
+(opening, charged, paid, closing, days late) plus a `month_close` header with
+the landlord's totals. Historical reports and statements read only these
+rows, indexed on (owner_id, period), and never replay payment history.
+
+- opening is the previous month's snapshot closing when that month is closed,
+  otherwise it is derived once from the ledger (payments before the month
+  minus charges before the month)
+- closed months are immutable: a (landlord, month) is closed at most once and
+  the ORM refuses updates / deletes of closed rows
+- closing is per landlord, each in its own transaction, so a failed run can
+  simply be re-run; landlords already closed are skipped
+
+Provides:
+- previous_period(today=None) -> date
+- close_month(owner_id, period) -> MonthClose or None
+- close_month_all(period=None) -> {"closed": n, "skipped": n, "failed": n}
+- month_report(owner_id, period) -> dict or None
+- tenant_statement(tenant_id, year) -> list of dicts
+"""
+
+import logging
+from datetime import date, datetime, time
+
+from sqlalchemy import select, func
+
+from rentme.extensions import db
+from rentme.models import (
+    Tenant, Payment, RentCharge, MonthClose, TenantMonthSnapshot, insert_ignore,
+)
+from rentme.ledger import month_start, next_month, generate_rent_charges, current_date, days_late
+from rentme.aging import rebuild_owner_range
+
+
+log = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------
+def previous_period(today: date = None) -> date:
+    first = month_start(today or current_date())
+    return month_start(date.fromordinal(first.toordinal() - 1))
+
+
+def _sum(column, *where):
+    return select(func.coalesce(func.sum(column), 0.0)).where(*where).scalar_subquery()
+
+
+# ---------------------------------------------------------------------
+# Close
+# ---------------------------------------------------------------------
+def close_month(owner_id: int, period: date):
+    """
+    Snapshot every tenant of `owner_id` for the month starting `period`.
+    Returns the MonthClose row, or None when that month was already closed.
+    Commits.
+    """
+    period = month_start(period)
+    nxt = next_month(period)
+    if nxt > current_date():
+        raise ValueError(f"{period:%Y-%m} has not ended yet")
+
+    if MonthClose.query.filter_by(owner_id=owner_id, period=period).first():
+        return None
+
+    # Charges the monthly job may have missed (tenant added mid-month etc.)
+    if generate_rent_charges(upto=period, since=period, owner_range=(owner_id, owner_id + 1)):
+        rebuild_owner_range(owner_id, owner_id + 1)
+
+    start_dt, end_dt = datetime.combine(period, time.min), datetime.combine(nxt, time.min)
+    prev_closing = (
+        select(TenantMonthSnapshot.closing)
+        .where(TenantMonthSnapshot.tenant_id == Tenant.id, TenantMonthSnapshot.period == previous_period(period))
+        .scalar_subquery()
+    )
+    # Only evaluated for tenants without a closed previous month
+    ledger_opening = (
+        _sum(Payment.amount, Payment.tenant_id == Tenant.id, Payment.paid_at < start_dt) -
+        _sum(RentCharge.amount, RentCharge.tenant_id == Tenant.id, RentCharge.period < period)
+    )
+    rows = db.session.execute(
+        select(
+            Tenant.id, Tenant.name, Tenant.house_no, Tenant.move_in_date,
+            func.coalesce(prev_closing, ledger_opening).label("opening"),
+            _sum(RentCharge.amount, RentCharge.tenant_id == Tenant.id, RentCharge.period == period).label("charged"),
+            _sum(Payment.amount, Payment.tenant_id == Tenant.id,
+                 Payment.paid_at >= start_dt, Payment.paid_at < end_dt).label("paid"),
+        )
+        .where(Tenant.owner_id == owner_id, Tenant.move_in_date < nxt)
+        .order_by(Tenant.id)
+    ).all()
+
+    # The month's payments for this landlord, in order, for days late
+    month_payments = {}
+    for tenant_id, amount, paid_at in db.session.execute(
+        select(Payment.tenant_id, Payment.amount, Payment.paid_at)
+        .join(Tenant, Tenant.id == Payment.tenant_id)
+        .where(Tenant.owner_id == owner_id, Payment.paid_at >= start_dt, Payment.paid_at < end_dt)
+        .order_by(Payment.tenant_id, Payment.paid_at, Payment.id)
+    ):
+        month_payments.setdefault(tenant_id, []).append((amount, paid_at))
+
+    now = datetime.utcnow()
+    snapshots = []
+    for r in rows:
+        opening, charged, paid = float(r.opening or 0.0), float(r.charged), float(r.paid)
+        snapshots.append({
+            "tenant_id": r.id,
+            "owner_id": owner_id,
+            "period": period,
+            "tenant_name": r.name,
+            "house_no": r.house_no,
+            "opening": round(opening, 2),
+            "charged": round(charged, 2),
+            "paid": round(paid, 2),
+            "closing": round(opening + paid - charged, 2),
+            "days_late": days_late(
+                period, max(period, r.move_in_date), opening, charged, month_payments.get(r.id, ())
+            ),
+            "created_at": now,
+        })
+
+    header = {
+        "owner_id": owner_id,
+        "period": period,
+        "tenants": len(snapshots),
+        "opening": round(sum(s["opening"] for s in snapshots), 2),
+        "charged": round(sum(s["charged"] for s in snapshots), 2),
+        "paid": round(sum(s["paid"] for s in snapshots), 2),
+        "closing": round(sum(s["closing"] for s in snapshots), 2),
+        "closed_at": now,
+    }
+    claimed = db.session.execute(insert_ignore(MonthClose, ["owner_id", "period"]), [header]).rowcount
+    if not claimed:
+        # Closed concurrently by another process
+        db.session.rollback()
+        return None
+
+    if snapshots:
+        db.session.execute(insert_ignore(TenantMonthSnapshot, ["tenant_id", "period"]), snapshots)
+    db.session.commit()
+
+    log.info("Closed %s for owner %s (%s tenants)", period.strftime("%Y-%m"), owner_id, len(snapshots))
+    return MonthClose.query.filter_by(owner_id=owner_id, period=period).one()
+
+
+def close_month_all(period: date = None) -> dict:
+    """Close `period` (default: last month) for every landlord with tenants."""
+    period = month_start(period) if period else previous_period()
+    counts = {"closed": 0, "skipped": 0, "failed": 0}
+
+    owner_ids = [r[0] for r in db.session.query(Tenant.owner_id).distinct().order_by(Tenant.owner_id)]
+    for owner_id in owner_ids:
+        try:
+            closed = close_month(owner_id, period)
+            counts["closed" if closed else "skipped"] += 1
+        except Exception:
+            db.session.rollback()
+            counts["failed"] += 1
+            log.exception("Month close %s failed for owner %s", period.strftime("%Y-%m"), owner_id)
+
+    log.info("Month close %s: %s", period.strftime("%Y-%m"), counts)
+    return counts
+
+
+# ---------------------------------------------------------------------
+# Reports (snapshot reads only)
+# ---------------------------------------------------------------------
+def month_report(owner_id: int, period: date):
+    period = month_start(period)
+    header = MonthClose.query.filter_by(owner_id=owner_id, period=period).first()
+    if not header:
+        return None
+    snapshots = (
+        TenantMonthSnapshot.query
+        .filter_by(owner_id=owner_id, period=period)
+        .order_by(TenantMonthSnapshot.house_no)
+        .all()
+    )
+    return {
+        "period": period.strftime("%Y-%m"),
+        "closed_at": header.closed_at.isoformat(),
+        "totals": {
+            "tenants": header.tenants,
+            "opening": header.opening,
+            "charged": header.charged,
+            "paid": header.paid,
+            "closing": header.closing,
+        },
+        "tenants": [s.to_dict() for s in snapshots],
+    }
+
+
+def tenant_statement(tenant_id: int, year: int) -> list:
+    return [
+        s.to_dict() for s in
+        TenantMonthSnapshot.query
+        .filter(
+            TenantMonthSnapshot.tenant_id == tenant_id,
+            TenantMonthSnapshot.period >= date(year, 1, 1),
+            TenantMonthSnapshot.period < date(year + 1, 1, 1),
+        )
+        .order_by(TenantMonthSnapshot.period)
+        .all()
+    ]
@@ -16,30 +16,37 @@ from typing import Optional
 from rentme.models import User, Tenant, LandlordSettings
 
 
-import requests
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, abort
+from flask_login import login_required, current_user
+
+from rentme.mpesa_queue import (
+    ingest_mode, enqueue_confirmation, queue_status, validation_backpressure
+)
+from rentme.tenant_index import tenant_index, house_key, house_key_sql
+from rentme.sms import queue_sms
+from rentme.metrics import record_callback, timed_outbound
+from rentme.extensions import limiter
+from rentme.ratelimit import route_limit
 
 # Optional imports from your project (ORM path)
 try:
-    from rentme.extensions import db, socketio
+    from rentme.extensions import db
     from rentme.models import Tenant, Payment, User, LandlordSettings
     _USE_ORM = True
 except Exception:
     # Fallback raw DB helpers will be used
     db = None
-    socketio = None
     Tenant = None
     Payment = None
     User = None
     LandlordSettings = None
     _USE_ORM = False
 
-# Twilio optional
+# SocketIO optional (not every deployment registers it)
 try:
-    from twilio.rest import Client as TwilioClient
-    TWILIO_AVAILABLE = True
+    from rentme.extensions import socketio
 except Exception:
-    TWILIO_AVAILABLE = False
+    socketio = None
 
 # Postgres optional
 try:
@@ -57,26 +64,14 @@ except Exception:
 # Blueprint
 mpesa_bp = Blueprint("mpesa_bp", __name__)
 
-# Logging
+# Logging (handlers live in rentme.logging_setup; nothing is written inline)
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-LOG_FILE = os.path.join(BASE_DIR, "mpesa.log")
-os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s"
-)
 logger = logging.getLogger(__name__)
-console = logging.StreamHandler(sys.stdout)
-console.setLevel(logging.INFO)
-console.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-logger.addHandler(console)
 
 # DB / paths
 DB_URL = os.getenv("DATABASE_URL")
 DB_SQLITE_PATH = os.path.join(BASE_DIR, "rentana_full.db")
-RECEIPT_DIR = os.path.join(BASE_DIR, "static", "receipts")
-os.makedirs(RECEIPT_DIR, exist_ok=True)
+RECEIPT_DIR = os.path.join(BASE_DIR, "static", "receipts")  # created on first receipt
 
 _USE_PG = bool(DB_URL and DB_URL.startswith(("postgres://", "postgresql://")) and PSYCOPG2_AVAILABLE)
 
@@ -87,11 +82,6 @@ DARAJA_ENV = os.getenv("DARAJA_ENV", "production").lower()
 DARAJA_BASE = "https://api.safaricom.co.ke" if DARAJA_ENV == "production" else "https://sandbox.safaricom.co.ke"
 _OAUTH_TOKEN_CACHE = {"token": None, "expiry": 0}
 
-# Twilio
-TWILIO_SID = os.getenv("TWILIO_SID")
-TWILIO_TOKEN = os.getenv("TWILIO_TOKEN")
-TWILIO_FROM = os.getenv("TWILIO_FROM")
-
 # Default paybill/shortcode fallback
 DEFAULT_PAYBILL = os.getenv("DEFAULT_PAYBILL", os.getenv("SANDBOX_SHORTCODE", "600000"))
 
@@ -220,7 +210,7 @@ def _find_tenant_by_house_and_account(conn, house_no: Optional[str], account: st
 
     # 1) If house_no provided -> we find owners with this account then tenant by house_no among them
     if house_no:
-        house_no_l = house_no.strip().lower()
+        house_no_l = house_key(house_no)
         if _USE_PG:
             # find owners who own the provided business code
             cur.execute("SELECT id FROM \"user\" WHERE paybill_number=%s OR till_number=%s OR send_money_number=%s OR phone_number=%s", (account, account, account, account))
@@ -228,7 +218,7 @@ def _find_tenant_by_house_and_account(conn, house_no: Optional[str], account: st
             if not users:
                 return None
             placeholders = ",".join(["%s"] * len(users))
-            query = f"SELECT id, name, phone, house_no, monthly_rent, owner_id FROM tenant WHERE lower(house_no)=lower(%s) AND owner_id IN ({placeholders}) LIMIT 1"
+            query = f"SELECT id, name, phone, house_no, monthly_rent, owner_id FROM tenant WHERE lower(replace(house_no, ' ', ''))=%s AND owner_id IN ({placeholders}) LIMIT 1"
             params = [house_no_l] + users
             cur.execute(query, params)
             r = cur.fetchone()
@@ -242,8 +232,8 @@ def _find_tenant_by_house_and_account(conn, house_no: Optional[str], account: st
                 return None
             placeholders = ",".join("?" for _ in users)
             sql = f"""SELECT id, name, phone, house_no, monthly_rent, owner_id
-                      FROM tenant WHERE lower(house_no)=? AND owner_id IN ({placeholders}) LIMIT 1"""
-            params = [house_no.lower()] + users
+                      FROM tenant WHERE lower(replace(house_no, ' ', ''))=? AND owner_id IN ({placeholders}) LIMIT 1"""
+            params = [house_no_l] + users
             cur.execute(sql, params)
             r = cur.fetchone()
             if not r:
@@ -328,6 +318,7 @@ def _create_pdf_receipt(tenant, amount, tx_id, remaining):
     filename = f"receipt_{tenant['id']}_{tx_id}.pdf"
     out = os.path.join(RECEIPT_DIR, filename)
     try:
+        os.makedirs(RECEIPT_DIR, exist_ok=True)
         with open(out, "w", encoding="utf-8") as f:
             f.write(f"Tenant {tenant.get('name') or tenant['id']} | {tenant.get('house_no','-')}\n")
             f.write(f"Amount {amount}\nTx {tx_id}\nBalance {remaining}\n")
@@ -338,19 +329,16 @@ def _create_pdf_receipt(tenant, amount, tx_id, remaining):
 
 
 # -------------------------
-# Twilio SMS helper
+# SMS helper (outbox; delivered by worker.py)
 # -------------------------
 
-def _send_sms(phone, message):
-    if not (TWILIO_AVAILABLE and TWILIO_SID and TWILIO_TOKEN and TWILIO_FROM):
-        logger.info("SMS not sent (Twilio not configured). Preview: %s", message)
-        return
+def _send_sms(phone, message, template=None, period=None):
     try:
-        client = TwilioClient(TWILIO_SID, TWILIO_TOKEN)
-        client.messages.create(body=message, from_=TWILIO_FROM, to=phone)
-        logger.info("SMS sent to %s", phone)
+        if not queue_sms(phone, message, template=template, period=period, provider="twilio"):
+            logger.info("SMS not queued (invalid or duplicate). Preview: %s", message)
     except Exception:
-        logger.exception("Twilio error when sending SMS")
+        db.session.rollback()
+        logger.exception("Failed to queue SMS")
 
 
 # -------------------------
@@ -364,9 +352,12 @@ def _get_oauth_token() -> Optional[str]:
     now_ts = int(time.time())
     if _OAUTH_TOKEN_CACHE["token"] and _OAUTH_TOKEN_CACHE["expiry"] - now_ts > 30:
         return _OAUTH_TOKEN_CACHE["token"]
+    import requests
+
     url = f"{DARAJA_BASE}/oauth/v1/generate?grant_type=client_credentials"
     try:
-        resp = requests.get(url, auth=(DARAJA_CONSUMER_KEY, DARAJA_CONSUMER_SECRET), timeout=10)
+        with timed_outbound("daraja"):
+            resp = requests.get(url, auth=(DARAJA_CONSUMER_KEY, DARAJA_CONSUMER_SECRET), timeout=10)
         j = resp.json()
         token = j.get("access_token")
         expires_in = int(j.get("expires_in", 3600))
@@ -387,6 +378,8 @@ def verify_transaction_with_daraja(transaction_id: str, amount: float, msisdn: s
     if not token:
         logger.debug("Daraja token unavailable; verification skipped")
         return False
+    import requests
+
     url = f"{DARAJA_BASE}/mpesa/transactionstatus/v1/query"
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
     body = {
@@ -400,7 +393,8 @@ def verify_transaction_with_daraja(transaction_id: str, amount: float, msisdn: s
         "Occasion": "verify"
     }
     try:
-        resp = requests.post(url, json=body, headers=headers, timeout=12)
+        with timed_outbound("daraja"):
+            resp = requests.post(url, json=body, headers=headers, timeout=12)
         if resp.status_code not in (200, 201):
             logger.error("Daraja verify failed HTTP %s: %s", resp.status_code, resp.text)
             return False
@@ -414,14 +408,25 @@ def verify_transaction_with_daraja(transaction_id: str, amount: float, msisdn: s
 # -------------------------
 # Core processing for fallback (non-ORM) and ORM-aware
 # -------------------------
+def _tenant_by_house(owner_id, house_no):
+    """House number match with the validation index's rules (case / spaces ignored)."""
+    return Tenant.query.filter(
+        Tenant.owner_id == owner_id,
+        house_key_sql(Tenant.house_no) == house_key(house_no),
+    ).first()
 
-def process_payment_orm(account: str, amount: float, tx_id: str, note: str = None, msisdn: str = None):
-    """Process a payment fully via ORM (Postgres/SQLite) without raw SQL."""
+
+def process_payment_orm(account: str, amount: float, tx_id: str, note: str = None, msisdn: str = None,
+                        shortcode: str = None):
+    """Process a payment fully via ORM (Postgres/SQLite) without raw SQL.
+    `account` is "<business code>#<house>", or just the house when the
+    callback carries the business short code (C2B BillRefNumber).
+    """
     if not _USE_ORM or User is None or Tenant is None or LandlordSettings is None:
         raise RuntimeError("ORM not configured properly")
 
     # Check for duplicate transaction
-    if Transaction.query.filter_by(tx_id=tx_id).first():
+    if Payment.query.filter_by(transaction_id=tx_id).first():
         logger.info("Duplicate tx ignored: %s", tx_id)
         return {"ok": False, "reason": "duplicate_tx"}
 
@@ -431,6 +436,10 @@ def process_payment_orm(account: str, amount: float, tx_id: str, note: str = Non
         sc, h = account_str.split("#", 1)
         account_numeric = sc.strip() or DEFAULT_PAYBILL
         house_no = h.strip()
+    elif shortcode and account_str and account_str != str(shortcode).strip():
+        # Same split as validation: short code -> owner, BillRefNumber -> house
+        account_numeric = str(shortcode).strip()
+        house_no = account_str
     else:
         account_numeric = account_str or DEFAULT_PAYBILL
 
@@ -442,7 +451,7 @@ def process_payment_orm(account: str, amount: float, tx_id: str, note: str = Non
     # Find tenant
     tenant = None
     if owner and house_no:
-        tenant = Tenant.query.filter_by(owner_id=owner.id, house_no=house_no).first()
+        tenant = _tenant_by_house(owner.id, house_no)
     if not tenant and owner:
         # Try by msisdn fragment if house_no not found
         if msisdn:
@@ -455,14 +464,15 @@ def process_payment_orm(account: str, amount: float, tx_id: str, note: str = Non
         return {"ok": False, "reason": "tenant_not_found"}
 
     # Insert payment record
-    transaction = Transaction(
+    payment = Payment(
+        transaction_id=tx_id,
         tenant_id=tenant.id,
         amount=amount,
-        tx_id=tx_id,
+        paid_at=datetime.utcnow(),
         note=note
     )
     try:
-        db.session.add(transaction)
+        db.session.add(payment)
         db.session.commit()
     except Exception:
         db.session.rollback()
@@ -470,13 +480,13 @@ def process_payment_orm(account: str, amount: float, tx_id: str, note: str = Non
         return {"ok": False, "reason": "insert_failed"}
 
     # Calculate remaining rent
-    total_paid = db.session.query(db.func.sum(Transaction.amount)).filter_by(tenant_id=tenant.id).scalar() or 0.0
+    total_paid = db.session.query(db.func.sum(Payment.amount)).filter_by(tenant_id=tenant.id).scalar() or 0.0
     remaining = max(0.0, (tenant.monthly_rent or 0.0) - total_paid)
 
     # Send SMS
     sms_text = f"Dear {tenant.name}, payment of Ksh {int(amount):,} received. Thank you."
     try:
-        _send_sms(tenant.phone, sms_text)
+        _send_sms(tenant.phone, sms_text, template="payment_receipt", period=tx_id)
     except Exception:
         logger.exception("SMS send failed")
 
@@ -488,7 +498,10 @@ def process_payment_orm(account: str, amount: float, tx_id: str, note: str = Non
             logger.exception("SocketIO emit failed")
 
     # Generate receipt
-    receipt = _create_pdf_receipt(tenant, amount, tx_id, remaining=remaining)
+    receipt = _create_pdf_receipt(
+        {"id": tenant.id, "name": tenant.name, "house_no": tenant.house_no},
+        amount, tx_id, remaining=remaining
+    )
 
     return {"ok": True, "tenant": tenant, "amount": amount, "tx_id": tx_id, "receipt": receipt}
 
@@ -524,7 +537,7 @@ def process_direct_payment(account, amount, tx_id, note=None, msisdn=None, owner
             # If owner provided (User object), try direct lookup within that owner first
             if owner:
                 if house_no:
-                    tenant = Tenant.query.filter_by(owner_id=owner.id, house_no=house_no).first()
+                    tenant = _tenant_by_house(owner.id, house_no)
                 if not tenant and msisdn:
                     msisdn_norm = _normalize_msisdn(msisdn)
                     last6 = msisdn_norm[-6:] if msisdn_norm else None
@@ -564,7 +577,7 @@ def process_direct_payment(account, amount, tx_id, note=None, msisdn=None, owner
                 # If we have a found_owner, attempt tenant lookup in that owner
                 if found_owner:
                     if house_no:
-                        tenant = Tenant.query.filter_by(owner_id=found_owner.id, house_no=house_no).first()
+                        tenant = _tenant_by_house(found_owner.id, house_no)
                     if not tenant and msisdn:
                         msisdn_norm = _normalize_msisdn(msisdn)
                         last6 = msisdn_norm[-6:] if msisdn_norm else None
@@ -597,7 +610,11 @@ def process_direct_payment(account, amount, tx_id, note=None, msisdn=None, owner
 
             # Send SMS
             try:
-                _send_sms(tenant.phone, f"Dear {tenant.name}, payment of Ksh {int(amount_val):,} received. Thank you.")
+                _send_sms(
+                    tenant.phone,
+                    f"Dear {tenant.name}, payment of Ksh {int(amount_val):,} received. Thank you.",
+                    template="payment_receipt", period=tx_id
+                )
             except Exception:
                 logger.exception("SMS send failed (ORM)")
 
@@ -624,9 +641,15 @@ def process_direct_payment(account, amount, tx_id, note=None, msisdn=None, owner
 # HTTP callback endpoints
 # -------------------------
 @mpesa_bp.route('/payment_callback/validate', methods=['POST'])
+@limiter.limit(route_limit("RATELIMIT_MPESA_VALIDATION"))
 @csrf_exempt  # ✅ Required for Daraja callbacks
 def mpesa_validate():
     """Daraja calls this to validate before completing the payment."""
+    busy = validation_backpressure()
+    if busy:
+        record_callback("validation", "backpressure")
+        return busy
+
     data = request.get_json(silent=True) or {}
     logger.info("VALIDATION payload: %s", data)
 
@@ -639,7 +662,7 @@ def mpesa_validate():
 
     owner_id = data.get('OwnerID') or data.get('owner_id') or data.get('UserID')
 
-    # Resolve owner via shortcode if missing
+    # Resolve owner via shortcode if missing (index first, DB on miss)
     if not owner_id:
         shortcode = (
             data.get('ShortCode')
@@ -648,66 +671,49 @@ def mpesa_validate():
             or ""
         ).strip()
 
-        if shortcode and _USE_ORM and LandlordSettings:
+        if shortcode and _USE_ORM:
             try:
-                ls = LandlordSettings.query.filter(
-                    (LandlordSettings.paybill_number == shortcode) |
-                    (LandlordSettings.till_number == shortcode) |
-                    (LandlordSettings.send_money_number == shortcode)
-                ).first()
-                if ls:
-                    owner_id = ls.user_id
+                owner_id = tenant_index.owner_for_code(shortcode)
             except Exception:
                 logger.exception("ORM shortcode lookup failed")
 
     if not owner_id:
         logger.warning("Validation failed: missing OwnerID")
+        record_callback("validation", "missing_owner")
         return jsonify({"ResultCode": 1, "ResultDesc": "Missing OwnerID"}), 200
 
-    # Fetch owner
-    owner = None
-    if _USE_ORM and User:
-        owner = User.query.get(owner_id)
-        if not owner:
+    # Fetch owner + tenant from the account-reference index
+    tenant = None
+    if _USE_ORM:
+        owner_ok, tenant = tenant_index.find_tenant(owner_id, bill_ref)
+        if not owner_ok:
             logger.warning("Validation failed: invalid owner %s", owner_id)
+            record_callback("validation", "invalid_owner")
             return jsonify({"ResultCode": 1, "ResultDesc": "Invalid Owner"}), 200
 
-    # Find tenant
-    tenant = None
-    if _USE_ORM and Tenant and bill_ref:
-        tenant = Tenant.query.filter_by(
-            owner_id=owner.id,
-            house_no=bill_ref
-        ).first()
-
-        if not tenant and bill_ref.isdigit():
-            tenant = Tenant.query.filter(
-                Tenant.owner_id == owner.id,
-                Tenant.phone.like(f"%{bill_ref}%")
-            ).first()
-
     if tenant:
         logger.info("Validation passed: owner=%s tenant=%s", owner_id, tenant.name)
+        record_callback("validation", "ok")
         return jsonify({"ResultCode": 0, "ResultDesc": "Validation Passed"}), 200
 
     logger.warning("Validation failed: bill_ref=%s owner=%s", bill_ref, owner_id)
+    record_callback("validation", "tenant_not_found")
     return jsonify({"ResultCode": 1, "ResultDesc": "Invalid tenant reference"}), 200
 
 
-@mpesa_bp.route('/payment_callback/confirmation', methods=['POST'])
-@csrf_exempt
-def mpesa_confirmation():
-    """Daraja payment confirmation endpoint (ORM-safe)."""
-    payload = request.get_json(silent=True) or {}
-    logger.info("CONFIRMATION payload: %s", payload)
+def parse_confirmation(payload: dict) -> Optional[dict]:
+    """Pull tx_id / amount / phone / account_ref out of an STK or C2B confirmation.
+    Returns None when the payload is not a usable confirmation.
+    """
+    if not isinstance(payload, dict):
+        return None
 
     body = payload.get("Body", payload)
+    if not isinstance(body, dict):
+        return None
     stk = body.get("stkCallback")
 
     try:
-        # -----------------------------
-        # Parse payment data
-        # -----------------------------
         if stk:
             items = stk.get("CallbackMetadata", {}).get("Item", [])
             data_map = {i["Name"]: i.get("Value") for i in items if isinstance(i, dict)}
@@ -716,68 +722,114 @@ def mpesa_confirmation():
             amount_val = float(data_map.get("Amount", 0))
             phone = data_map.get("PhoneNumber")
             account_ref = data_map.get("AccountReference") or DEFAULT_PAYBILL
+            shortcode = None
         else:
             tx_id = (
                 body.get("TransID")
                 or body.get("TransactionID")
                 or body.get("MpesaReceiptNumber")
             )
-            amount_val = float(body.get("Amount", 0))
+            amount_val = float(body.get("Amount", body.get("TransAmount", 0)))
             phone = body.get("MSISDN") or body.get("Msisdn")
             account_ref = body.get("BillRefNumber") or DEFAULT_PAYBILL
+            shortcode = body.get("BusinessShortCode") or body.get("ShortCode")
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
 
-        if not tx_id or amount_val <= 0:
-            return jsonify({"ResultCode": 1, "ResultDesc": "Missing data"}), 200
+    if not tx_id or amount_val <= 0:
+        return None
 
-        msisdn_norm = _normalize_msisdn(phone)
+    return {
+        "tx_id": str(tx_id),
+        "amount": amount_val,
+        "phone": phone,
+        "account_ref": str(account_ref),
+        "shortcode": str(shortcode) if shortcode else None,
+    }
 
-        # -----------------------------
-        # Resolve owner
-        # -----------------------------
-        owner_id = body.get("OwnerID") or request.headers.get("X-Owner-ID")
 
-        if not owner_id:
-            business_code = account_ref.split("#")[0]
+def process_confirmation(parsed: dict) -> dict:
+    """Verify (best effort) and record a parsed confirmation.
+    Shared by the synchronous route and the worker.py inbox consumer.
+    """
+    tx_id = parsed["tx_id"]
+    amount_val = parsed["amount"]
+    account_ref = parsed["account_ref"]
+    msisdn_norm = _normalize_msisdn(parsed.get("phone"))
+
+    # -----------------------------
+    # Optional Daraja verification
+    # -----------------------------
+    try:
+        verify_transaction_with_daraja(
+            tx_id, amount_val, msisdn_norm or "", account_ref
+        )
+    except Exception:
+        logger.exception("Daraja verification failed (continuing)")
 
-            if LandlordSettings:
-                ls = LandlordSettings.query.filter(
-                    (LandlordSettings.paybill_number == business_code) |
-                    (LandlordSettings.till_number == business_code) |
-                    (LandlordSettings.send_money_number == business_code)
-                ).first()
-                if ls:
-                    owner_id = ls.user_id
+    # -----------------------------
+    # Process payment
+    # -----------------------------
+    try:
+        result = process_payment_orm(
+            account_ref,
+            amount_val,
+            tx_id,
+            note="Daraja confirmation",
+            msisdn=msisdn_norm,
+            shortcode=parsed.get("shortcode"),
+        )
+    except Exception:
+        logger.exception("Failed in process_payment_orm")
+        result = {"ok": False, "reason": "db_error"}
 
-        # -----------------------------
-        # Optional Daraja verification
-        # -----------------------------
-        try:
-            verify_transaction_with_daraja(
-                str(tx_id), amount_val, msisdn_norm or "", account_ref
-            )
-        except Exception:
-            logger.exception("Daraja verification failed (continuing)")
+    record_callback("confirmation", "ok" if result.get("ok") else result.get("reason"))
+    return result
 
-        # -----------------------------
-        # Process payment
-        # -----------------------------
+
+@mpesa_bp.route('/payment_callback/confirmation', methods=['POST'])
+@limiter.limit(route_limit("RATELIMIT_MPESA_CONFIRMATION"))
+@csrf_exempt
+def mpesa_confirmation():
+    """Daraja payment confirmation endpoint (ORM-safe)."""
+    payload = request.get_json(silent=True) or {}
+
+    # -----------------------------
+    # Queue mode: validate shape, store, ack
+    # -----------------------------
+    if ingest_mode() == "queue":
+        parsed = parse_confirmation(payload)
+        if not parsed:
+            record_callback("confirmation", "invalid")
+            return jsonify({"ResultCode": 1, "ResultDesc": "Missing data"}), 200
         try:
-            result = process_payment_orm(
-                account_ref,
-                amount_val,
-                str(tx_id),
-                note="Daraja confirmation",
-                msisdn=msisdn_norm
-            )
+            queued = enqueue_confirmation(payload, parsed["tx_id"])
         except Exception:
-            logger.exception("Failed in process_payment_orm")
-            result = {"ok": False}
+            db.session.rollback()
+            logger.exception("Failed to enqueue confirmation %s", parsed["tx_id"])
+            record_callback("confirmation", "enqueue_failed")
+            return jsonify({"ResultCode": 1, "ResultDesc": "Processing error"}), 200
+        record_callback("confirmation", "queued" if queued else "duplicate_tx")
+        return jsonify({
+            "ResultCode": 0,
+            "ResultDesc": "Confirmation received successfully"
+        }), 200
+
+    logger.info("CONFIRMATION payload: %s", payload)
+
+    try:
+        parsed = parse_confirmation(payload)
+        if not parsed:
+            record_callback("confirmation", "invalid")
+            return jsonify({"ResultCode": 1, "ResultDesc": "Missing data"}), 200
+
+        result = process_confirmation(parsed)
 
         # -----------------------------
         # Result handling
         # -----------------------------
         if result.get("ok"):
-            logger.info("Payment recorded successfully: %s", tx_id)
+            logger.info("Payment recorded successfully: %s", parsed["tx_id"])
             return jsonify({
                 "ResultCode": 0,
                 "ResultDesc": "Confirmation received successfully"
@@ -789,7 +841,7 @@ def mpesa_confirmation():
         if not MPESA_LIVE:
             logger.warning(
                 "[SIMULATION] Payment not saved → Account=%s Amount=%s TxID=%s Phone=%s",
-                account_ref, amount_val, tx_id, msisdn_norm
+                parsed["account_ref"], parsed["amount"], parsed["tx_id"], parsed.get("phone")
             )
             return jsonify({
                 "ResultCode": 0,
@@ -799,7 +851,7 @@ def mpesa_confirmation():
         # -----------------------------
         # Live failure
         # -----------------------------
-        logger.error("[LIVE] Payment failed → %s", tx_id)
+        logger.error("[LIVE] Payment failed → %s", parsed["tx_id"])
         return jsonify({
             "ResultCode": 1,
             "ResultDesc": "Payment processing failed"
@@ -812,3 +864,11 @@ def mpesa_confirmation():
             "ResultDesc": "Processing error"
         }), 200
 
+
+@mpesa_bp.route('/queue/status', methods=['GET'])
+@login_required
+def mpesa_queue_status():
+    """Inbox depth / age for monitoring the accept-and-ack ingestion mode (admins only)."""
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(queue_status()), 200
@@ -0,0 +1,243 @@
+# rentme/mpesa_queue.py
+"""
+Accept-and-ack ingestion for Daraja confirmations.
+
+In "queue" mode (MPESA_INGEST_MODE=queue) the confirmation route only checks
+the payload shape, stores it in the `mpesa_callback` inbox and returns
+ResultCode 0. worker.py drains the inbox with `drain_callbacks()`, which runs
+the same processing the synchronous route uses. Daraja retries of the same
+TransID are stored once; failed rows are retried with exponential backoff.
+
+Provides:
+- ingest_mode() -> "sync" | "queue"
+- enqueue_confirmation(payload, tx_id) # called from the confirmation route
+- queue_depth(fresh=False)             # pending + in-flight rows (cached)
+- queue_status()                       # dict for the status endpoint
+- validation_backpressure()            # slow / reject validation when behind
+- drain_callbacks(batch_size=None)     # consumer, used by worker.py
+"""
+
+import json
+import time
+import logging
+from datetime import datetime, timedelta
+
+from flask import current_app, jsonify
+from sqlalchemy import and_, or_, func
+
+from rentme.extensions import db
+from rentme.models import MpesaCallback, insert_ignore
+
+
+log = logging.getLogger(__name__)
+
+# Per-process cache so the validation route does not COUNT(*) on every call
+_DEPTH_CACHE = {"value": 0, "checked_at": 0.0}
+
+
+# ---------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------
+def ingest_mode() -> str:
+    return (current_app.config.get("MPESA_INGEST_MODE") or "sync").lower()
+
+
+def _cfg(name: str, default):
+    return current_app.config.get(name, default)
+
+
+# ---------------------------------------------------------------------
+# Producer side (request path)
+# ---------------------------------------------------------------------
+def enqueue_confirmation(payload: dict, tx_id: str):
+    """
+    Durably store a confirmation payload. Returns False when this TransID is
+    already in the inbox (a Daraja retry), True otherwise.
+    The caller has already checked the payload shape.
+    """
+    now = datetime.utcnow()
+    result = db.session.execute(insert_ignore(MpesaCallback, ["tx_id"]), [{
+        "kind": "confirmation",
+        "tx_id": str(tx_id)[:100],
+        "payload": json.dumps(payload, separators=(",", ":")),
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "received_at": now,
+    }])
+    db.session.commit()
+
+    if not result.rowcount:
+        log.info("Confirmation %s already queued", tx_id)
+        return False
+    _DEPTH_CACHE["value"] += 1
+    return True
+
+
+def _pending_filter(now: datetime = None):
+    """Rows a consumer may claim: pending and due, or processing with an expired lease."""
+    now = now or datetime.utcnow()
+    lease = timedelta(seconds=_cfg("MPESA_QUEUE_LEASE_SECONDS", 300))
+    return or_(
+        and_(MpesaCallback.status == "pending", MpesaCallback.next_attempt_at <= now),
+        and_(MpesaCallback.status == "processing", MpesaCallback.locked_at < now - lease),
+    )
+
+
+def _backoff(attempts: int) -> timedelta:
+    base = _cfg("MPESA_QUEUE_RETRY_BASE_SECONDS", 30)
+    cap = _cfg("MPESA_QUEUE_RETRY_MAX_SECONDS", 1800)
+    return timedelta(seconds=min(cap, base * (2 ** max(0, attempts - 1))))
+
+
+def queue_depth(fresh: bool = False) -> int:
+    """Pending + in-flight inbox rows, cached for MPESA_QUEUE_DEPTH_TTL seconds."""
+    ttl = float(_cfg("MPESA_QUEUE_DEPTH_TTL", 2))
+    now_ts = time.monotonic()
+    if not fresh and now_ts - _DEPTH_CACHE["checked_at"] < ttl:
+        return _DEPTH_CACHE["value"]
+
+    try:
+        depth = (
+            db.session.query(func.count(MpesaCallback.id))
+            .filter(MpesaCallback.status.in_(("pending", "processing")))
+            .scalar()
+        ) or 0
+    except Exception:
+        db.session.rollback()
+        log.exception("Queue depth query failed")
+        return _DEPTH_CACHE["value"]
+
+    _DEPTH_CACHE["value"] = int(depth)
+    _DEPTH_CACHE["checked_at"] = now_ts
+    return _DEPTH_CACHE["value"]
+
+
+def queue_status() -> dict:
+    depth = queue_depth(fresh=True)
+    oldest = (
+        db.session.query(func.min(MpesaCallback.received_at))
+        .filter(MpesaCallback.status == "pending")
+        .scalar()
+    )
+    failed = (
+        db.session.query(func.count(MpesaCallback.id))
+        .filter(MpesaCallback.status == "failed")
+        .scalar()
+    ) or 0
+    return {
+        "mode": ingest_mode(),
+        "depth": depth,
+        "failed": int(failed),
+        "oldest_pending_age_s": (
+            round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0
+        ),
+        "slow_depth": _cfg("MPESA_QUEUE_SLOW_DEPTH", 500),
+        "reject_depth": _cfg("MPESA_QUEUE_REJECT_DEPTH", 5000),
+    }
+
+
+def validation_backpressure():
+    """
+    Called at the top of the validation route.
+    - depth >= MPESA_QUEUE_REJECT_DEPTH -> reject (customer retries later)
+    - depth >= MPESA_QUEUE_SLOW_DEPTH   -> delay the response a little
+    Returns a response tuple when the request must be rejected, else None.
+    """
+    if ingest_mode() != "queue":
+        return None
+
+    depth = queue_depth()
+    reject_at = _cfg("MPESA_QUEUE_REJECT_DEPTH", 5000)
+    slow_at = _cfg("MPESA_QUEUE_SLOW_DEPTH", 500)
+
+    if reject_at and depth >= reject_at:
+        log.warning("Validation rejected: callback queue depth %s >= %s", depth, reject_at)
+        return jsonify({"ResultCode": 1, "ResultDesc": "System busy, try again"}), 200
+
+    if slow_at and depth >= slow_at:
+        delay_ms = _cfg("MPESA_QUEUE_SLOW_DELAY_MS", 250)
+        # Scale the delay with how far past the threshold we are, capped at 4x
+        factor = min(4.0, depth / float(slow_at))
+        time.sleep(delay_ms * factor / 1000.0)
+
+    return None
+
+
+# ---------------------------------------------------------------------
+# Consumer side (worker.py)
+# ---------------------------------------------------------------------
+def _claim_batch(batch_size: int):
+    """Lock and mark a batch as processing. Safe with several workers (SKIP LOCKED)."""
+    now = datetime.utcnow()
+    rows = (
+        MpesaCallback.query
+        .filter(_pending_filter(now))
+        .order_by(MpesaCallback.next_attempt_at, MpesaCallback.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for row in rows:
+        row.status = "processing"
+        row.locked_at = now
+        row.attempts = (row.attempts or 0) + 1
+    db.session.commit()
+    return rows
+
+
+def _process_row(row) -> str:
+    """Run the normal confirmation pipeline for one inbox row. Returns new status."""
+    from rentme.mpesa_handler import parse_confirmation, process_confirmation
+
+    try:
+        payload = json.loads(row.payload)
+    except ValueError:
+        row.last_error = "invalid JSON"
+        return "failed"
+
+    parsed = parse_confirmation(payload)
+    if not parsed:
+        row.last_error = "missing data"
+        return "failed"
+
+    result = process_confirmation(parsed)
+    if result.get("ok") or result.get("reason") == "duplicate_tx":
+        row.last_error = None
+        return "done"
+
+    row.last_error = str(result.get("reason") or "processing failed")[:500]
+    if row.attempts >= _cfg("MPESA_QUEUE_MAX_ATTEMPTS", 5):
+        return "failed"
+    return "pending"
+
+
+def drain_callbacks(batch_size: int = None) -> int:
+    """
+    Claim and process one batch of due inbox rows.
+    Returns the number of rows handled (0 means nothing is due).
+    """
+    batch_size = batch_size or _cfg("MPESA_QUEUE_BATCH_SIZE", 50)
+    rows = _claim_batch(batch_size)
+
+    for row in rows:
+        try:
+            status = _process_row(row)
+        except Exception as e:
+            db.session.rollback()
+            log.exception("Callback %s processing crashed", row.id)
+            row = db.session.get(MpesaCallback, row.id)
+            row.last_error = str(e)[:500]
+            status = "failed" if row.attempts >= _cfg("MPESA_QUEUE_MAX_ATTEMPTS", 5) else "pending"
+
+        row.status = status
+        row.locked_at = None
+        if status == "pending":
+            row.next_attempt_at = datetime.utcnow() + _backoff(row.attempts)
+        else:
+            row.processed_at = datetime.utcnow()
+        db.session.commit()
+
+    if rows:
+        log.info("Drained %s callback(s) from inbox", len(rows))
+    return len(rows)
@@ -0,0 +1,194 @@
+# rentme/partitions.py
+"""
+Monthly range partitions (Postgres only).
+
+Partitioned tables are named in PARTITIONED with their partition key. Each
+month is a child table `<table>_YYYY_MM` covering [first of month, first of
+next month); a `<table>_default` partition catches anything outside them.
+The tables are converted by their Alembic migrations; on other databases
+(SQLite in development) they stay plain tables and everything here is a
+no-op.
+
+Maintenance (scheduled daily in rentme/scheduler.py, safe to re-run):
+- partitions for the current month and PARTITION_MONTHS_AHEAD months ahead
+  are created before rows for them arrive
+- when PARTITION_ARCHIVE_TABLESPACE is set, partitions older than
+  PARTITION_ARCHIVE_AFTER_MONTHS move to that tablespace (cheap storage);
+  they stay attached, so nothing changes for queries
+
+Detaching is manual (`flask partitions --detach YYYY-MM`): a detached month
+is no longer read by the app. For `payment` that means those payments stop
+counting toward balances, so only detach months that are closed and settled.
+
+Provides:
+- PARTITIONED
+- is_partitioned(table) -> bool
+- list_partitions(table) -> [(name, period, tablespace)]
+- ensure_partitions(table, months_ahead=None) -> [created names]
+- archive_old_partitions(table, after_months=None, tablespace=None) -> [moved names]
+- detach_partition(table, period) -> name
+- maintain_partitions() -> dict
+"""
+
+import re
+import logging
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import text
+
+from rentme.extensions import db
+from rentme.ledger import month_start, next_month, current_date
+
+
+log = logging.getLogger(__name__)
+
+# table -> partition key column
+PARTITIONED = {
+    "payment": "paid_at",
+    "audit_log": "created_at",
+}
+
+
+# ---------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------
+def _cfg(name: str, default):
+    return current_app.config.get(name, default)
+
+
+def _is_pg() -> bool:
+    return db.engine.dialect.name == "postgresql"
+
+
+def partition_name(table: str, period: date) -> str:
+    return f"{table}_{period:%Y_%m}"
+
+
+def _check_table(table: str):
+    if table not in PARTITIONED:
+        raise ValueError(f"{table} is not a partitioned table")
+
+
+def is_partitioned(table: str) -> bool:
+    if not _is_pg():
+        return False
+    return db.session.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :t"
+        ),
+        {"t": table},
+    ).first() is not None
+
+
+def list_partitions(table: str) -> list:
+    """Monthly partitions of `table`, oldest first: (name, period, tablespace or None)."""
+    _check_table(table)
+    if not is_partitioned(table):
+        return []
+    rows = db.session.execute(
+        text(
+            "SELECT c.relname, ts.spcname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "LEFT JOIN pg_tablespace ts ON ts.oid = c.reltablespace "
+            "WHERE p.relname = :t"
+        ),
+        {"t": table},
+    ).all()
+    pattern = re.compile(rf"^{re.escape(table)}_(\d{{4}})_(\d{{2}})$")
+    out = []
+    for name, tablespace in rows:
+        m = pattern.match(name)
+        if m:
+            out.append((name, date(int(m.group(1)), int(m.group(2)), 1), tablespace))
+    return sorted(out, key=lambda r: r[1])
+
+
+# ---------------------------------------------------------------------
+# Maintenance
+# ---------------------------------------------------------------------
+def ensure_partitions(table: str, months_ahead: int = None) -> list:
+    """Create missing partitions from this month to `months_ahead` ahead. Commits."""
+    _check_table(table)
+    if not is_partitioned(table):
+        return []
+    months_ahead = int(_cfg("PARTITION_MONTHS_AHEAD", 3) if months_ahead is None else months_ahead)
+    existing = {name for name, _, _ in list_partitions(table)}
+
+    created = []
+    period = month_start(current_date())
+    for _ in range(months_ahead + 1):
+        name = partition_name(table, period)
+        if name not in existing:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{period.isoformat()}') TO ('{next_month(period).isoformat()}')"
+                    ))
+                created.append(name)
+            except Exception:
+                # Usually rows for that month already sit in the default partition
+                log.exception("Could not create partition %s", name)
+        period = next_month(period)
+
+    db.session.commit()
+    if created:
+        log.info("Created partitions: %s", ", ".join(created))
+    return created
+
+
+def archive_old_partitions(table: str, after_months: int = None, tablespace: str = None) -> list:
+    """Move partitions older than `after_months` to `tablespace`. Commits."""
+    _check_table(table)
+    tablespace = tablespace or _cfg("PARTITION_ARCHIVE_TABLESPACE", None)
+    if not tablespace or not is_partitioned(table):
+        return []
+    if not re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", tablespace):
+        raise ValueError(f"Bad tablespace name: {tablespace!r}")
+    after_months = int(_cfg("PARTITION_ARCHIVE_AFTER_MONTHS", 24) if after_months is None else after_months)
+
+    cutoff = month_start(current_date())
+    for _ in range(after_months):
+        cutoff = month_start(cutoff - timedelta(days=1))
+
+    moved = []
+    for name, period, current in list_partitions(table):
+        if period < cutoff and current != tablespace:
+            # Rewrites the partition under an exclusive lock; old months are rarely touched
+            db.session.execute(text(f"ALTER TABLE {name} SET TABLESPACE {tablespace}"))
+            db.session.commit()
+            moved.append(name)
+
+    if moved:
+        log.info("Moved to tablespace %s: %s", tablespace, ", ".join(moved))
+    return moved
+
+
+def detach_partition(table: str, period: date) -> str:
+    """Detach one month from `table`; the child table is kept as-is. Commits."""
+    _check_table(table)
+    if not is_partitioned(table):
+        raise RuntimeError(f"{table} is not partitioned on this database")
+    name = partition_name(table, month_start(period))
+    if name not in {n for n, _, _ in list_partitions(table)}:
+        raise ValueError(f"{name} is not attached to {table}")
+    db.session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    db.session.commit()
+    log.warning("Detached partition %s from %s", name, table)
+    return name
+
+
+def maintain_partitions() -> dict:
+    """Create upcoming partitions and archive old ones for every partitioned table."""
+    out = {}
+    for table in PARTITIONED:
+        if not is_partitioned(table):
+            continue
+        out[table] = {
+            "created": ensure_partitions(table),
+            "archived": archive_old_partitions(table),
+        }
+    return out
@@ -0,0 +1,137 @@
+# rentme/penalties.py
+"""
+Late fees.
+
+Each landlord may have one PenaltyRule (next to LandlordSettings). Fees for a
+month are assessed for all tenants at once: one INSERT ... SELECT per
+distinct grace period, with each tenant's outstanding balance at the cutoff
+computed in SQL from the ledger (charges up to the month minus payments made
+before the cutoff). Fees are written as `rent_charge` rows with kind
+"late_fee" for that month, so balances, reports and month close pick them up
+without changes, and a re-run inserts nothing (unique tenant/period/kind).
+
+- cutoff: the end of day `grace_days` of the month, Kenya time (converted
+  to UTC before comparing with Payment.paid_at, which is naive UTC)
+- fee: fixed_amount + percent of the month's rent still unpaid, capped at
+  max_amount
+- a tenant's move-in month is never charged, and months already closed
+  (rentme/month_close.py) are left alone
+
+Provides:
+- previous_month(today=None) -> date
+- assess_late_fees(period, owner_range=None) -> int   # rows inserted, no commit
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+
+import pytz
+from flask import current_app
+from sqlalchemy import select, func, case, literal, exists, Date, String, DateTime
+
+from rentme.extensions import db
+from rentme.models import Tenant, Payment, RentCharge, PenaltyRule, MonthClose, insert_ignore
+from rentme.ledger import KIND_RENT, KENYA_TZ, month_start, current_date
+
+
+log = logging.getLogger(__name__)
+
+KIND_LATE_FEE = "late_fee"
+
+
+def previous_month(today: date = None) -> date:
+    first = month_start(today or current_date())
+    return month_start(first - timedelta(days=1))
+
+
+def _least(a, b):
+    return case((a < b, a), else_=b)
+
+
+def cutoff_utc(period: date, grace_days: int) -> datetime:
+    """Kenya midnight after day `grace_days` of `period`, as naive UTC like paid_at."""
+    local = KENYA_TZ.localize(datetime.combine(period + timedelta(days=grace_days), time.min))
+    return local.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def _fee_select(period: date, grace_days: int, owner_range, min_balance: float, now: datetime):
+    cutoff = cutoff_utc(period, grace_days)
+
+    charged = (
+        select(func.coalesce(func.sum(RentCharge.amount), 0.0))
+        .where(RentCharge.tenant_id == Tenant.id, RentCharge.period <= period)
+        .scalar_subquery()
+    )
+    paid = (
+        select(func.coalesce(func.sum(Payment.amount), 0.0))
+        .where(Payment.tenant_id == Tenant.id, Payment.paid_at < cutoff)
+        .scalar_subquery()
+    )
+    month_rent = (
+        select(func.coalesce(func.sum(RentCharge.amount), 0.0))
+        .where(RentCharge.tenant_id == Tenant.id, RentCharge.period == period, RentCharge.kind == KIND_RENT)
+        .scalar_subquery()
+    )
+    outstanding = charged - paid
+
+    fee = PenaltyRule.fixed_amount + PenaltyRule.percent / 100.0 * _least(outstanding, month_rent)
+    fee = case(
+        (PenaltyRule.max_amount.isnot(None), _least(fee, PenaltyRule.max_amount)),
+        else_=fee,
+    )
+    fee = func.round(fee, 2)
+
+    closed = exists().where(MonthClose.owner_id == Tenant.owner_id, MonthClose.period == period)
+
+    conds = [
+        PenaltyRule.enabled.is_(True),
+        PenaltyRule.grace_days == grace_days,
+        Tenant.move_in_date < period,
+        outstanding >= min_balance,
+        fee > 0,
+        ~closed,
+    ]
+    if owner_range is not None:
+        conds += [Tenant.owner_id >= owner_range[0], Tenant.owner_id < owner_range[1]]
+
+    return (
+        select(
+            Tenant.id, Tenant.owner_id,
+            literal(period, Date), literal(KIND_LATE_FEE, String),
+            fee, literal(now, DateTime),
+        )
+        .join(PenaltyRule, PenaltyRule.user_id == Tenant.owner_id)
+        .where(*conds)
+    )
+
+
+def assess_late_fees(period: date, owner_range=None) -> int:
+    """
+    Charge late fees for the month starting `period` to every tenant whose
+    landlord has an enabled rule (optionally only owners in [lo, hi)).
+    Rules whose cutoff has not passed yet are skipped. Idempotent.
+    Does not commit. Returns rows inserted.
+    """
+    period = month_start(period)
+    today = current_date()
+    min_balance = float(current_app.config.get("LATE_FEE_MIN_BALANCE", 1.0))
+    now = datetime.utcnow()
+
+    q = db.session.query(PenaltyRule.grace_days).filter(PenaltyRule.enabled.is_(True))
+    if owner_range is not None:
+        q = q.filter(PenaltyRule.user_id >= owner_range[0], PenaltyRule.user_id < owner_range[1])
+    grace_values = sorted(g for (g,) in q.distinct() if g is not None)
+
+    inserted = 0
+    for grace_days in grace_values:
+        if period + timedelta(days=grace_days) > today:
+            continue  # cutoff not reached yet
+        stmt = insert_ignore(RentCharge, ["tenant_id", "period", "kind"]).from_select(
+            ["tenant_id", "owner_id", "period", "kind", "amount", "created_at"],
+            _fee_select(period, grace_days, owner_range, min_balance, now),
+        )
+        inserted += db.session.execute(stmt).rowcount or 0
+
+    if inserted:
+        log.info("Late fees %s: %s charged (owners %s)", period.strftime("%Y-%m"), inserted, owner_range or "all")
+    return inserted
@@ -0,0 +1,183 @@
+# rentme/profiling.py
+"""
+Request profiling (PROFILING_ENABLED=1; nothing is registered otherwise).
+
+For every request:
+- a Server-Timing header: db (time and query count from rentme/querystats.py),
+  render (Jinja templates), external (outbound HTTP through requests, which
+  covers Daraja, Africa's Talking, Twilio and mail-api.dev) and total
+- requests slower than PROFILING_SLOW_MS are logged as warnings with their
+  query count and slowest statements
+
+A PROFILE_SAMPLE_RATE fraction of requests (optionally only the endpoints in
+PROFILE_ENDPOINTS) also runs under cProfile; the stats are written to
+PROFILE_DIR as <time>_<endpoint>_<ms>ms.prof. Open them with
+`python -m pstats` or snakeviz. Under gevent a profile also contains the
+other greenlets that ran in the meantime.
+
+Provides:
+- init_profiling(app)
+- external_time(seconds)   # account outbound time not made through requests
+"""
+
+import os
+import time
+import random
+import logging
+import functools
+from datetime import datetime
+
+from flask import g, request, has_request_context, template_rendered, before_render_template
+
+from rentme.querystats import query_stats, track_statements, slowest_statements
+
+
+log = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------
+# Timers
+# ---------------------------------------------------------------------
+def external_time(seconds: float):
+    if has_request_context() and "_prof_start" in g:
+        g._prof_external += seconds
+
+
+def _patch_requests():
+    """Time every requests call made inside a request. Installed once."""
+    import requests
+
+    send = requests.Session.send
+    if getattr(send, "_profiled", False):
+        return
+
+    @functools.wraps(send)
+    def timed_send(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return send(self, *args, **kwargs)
+        finally:
+            external_time(time.perf_counter() - started)
+
+    timed_send._profiled = True
+    requests.Session.send = timed_send
+
+
+def _render_started(sender, template, context, **extra):
+    if "_prof_start" in g:
+        g._prof_render_stack.append(time.perf_counter())
+
+
+def _render_finished(sender, template, context, **extra):
+    if "_prof_start" in g and g._prof_render_stack:
+        started = g._prof_render_stack.pop()
+        # Nested render_template calls: count the outermost only
+        if not g._prof_render_stack:
+            g._prof_render += time.perf_counter() - started
+
+
+# ---------------------------------------------------------------------
+# Sampled profiles
+# ---------------------------------------------------------------------
+def _start_profile():
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active in this thread (e.g. another greenlet)
+        return None
+    return profiler
+
+
+def _save_profile(profiler, directory: str, elapsed_ms: float):
+    name = "{}_{}_{:.0f}ms.prof".format(
+        datetime.utcnow().strftime("%Y%m%dT%H%M%S%f"),
+        (request.endpoint or "unknown").replace(".", "-"),
+        elapsed_ms,
+    )
+    try:
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(directory, name))
+    except OSError:
+        log.exception("Could not write profile %s", name)
+
+
+# ---------------------------------------------------------------------
+# Setup
+# ---------------------------------------------------------------------
+def init_profiling(app):
+    if not app.config.get("PROFILING_ENABLED"):
+        return
+
+    slow_ms = app.config.get("PROFILING_SLOW_MS", 500)
+    sample_rate = app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+    endpoints = {e.strip() for e in (app.config.get("PROFILE_ENDPOINTS") or "").split(",") if e.strip()}
+    directory = app.config.get("PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+
+    _patch_requests()
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+
+    @app.before_request
+    def _profile_start():
+        g._prof_start = time.perf_counter()
+        g._prof_render = 0.0
+        g._prof_render_stack = []
+        g._prof_external = 0.0
+        track_statements()
+
+        g._prof_profiler = None
+        if sample_rate and random.random() < sample_rate and (not endpoints or request.endpoint in endpoints):
+            g._prof_profiler = _start_profile()
+
+    @app.after_request
+    def _profile_report(response):
+        if "_prof_start" not in g:
+            return response
+
+        profiler = g.pop("_prof_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+        elapsed_ms = (time.perf_counter() - g._prof_start) * 1000
+        db = query_stats()
+
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={db["db_ms"]:.1f};desc="{db["queries"]} queries"',
+            f"render;dur={g._prof_render * 1000:.1f}",
+            f"external;dur={g._prof_external * 1000:.1f}",
+            f"total;dur={elapsed_ms:.1f}",
+        ])
+
+        if elapsed_ms >= slow_ms:
+            slowest = slowest_statements()
+            log.warning(
+                "Slow request %s %s: %.0f ms (%s queries, %.1f ms db, %.1f ms render, %.1f ms external)",
+                request.method, request.path, elapsed_ms, db["queries"], db["db_ms"],
+                g._prof_render * 1000, g._prof_external * 1000,
+                extra={
+                    "endpoint": request.endpoint,
+                    "status": response.status_code,
+                    "duration_ms": round(elapsed_ms, 1),
+                    "db_queries": db["queries"],
+                    "db_ms": db["db_ms"],
+                    "slowest_sql": [{"ms": ms, "sql": " ".join(sql.split())[:300]} for ms, sql in slowest],
+                },
+            )
+
+        if profiler is not None:
+            _save_profile(profiler, directory, elapsed_ms)
+        return response
+
+    @app.teardown_request
+    def _profile_teardown(exc):
+        # after_request did not run (unhandled exception): never leave a profiler on
+        profiler = g.pop("_prof_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+
+    log.info(
+        "Request profiling on (slow >= %s ms, sample rate %s, profiles in %s)",
+        slow_ms, sample_rate, directory,
+    )
@@ -0,0 +1,120 @@
+# rentme/querystats.py
+"""
+Per-request database accounting.
+
+Cursor events on every SQLAlchemy engine count statements and time spent in
+the database for the current request (kept on flask.g, so background threads
+and the worker are not counted). After each request the totals go to:
+
+- response headers X-DB-Queries / X-DB-Time-Ms (QUERY_STATS_HEADERS)
+- one log line per request (logger rentme.querystats; sample it with
+  LOG_SAMPLE_RATES), a warning above QUERY_STATS_WARN_QUERIES
+
+rentme/profiling.py can also ask for the slowest statements of a request
+(track_statements()); they are only kept when asked for.
+
+Provides:
+- init_query_stats(app)
+- query_stats() -> {"queries": n, "db_ms": float} for the current request
+- track_statements() / slowest_statements() -> [(ms, sql), ...]
+"""
+
+import time
+import heapq
+import logging
+
+from flask import g, request, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+log = logging.getLogger(__name__)
+
+SLOWEST_KEPT = 5
+
+
+# ---------------------------------------------------------------------
+# Engine events
+# ---------------------------------------------------------------------
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["_query_start"].pop()
+    if not has_app_context() or "_db_queries" not in g:
+        return
+    elapsed = time.perf_counter() - started
+    g._db_queries += 1
+    g._db_seconds += elapsed
+
+    slowest = g.get("_db_slowest")
+    if slowest is not None:
+        entry = (elapsed, g._db_queries, statement)
+        if len(slowest) < SLOWEST_KEPT:
+            heapq.heappush(slowest, entry)
+        elif elapsed > slowest[0][0]:
+            heapq.heapreplace(slowest, entry)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    conn = context.connection
+    if conn is not None and conn.info.get("_query_start"):
+        conn.info["_query_start"].pop()
+
+
+# ---------------------------------------------------------------------
+# Request hooks
+# ---------------------------------------------------------------------
+def query_stats() -> dict:
+    return {
+        "queries": g.get("_db_queries", 0),
+        "db_ms": round(g.get("_db_seconds", 0.0) * 1000, 2),
+    }
+
+
+def track_statements():
+    """Keep the slowest statements of the current request (see slowest_statements)."""
+    g._db_slowest = []
+
+
+def slowest_statements() -> list:
+    """[(ms, sql)] slowest first; empty unless track_statements() was called."""
+    return [
+        (round(elapsed * 1000, 2), statement)
+        for elapsed, _, statement in sorted(g.get("_db_slowest") or (), reverse=True)
+    ]
+
+
+def _start():
+    g._db_queries = 0
+    g._db_seconds = 0.0
+
+
+def init_query_stats(app):
+    headers = app.config.get("QUERY_STATS_HEADERS", True)
+    warn_at = app.config.get("QUERY_STATS_WARN_QUERIES", 50)
+
+    app.before_request(_start)
+
+    @app.after_request
+    def _report(response):
+        if "_db_queries" not in g or request.endpoint == "static":
+            return response
+        stats = query_stats()
+        if headers:
+            response.headers["X-DB-Queries"] = str(stats["queries"])
+            response.headers["X-DB-Time-Ms"] = f"{stats['db_ms']:.1f}"
+
+        level = logging.WARNING if stats["queries"] > warn_at else logging.INFO
+        log.log(
+            level, "%s %s: %s queries, %.1f ms in db",
+            request.method, request.path, stats["queries"], stats["db_ms"],
+            extra={"endpoint": request.endpoint, "status": response.status_code,
+                   "db_queries": stats["queries"], "db_ms": stats["db_ms"]},
+        )
+        return response
@@ -0,0 +1,135 @@
+# rentme/ratelimit.py
+"""
+Rate limiting shared by every gunicorn worker.
+
+The one Limiter (rentme.extensions.limiter) stores its counters in
+RATELIMIT_STORAGE_URI (Redis in production, REDIS_URL by default) with the
+moving-window strategy, so a limit means the same thing whichever worker
+serves the request.
+
+A moving-window hit is a Redis round trip. For generous limits (M-Pesa
+callbacks, hundreds per minute) each worker instead leases a block of
+RATELIMIT_LEASE_FRACTION of the limit in one hit and spends it locally,
+token-bucket style; only when the block runs out, or the window the lease
+was taken in has passed, does it go back to Redis. Leased but unspent
+entries count against the limit, so near the limit requests are refused
+early rather than late; the most a limit can be overshot by is one block per
+worker, for one window. Limits whose block would be a single hit (login,
+password reset) always go to Redis.
+
+Limits are keyed on the client IP (get_remote_address). Behind a reverse
+proxy that is only right with PROXY_FIX_X_FOR set (rentme/config.py), which
+wraps the app in werkzeug's ProxyFix; otherwise every client shares the
+proxy's bucket.
+
+Per-route limits are config values ("10/minute;100/hour", empty = none),
+read on each request so tests and deployments can change them:
+
+    @route("/login", methods=["GET", "POST"])
+    @limiter.limit(route_limit("RATELIMIT_LOGIN"), methods=["POST"])
+    def login(): ...
+
+The limit decorator goes below the route decorator.
+
+Provides:
+- SharedLimiter                 # rentme.extensions.limiter
+- route_limit(config_key)
+"""
+
+import time
+import logging
+import threading
+
+from flask import current_app
+from flask_limiter import Limiter
+from limits.strategies import RateLimiter
+
+
+log = logging.getLogger(__name__)
+
+# Local buckets kept before expired ones are swept
+MAX_LOCAL_KEYS = 10000
+
+
+def route_limit(config_key: str):
+    """Limit provider for @limiter.limit, read from app config per request."""
+    return lambda: current_app.config.get(config_key) or ""
+
+
+# ---------------------------------------------------------------------
+# Leased moving window
+# ---------------------------------------------------------------------
+class LeasedRateLimiter(RateLimiter):
+    """Wraps a storage-backed strategy; spends leased blocks of hits locally."""
+
+    def __init__(self, remote: RateLimiter, fraction: float):
+        super().__init__(remote.storage)
+        self.remote = remote
+        self.fraction = fraction
+        self._lock = threading.Lock()
+        self._buckets = {}   # limit key -> [tokens left, expires at, next lease attempt]
+
+    def _block(self, item) -> int:
+        return int(item.amount * self.fraction)
+
+    def _take_local(self, key: str, cost: int, now: float) -> bool:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket and bucket[1] > now and bucket[0] >= cost:
+                bucket[0] -= cost
+                return True
+        return False
+
+    def _store(self, key: str, tokens: int, expires_at: float, lease_at: float, now: float):
+        with self._lock:
+            if len(self._buckets) >= MAX_LOCAL_KEYS:
+                self._buckets = {k: b for k, b in self._buckets.items() if max(b[1], b[2]) > now}
+            self._buckets[key] = [tokens, expires_at, lease_at]
+
+    def hit(self, item, *identifiers, cost=1):
+        block = self._block(item)
+        if block <= cost:
+            return self.remote.hit(item, *identifiers, cost=cost)
+
+        key = item.key_for(*identifiers)
+        now = time.monotonic()
+        if self._take_local(key, cost, now):
+            return True
+
+        # One round trip for the next block. Near the limit a block no longer
+        # fits: use exact hits for a while instead of a failed lease each time
+        bucket = self._buckets.get(key)
+        if not bucket or bucket[2] <= now:
+            if self.remote.hit(item, *identifiers, cost=block):
+                self._store(key, block - cost, now + item.get_expiry(), now, now)
+                return True
+            self._store(key, 0, now, now + item.get_expiry() * self.fraction, now)
+        return self.remote.hit(item, *identifiers, cost=cost)
+
+    def test(self, item, *identifiers, cost=1):
+        bucket = self._buckets.get(item.key_for(*identifiers))
+        if bucket and bucket[1] > time.monotonic() and bucket[0] >= cost:
+            return True
+        return self.remote.test(item, *identifiers, cost=cost)
+
+    def get_window_stats(self, item, *identifiers):
+        return self.remote.get_window_stats(item, *identifiers)
+
+    def clear(self, item, *identifiers):
+        with self._lock:
+            self._buckets.pop(item.key_for(*identifiers), None)
+        return self.remote.clear(item, *identifiers)
+
+
+class SharedLimiter(Limiter):
+    def init_app(self, app):
+        super().init_app(app)
+        fraction = float(app.config.get("RATELIMIT_LEASE_FRACTION", 0))
+        uri = app.config.get("RATELIMIT_STORAGE_URI") or "memory://"
+        # memory:// is already local; leasing from it only wastes capacity
+        if fraction > 0 and not uri.startswith("memory://"):
+            self._limiter = LeasedRateLimiter(self._limiter, fraction)
+        log.info(
+            "Rate limits: %s on %s, lease %.0f%%",
+            app.config.get("RATELIMIT_STRATEGY"), uri.split("://")[0], fraction * 100,
+        )
@@ -0,0 +1,364 @@
+# rentme/scheduler.py
+"""
+Worker-side scheduler for periodic jobs.
+
+- Jobs are registered with `@periodic(job_id, **cron)` in this module; each
+  process schedules them in its own MemoryJobStore (the registry is the
+  source of truth, and a shared store would let workers steal each other's
+  APScheduler jobs).
+- Every execution goes through `run_job()`, which runs inside the app
+  context and records a `job_runs` row (fire time covered, status, rows,
+  duration). A run much slower than the job's recent median is logged as a
+  warning.
+- Missed runs are caught up at start: for each job the latest fire time
+  within SCHEDULER_CATCHUP_DAYS is computed from its trigger, and if no
+  successful run covers it, the job runs once right away.
+- Several workers may run the scheduler. An exclusive job first claims its
+  JobLock lease (rentme.jobs.claim_job, one conditional UPDATE, renewed
+  while it runs); workers that lose the claim, or find the fire time already
+  covered once they hold it, skip. Cooperative jobs (the sharded monthly
+  rent update) run everywhere and split the work between them.
+
+Provides:
+- periodic(job_id, exclusive=True, misfire_grace_time=None, **cron)  # decorator
+- JOBS                                  # registry: job_id -> JobSpec
+- run_job(job_id, catch_up=False)       # what APScheduler calls (also `flask run-job`)
+- start_scheduler(app) / configure_scheduler()
+- job_stats(limit=20) -> list of dicts  # durations for /admin/jobs
+"""
+
+import time
+import logging
+import statistics
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytz
+from flask import current_app
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.triggers.cron import CronTrigger
+
+from rentme.extensions import db
+from rentme.models import JobRun
+from rentme.metrics import observe_job
+
+
+# --------------------------------------------------
+# Timezone / logger
+# --------------------------------------------------
+KENYA_TZ = pytz.timezone("Africa/Nairobi")
+
+logger = logging.getLogger("rentme.scheduler")
+
+# --------------------------------------------------
+# Scheduler (DEFINED ONLY — NEVER AUTO-START)
+# --------------------------------------------------
+scheduler = BackgroundScheduler(timezone=KENYA_TZ)
+
+# Flask app the jobs run under (set by start_scheduler)
+_app = None
+
+JobSpec = namedtuple("JobSpec", "job_id func trigger exclusive misfire_grace_time")
+JOBS = {}
+
+
+def periodic(job_id: str, exclusive: bool = True, misfire_grace_time: int = None, **cron):
+    """
+    Register a periodic job. `cron` are CronTrigger fields (day, hour, ...),
+    evaluated in Kenya time. The function runs inside the app context and
+    returns rows affected (int), a dict with "rows" / "skipped", or None.
+    """
+    def decorator(func):
+        JOBS[job_id] = JobSpec(
+            job_id, func, CronTrigger(timezone=KENYA_TZ, **cron), exclusive, misfire_grace_time
+        )
+        return func
+    return decorator
+
+
+# --------------------------------------------------
+# Jobs
+# --------------------------------------------------
+@periodic("monthly_rent_update", exclusive=False, day=1, hour=2, minute=0)
+def monthly_rent_update():
+    """Sharded: every worker claims owner-id shards until none are left."""
+    from rentme.jobs import run_monthly_rent_job
+    return run_monthly_rent_job()
+
+
+@periodic("monthly_close", day=1, hour=3, minute=0)
+def monthly_close():
+    """After the rent update so last month's charges are complete."""
+    from rentme.month_close import close_month_all
+    counts = close_month_all()
+    if counts["failed"]:
+        # Recorded as failed so the next start catches up; closed landlords are skipped then
+        raise RuntimeError(f"{counts['failed']} landlord(s) failed to close")
+    return {"rows": counts["closed"], "skipped": not counts["closed"]}
+
+
+@periodic("arrears_reminders", day=5, hour=10, minute=0)
+def arrears_reminders():
+    """Opted-in landlords only; resumes an interrupted campaign."""
+    from rentme.campaigns import run_arrears_campaign
+    campaign = run_arrears_campaign()
+    if campaign is None:
+        return {"rows": 0, "skipped": True}
+    return campaign.queued
+
+
+@periodic("collections_rollup", hour=1, minute=30)
+def collections_rollup():
+    """Nightly: this month and last month's collections for every landlord."""
+    from rentme.collection_stats import rebuild_recent
+    rows = rebuild_recent(months=2)
+    db.session.commit()
+    return rows
+
+
+@periodic("partition_maintenance", hour=4, minute=30)
+def partition_maintenance():
+    """Daily: upcoming monthly partitions exist before rows arrive (no-op off Postgres)."""
+    from rentme.partitions import maintain_partitions
+    result = maintain_partitions()
+    if not result:
+        return {"rows": 0, "skipped": True}
+    return sum(len(r["created"]) + len(r["archived"]) for r in result.values())
+
+
+# --------------------------------------------------
+# Run bookkeeping
+# --------------------------------------------------
+def _utc_naive(dt: datetime) -> datetime:
+    return dt.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def last_fire_time(trigger, now: datetime, lookback: timedelta):
+    """Latest fire time of `trigger` in (now - lookback, now], or None."""
+    last, prev = None, None
+    cursor = now - lookback
+    for _ in range(10000):
+        nxt = trigger.get_next_fire_time(prev, cursor)
+        if nxt is None or nxt > now:
+            break
+        last = prev = nxt
+        cursor = nxt + timedelta(microseconds=1)
+    return last
+
+
+def _covered(job_id: str, scheduled_for: datetime) -> bool:
+    return db.session.query(JobRun.id).filter(
+        JobRun.job_name == job_id,
+        JobRun.scheduled_for >= scheduled_for,
+        JobRun.status.in_(("success", "skipped")),
+    ).first() is not None
+
+
+def _flask_app():
+    return _app or current_app._get_current_object()
+
+
+def _catchup_lookback() -> timedelta:
+    return timedelta(days=_flask_app().config.get("SCHEDULER_CATCHUP_DAYS", 35))
+
+
+def _result_rows(result):
+    if isinstance(result, dict):
+        return result.get("rows"), bool(result.get("skipped"))
+    if isinstance(result, int):
+        return result, False
+    return None, False
+
+
+def _warn_if_slow(job_id: str, duration_ms: int):
+    recent = [
+        r[0] for r in
+        db.session.query(JobRun.duration_ms)
+        .filter(JobRun.job_name == job_id, JobRun.status == "success", JobRun.duration_ms.isnot(None))
+        .order_by(JobRun.started_at.desc())
+        .limit(10)
+        .offset(1)
+    ]
+    if len(recent) >= 3:
+        median = statistics.median(recent)
+        if median and duration_ms > 2 * median:
+            logger.warning(
+                "⚠️ %s took %sms, over 2x its recent median (%sms)", job_id, duration_ms, int(median),
+                extra={"job": job_id, "duration_ms": duration_ms, "median_ms": int(median)},
+            )
+
+
+def run_job(job_id: str, catch_up: bool = False):
+    """Execute a registered job and record it in job_runs."""
+    from rentme.jobs import holder_id, claim_job, release_job, lease_keeper
+
+    spec = JOBS[job_id]
+    with _flask_app().app_context():
+        fire = last_fire_time(spec.trigger, datetime.now(KENYA_TZ), _catchup_lookback())
+        scheduled_for = _utc_naive(fire) if fire else None
+        holder = holder_id()
+
+        if not spec.exclusive:
+            _execute(spec, scheduled_for, holder, catch_up)
+            return
+
+        if not claim_job(job_id, holder):
+            logger.info("⏭ %s is running on another worker — skipping", job_id)
+            return
+        keeper = lease_keeper(job_id, holder)
+        try:
+            # Checked under the lease: a run that finished before our claim is seen here
+            if scheduled_for and _covered(job_id, scheduled_for):
+                logger.info("⏭ %s already ran for %s — skipping", job_id, scheduled_for)
+                return
+            _execute(spec, scheduled_for, holder, catch_up)
+        finally:
+            keeper.stop()
+            keeper.join(timeout=5)
+            db.session.rollback()
+            release_job(job_id, holder)
+
+
+def _execute(spec: JobSpec, scheduled_for, holder: str, catch_up: bool):
+    """Record a job_runs row around one execution of `spec`."""
+    job_id = spec.job_id
+    run = JobRun(job_name=job_id, scheduled_for=scheduled_for, holder=holder, catch_up=catch_up)
+    db.session.add(run)
+    db.session.commit()
+    run_id = run.id
+
+    started = time.perf_counter()
+    try:
+        result = spec.func()
+    except Exception as e:
+        db.session.rollback()
+        run = db.session.get(JobRun, run_id)
+        run.status = "failed"
+        run.error = str(e)[:500]
+        run.finished_at = datetime.utcnow()
+        run.duration_ms = int((time.perf_counter() - started) * 1000)
+        db.session.commit()
+        observe_job(job_id, "failed", run.duration_ms / 1000)
+        logger.exception("❌ %s failed", job_id)
+        return
+
+    rows, skipped = _result_rows(result)
+    run = db.session.get(JobRun, run_id)
+    run.status = "skipped" if skipped else "success"
+    run.rows = rows
+    run.finished_at = datetime.utcnow()
+    run.duration_ms = int((time.perf_counter() - started) * 1000)
+    db.session.commit()
+    # The sharded monthly job reports completed only to the process that closed the run
+    completed = result.get("completed", True) if isinstance(result, dict) else True
+    observe_job(job_id, run.status, run.duration_ms / 1000, completed=completed)
+
+    logger.info(
+        "✅ %s %s in %sms (%s rows)", job_id, run.status, run.duration_ms, rows,
+        extra={"job": job_id, "duration_ms": run.duration_ms, "rows": rows},
+    )
+    if run.status == "success":
+        _warn_if_slow(job_id, run.duration_ms)
+
+
+def job_stats(limit: int = 20) -> list:
+    """Recent runs and duration summary per registered job."""
+    out = []
+    for job_id in sorted(JOBS):
+        runs = (
+            JobRun.query
+            .filter(JobRun.job_name == job_id)
+            .order_by(JobRun.started_at.desc())
+            .limit(limit)
+            .all()
+        )
+        durations = sorted(r.duration_ms for r in runs if r.status == "success" and r.duration_ms is not None)
+        out.append({
+            "job": job_id,
+            "last_status": runs[0].status if runs else None,
+            "last_started_at": runs[0].started_at.isoformat() if runs else None,
+            "median_ms": int(statistics.median(durations)) if durations else None,
+            "max_ms": durations[-1] if durations else None,
+            "runs": [
+                {
+                    "started_at": r.started_at.isoformat(),
+                    "scheduled_for": r.scheduled_for.isoformat() if r.scheduled_for else None,
+                    "status": r.status,
+                    "rows": r.rows,
+                    "duration_ms": r.duration_ms,
+                    "catch_up": r.catch_up,
+                    "holder": r.holder,
+                    "error": r.error,
+                }
+                for r in runs
+            ],
+        })
+    return out
+
+
+# --------------------------------------------------
+# Setup
+# --------------------------------------------------
+def configure_scheduler():
+    """
+    Register scheduler jobs ONLY.
+    Does NOT start the scheduler.
+    """
+    with _app.app_context():
+        scheduler.configure(jobstores={"default": MemoryJobStore()})
+
+    grace = int(_app.config.get("SCHEDULER_MISFIRE_GRACE_SECONDS", 3600))
+    for spec in JOBS.values():
+        scheduler.add_job(
+            func=run_job,
+            args=[spec.job_id],
+            trigger=spec.trigger,
+            id=spec.job_id,
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=spec.misfire_grace_time or grace,
+        )
+
+    logger.info("📅 Scheduler jobs configured (not started): %s", ", ".join(sorted(JOBS)))
+
+
+def _schedule_catch_up():
+    """Queue one immediate run for each job whose latest fire time was missed."""
+    now = datetime.now(KENYA_TZ)
+    with _app.app_context():
+        for spec in JOBS.values():
+            fire = last_fire_time(spec.trigger, now, _catchup_lookback())
+            if fire is None or _covered(spec.job_id, _utc_naive(fire)):
+                continue
+            logger.warning("⏰ %s missed its %s run — catching up", spec.job_id, fire.isoformat())
+            scheduler.add_job(
+                func=run_job,
+                args=[spec.job_id],
+                kwargs={"catch_up": True},
+                trigger="date",
+                run_date=now + timedelta(seconds=5),
+                id=f"catch_up:{spec.job_id}",
+                replace_existing=True,
+            )
+
+
+def start_scheduler(app):
+    """
+    Start scheduler explicitly; jobs run inside `app`'s context.
+    USE ONLY IN:
+    - Background worker
+    - Local development
+    NEVER from Flask app startup.
+    """
+    global _app
+    if scheduler.running:
+        logger.warning("⚠️ Scheduler already running — start skipped")
+        return
+
+    _app = app
+    configure_scheduler()
+    scheduler.start()
+    _schedule_catch_up()
+    logger.info("🕓 Scheduler started — %s periodic jobs ACTIVE", len(JOBS))
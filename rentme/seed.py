@@ -0,0 +1,374 @@
+# rentme/seed.py
+"""
+Synthetic data for scale testing (`flask seed-bench`).
+
+Bulk-loads landlords with their settings, tenants, years of payments and
+audit rows straight into the tables: COPY on Postgres (psycopg2), one
+executemany per table and batch elsewhere. Nothing goes through the ORM,
+so no mapper hooks run; rent charges and the aging / collections rollups
+are rebuilt set-based afterwards.
+
+Everything is derived from the seed and the landlord's index (one
+random.Random per landlord), so the same arguments always produce the same
+rows. Users, settings and tenants get explicit ids (landlord i is user i+1,
+its tenants are i*tenants+1 ...); payments and audit rows take theirs from
+the sequences, so with --jobs > 1 only those ids depend on timing.
+
+Shapes the data on purpose:
+- phones in the formats people type (07.., +2547.., 2547.., spaced, 01..)
+  and a few tenants sharing a phone (one person, two units)
+- house numbers as used for paybill account refs (A12, #12, Hse 4, B-07),
+  with the occasional duplicate inside one landlord
+- payer profiles: punctual, late (often split in two), chronic (partial or
+  skipped months) and ahead (several months at once), plus duplicate payments
+
+    flask seed-bench --landlords 10000 --tenants 100 --years 5 --jobs 8
+
+gives ~1M tenants and ~50M payments. Every landlord logs in with
+BENCH_PASSWORD.
+
+Provides:
+- BENCH_PASSWORD
+- seed_bench(landlords, tenants, years=2, seed=42, jobs=1, batch=200_000, rollups=True, echo=print) -> dict
+"""
+
+import io
+import csv
+import time
+import random
+import logging
+from datetime import date, datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from flask import current_app
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+from rentme.extensions import db
+from rentme.models import User, LandlordSettings, Tenant, Payment, AuditLog
+from rentme.ledger import month_start, next_month, current_date
+
+
+log = logging.getLogger(__name__)
+
+BENCH_PASSWORD = "bench-password"
+EMAIL_DOMAIN = "bench.rentana.test"
+OWNERS_PER_CHUNK = 500
+
+FIRST_NAMES = (
+    "Wanjiru", "Otieno", "Achieng", "Kamau", "Mwangi", "Njeri", "Kiptoo", "Chebet", "Mutua", "Wambui",
+    "Omondi", "Akinyi", "Kariuki", "Nyambura", "Kibet", "Jepkoech", "Ochieng", "Atieno", "Mohamed",
+    "Amina", "Brian", "Faith", "Kevin", "Mercy", "Dennis", "Grace", "Collins", "Esther", "Peter", "Joy",
+)
+LAST_NAMES = (
+    "Kamau", "Otieno", "Mwangi", "Odhiambo", "Njoroge", "Wafula", "Kiprono", "Mutiso", "Ndungu",
+    "Onyango", "Cheruiyot", "Maina", "Wanyama", "Barasa", "Kimani", "Owino", "Hassan", "Mohamud",
+    "Gitau", "Karanja", "Langat", "Nyaga", "Muriuki", "Ouma", "Kilonzo",
+)
+RENT_LEVELS = (3500, 4500, 6000, 8000, 10000, 12000, 15000, 20000, 25000, 35000, 50000)
+RENT_WEIGHTS = (4, 10, 16, 18, 14, 12, 10, 7, 4, 3, 2)
+PROFILES = ("punctual", "late", "chronic", "ahead")
+PROFILE_WEIGHTS = (60, 25, 10, 5)
+AUDIT_ACTIONS = ("user_logged_in", "payment_added", "tenant_edited", "tenant_added", "payment_edited")
+AUDIT_WEIGHTS = (60, 20, 10, 5, 5)
+
+COLUMNS = {
+    "user": ("id", "full_name", "email", "login_phone", "password_hash", "is_admin", "created_at",
+             "payment_method", "mpesa_env"),
+    "landlord_settings": ("id", "user_id", "payment_method", "paybill_number", "till_number",
+                          "send_money_number", "mpesa_mode", "arrears_reminders_enabled",
+                          "reminder_quiet_start", "reminder_quiet_end", "created_at", "updated_at"),
+    "tenant": ("id", "owner_id", "name", "phone", "national_id", "house_no", "monthly_rent",
+               "move_in_date", "created_at"),
+    "payment": ("transaction_id", "amount", "paid_at", "created_at", "note", "tenant_id"),
+    "audit_log": ("user_id", "action", "meta", "created_at"),
+}
+TABLES = {"user": User, "landlord_settings": LandlordSettings, "tenant": Tenant,
+          "payment": Payment, "audit_log": AuditLog}
+
+
+# ---------------------------------------------------------------------
+# Value generators
+# ---------------------------------------------------------------------
+def _phone(rng) -> str:
+    prefix = rng.choices(("7", "11"), (85, 15))[0]
+    digits = prefix + str(rng.randrange(10 ** (9 - len(prefix)))).zfill(9 - len(prefix))
+    style = rng.choices(range(5), (55, 15, 12, 10, 8))[0]
+    if style == 0:
+        return "0" + digits
+    if style == 1:
+        return "+254" + digits
+    if style == 2:
+        return "254" + digits
+    if style == 3:
+        return f"0{digits[:3]} {digits[3:6]} {digits[6:]}"
+    return digits
+
+
+def _house_no(rng, n: int, block: str) -> str:
+    style = rng.choices(range(4), (55, 20, 15, 10))[0]
+    if style == 0:
+        return f"{block}{n}"
+    if style == 1:
+        return f"#{n}"
+    if style == 2:
+        return f"Hse {n}"
+    return f"{block}-{n:02d}"
+
+
+def _transaction_id(tenant_id: int, seq: int) -> str:
+    # M-Pesa style: 10 upper-case characters, unique by construction
+    n, out = tenant_id * 1024 + seq, ""
+    while n:
+        n, r = divmod(n, 36)
+        out = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"[r] + out
+    return "S" + out.rjust(9, "0")
+
+
+def _paid_at(rng, period: date, day: int) -> datetime:
+    return datetime(period.year, period.month, min(day, 28), rng.randrange(6, 22), rng.randrange(60))
+
+
+def _tenant_payments(rng, tenant_id: int, rent: float, periods: list, today: date) -> list:
+    """(transaction_id, amount, paid_at, created_at, note, tenant_id) rows for one tenant."""
+    profile = rng.choices(PROFILES, PROFILE_WEIGHTS)[0]
+    rows, seq, owed = [], 0, 0.0
+
+    def pay(amount, period, day):
+        nonlocal seq
+        paid_at = _paid_at(rng, period, day)
+        if paid_at.date() > today:
+            return
+        note = rng.choices(("M-Pesa", "Cash", "Bank transfer", None), (80, 8, 4, 8))[0]
+        rows.append((_transaction_id(tenant_id, seq), round(amount, 2), paid_at, paid_at, note, tenant_id))
+        seq += 1
+        if rng.random() < 0.01:
+            # Paid twice by mistake: same amount, same day
+            again = paid_at + timedelta(minutes=rng.randrange(1, 90))
+            rows.append((_transaction_id(tenant_id, seq), round(amount, 2), again, again, note, tenant_id))
+            seq += 1
+
+    for i, period in enumerate(periods):
+        if profile == "punctual":
+            pay(rent, period, rng.randint(1, 5))
+        elif profile == "late":
+            day = rng.randint(6, 25)
+            if rng.random() < 0.3:
+                first = round(rent * rng.choice((0.4, 0.5, 0.6)), -2)
+                pay(first, period, day)
+                pay(rent - first, period, day + rng.randint(3, 10))
+            else:
+                pay(rent, period, day)
+        elif profile == "chronic":
+            owed += rent
+            if rng.random() < 0.25:
+                continue
+            amount = round(rent * rng.uniform(0.5, 0.9), -2)
+            if owed > 2 * rent and rng.random() < 0.3:
+                amount = owed  # catches up now and then
+            pay(amount, period, rng.randint(10, 28))
+            owed -= amount
+        elif i % 3 == 0:
+            pay(rent * min(3, len(periods) - i), period, rng.randint(1, 3))
+    return rows
+
+
+# ---------------------------------------------------------------------
+# One landlord
+# ---------------------------------------------------------------------
+def _landlord_rows(index: int, spec: dict) -> dict:
+    rng = random.Random(spec["seed"] * 1_000_003 + index)
+    today, start = spec["today"], spec["start"]
+    user_id = index + 1
+    created = datetime.combine(start, datetime.min.time()) - timedelta(days=rng.randrange(30, 400))
+    method = rng.choices(("Paybill", "Till", "SendMoney"), (60, 30, 10))[0]
+
+    out = {name: [] for name in COLUMNS}
+    out["user"].append((
+        user_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        f"landlord{index:06d}@{EMAIL_DOMAIN}", f"07{90000000 + index:08d}", spec["password_hash"],
+        False, created, method, "production",
+    ))
+    quiet = rng.random() < 0.5
+    out["landlord_settings"].append((
+        user_id, user_id, method,
+        str(200000 + index) if method == "Paybill" else None,
+        str(5000000 + index) if method == "Till" else None,
+        f"07{80000000 + index:08d}" if method == "SendMoney" else None,
+        "production", rng.random() < 0.3,
+        21 if quiet else None, 7 if quiet else None, created, created,
+    ))
+
+    base_rent = rng.choices(RENT_LEVELS, RENT_WEIGHTS)[0]
+    blocks = "ABCDEFGH"[:rng.randint(1, 8)]
+    phones, houses = [], []
+    months = spec["periods"]
+    for j in range(spec["tenants"]):
+        tenant_id = index * spec["tenants"] + j + 1
+        if phones and rng.random() < 0.03:
+            phone = rng.choice(phones)
+        else:
+            phone = _phone(rng)
+            phones.append(phone)
+        if houses and rng.random() < 0.02:
+            house = rng.choice(houses)
+        else:
+            house = _house_no(rng, j + 1, rng.choice(blocks))
+            houses.append(house)
+        rent = float(max(2000, round(base_rent * rng.uniform(0.8, 1.25), -2)))
+
+        # Most tenants predate the window; the rest moved in during it
+        first = 0 if rng.random() < 0.7 else rng.randrange(len(months))
+        move_in = months[first] + timedelta(days=rng.randrange(28)) if first else months[0]
+        out["tenant"].append((
+            tenant_id, user_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", phone,
+            f"{rng.randrange(10**7, 4 * 10**7)}" if rng.random() < 0.9 else None, house, rent,
+            move_in, datetime.combine(move_in, datetime.min.time()),
+        ))
+        paid_from = months[first + 1:] if first else months
+        out["payment"].extend(_tenant_payments(rng, tenant_id, rent, paid_from, today))
+
+    for period in months:
+        for _ in range(rng.randint(4, 16)):
+            action = rng.choices(AUDIT_ACTIONS, AUDIT_WEIGHTS)[0]
+            at = _paid_at(rng, period, rng.randint(1, 28))
+            if at.date() > today:
+                continue
+            if action == "user_logged_in":
+                meta = f"id:{user_id}"
+            else:
+                meta = f"tenant_id:{index * spec['tenants'] + rng.randrange(spec['tenants']) + 1}"
+            out["audit_log"].append((user_id, action, meta, at))
+    return out
+
+
+# ---------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------
+def _copy(conn, name: str, rows: list):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    table = conn.dialect.identifier_preparer.quote(name)
+    with conn.connection.driver_connection.cursor() as cur:
+        cur.copy_expert(f"COPY {table} ({', '.join(COLUMNS[name])}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def _executemany(conn, name: str, rows: list):
+    cols = COLUMNS[name]
+    conn.execute(TABLES[name].__table__.insert(), [dict(zip(cols, r)) for r in rows])
+
+
+def _write(buffers: dict):
+    conn = db.session.connection()
+    write = _copy if conn.dialect.driver == "psycopg2" else _executemany
+    # FK order
+    for name in COLUMNS:
+        if buffers[name]:
+            write(conn, name, buffers[name])
+    db.session.commit()
+
+
+def _load_range(lo: int, hi: int, spec: dict) -> dict:
+    """Generate and write landlords [lo, hi). Commits every `batch` payments."""
+    counts = dict.fromkeys(COLUMNS, 0)
+    buffers = {name: [] for name in COLUMNS}
+    for index in range(lo, hi):
+        for name, rows in _landlord_rows(index, spec).items():
+            buffers[name].extend(rows)
+            counts[name] += len(rows)
+        if len(buffers["payment"]) >= spec["batch"] or index == hi - 1:
+            _write(buffers)
+            buffers = {name: [] for name in COLUMNS}
+    return counts
+
+
+_fork_app = None
+
+
+def _load_range_forked(lo: int, hi: int, spec: dict) -> dict:
+    with _fork_app.app_context():
+        db.engine.dispose(close=False)  # never reuse the parent's connections
+        return _load_range(lo, hi, spec)
+
+
+# ---------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------
+def _fix_sequences():
+    if db.engine.dialect.name != "postgresql":
+        return
+    for name in ("user", "landlord_settings", "tenant"):
+        table = db.engine.dialect.identifier_preparer.quote(name)
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT max(id) FROM {table}), 1))"
+        ))
+    db.session.commit()
+
+
+def _rebuild(landlords: int, echo):
+    from rentme.ledger import generate_rent_charges
+    from rentme.aging import rebuild_owner_range
+
+    t0 = time.perf_counter()
+    charges = 0
+    for lo in range(1, landlords + 1, OWNERS_PER_CHUNK):
+        charges += generate_rent_charges(owner_range=(lo, lo + OWNERS_PER_CHUNK))
+        rebuild_owner_range(lo, lo + OWNERS_PER_CHUNK)
+        db.session.commit()
+    echo(f"  {charges:,} rent charges + aging in {time.perf_counter() - t0:.1f}s")
+    return charges
+
+
+def seed_bench(landlords: int, tenants: int, years: int = 2, seed: int = 42, jobs: int = 1,
+               batch: int = 200_000, rollups: bool = True, echo=print) -> dict:
+    """Load the dataset into an empty database. Returns row counts per table."""
+    global _fork_app
+
+    today = current_date()
+    start = month_start(today).replace(year=today.year - years)
+    periods, period = [], start
+    while period <= today:
+        periods.append(period)
+        period = next_month(period)
+    spec = {
+        "seed": seed, "tenants": tenants, "today": today, "start": start, "periods": periods,
+        "batch": batch, "password_hash": generate_password_hash(BENCH_PASSWORD),
+    }
+
+    t0 = time.perf_counter()
+    jobs = max(1, min(jobs, landlords))
+    if jobs == 1 or db.engine.dialect.name != "postgresql":
+        counts = _load_range(0, landlords, spec)
+    else:
+        # Parallel only where the database takes concurrent writers well
+        _fork_app = current_app._get_current_object()
+        db.session.remove()
+        db.engine.dispose()
+        step = -(-landlords // jobs)
+        ranges = [(lo, min(lo + step, landlords)) for lo in range(0, landlords, step)]
+        counts = dict.fromkeys(COLUMNS, 0)
+        with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context("fork")) as pool:
+            for part in pool.map(_load_range_forked, *zip(*ranges), [spec] * len(ranges)):
+                for name, n in part.items():
+                    counts[name] += n
+    elapsed = time.perf_counter() - t0
+    echo(
+        f"  loaded {counts['user']:,} landlords, {counts['tenant']:,} tenants, {counts['payment']:,} payments, "
+        f"{counts['audit_log']:,} audit rows in {elapsed:.1f}s ({counts['payment'] / elapsed:,.0f} payments/s)"
+    )
+
+    _fix_sequences()
+    if rollups:
+        counts["rent_charge"] = _rebuild(landlords, echo)
+        from rentme.collection_stats import rebuild_recent
+        t0 = time.perf_counter()
+        rebuild_recent(months=len(periods))
+        db.session.commit()
+        echo(f"  collections rollup in {time.perf_counter() - t0:.1f}s")
+
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+    return counts
@@ -0,0 +1,487 @@
+# rentme/sms.py
+"""
+SMS outbox + provider delivery.
+
+Request handlers call `queue_sms()` (one INSERT); worker.py calls
+`drain_sms_outbox()`, which claims due rows, groups identical texts into
+multi-recipient Africa's Talking sends, respects per-provider rate limits and
+retries failures with exponential backoff. Results are committed after every
+provider call, together with a renewed lease (SMS_LEASE_SECONDS) on the rows
+still waiting, so a batch held back by the rate limit is never reclaimed by
+another worker, and a crash only resends the call in flight.
+
+SMS_RATE_LIMITS is a token bucket per provider kept in Redis
+(SMS_RATE_STORAGE_URL, REDIS_URL by default), so all worker processes
+together stay under the provider's rate. Without Redis, or while it is
+unreachable, each process keeps its own bucket and N workers send up to N
+times the configured rate.
+
+Provides:
+- queue_sms(recipient, message, template=None, period=None, provider=None, not_before=None)
+- queue_sms_bulk(rows)                  # list of dicts, dedupe-aware, no commit
+- send_now(recipient, message, provider=None) -> bool   # synchronous, cached client
+- drain_sms_outbox(batch_size=None) -> int
+- sms_metrics() -> {provider: {...}}
+"""
+
+import time
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from rentme.extensions import db
+from rentme.models import SmsOutbox, insert_ignore
+from rentme.utils import normalize_msisdn
+from rentme.metrics import observe_outbound
+
+
+log = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------
+# Metrics (per process; exported by the worker)
+# ---------------------------------------------------------------------
+_METRICS_LOCK = threading.Lock()
+_METRICS = {}
+
+
+def _record(provider: str, ok: int, failed: int, seconds: float):
+    with _METRICS_LOCK:
+        m = _METRICS.setdefault(provider, {
+            "sent": 0, "failed": 0, "calls": 0,
+            "latency_total_s": 0.0, "latency_max_s": 0.0,
+        })
+        m["sent"] += ok
+        m["failed"] += failed
+        m["calls"] += 1
+        m["latency_total_s"] += seconds
+        m["latency_max_s"] = max(m["latency_max_s"], seconds)
+    # A call that delivered nothing counts as a provider error
+    observe_outbound(provider, seconds, error=not ok and failed > 0)
+
+
+def sms_metrics() -> dict:
+    with _METRICS_LOCK:
+        out = {}
+        for provider, m in _METRICS.items():
+            out[provider] = dict(m)
+            out[provider]["latency_avg_s"] = (
+                round(m["latency_total_s"] / m["calls"], 4) if m["calls"] else 0.0
+            )
+        return out
+
+
+# ---------------------------------------------------------------------
+# Providers (clients built once per process)
+# ---------------------------------------------------------------------
+class ProviderNotConfigured(Exception):
+    pass
+
+
+class _AfricasTalking:
+    name = "africastalking"
+    max_recipients = 100
+
+    def __init__(self):
+        self._sms = None
+
+    def _client(self):
+        if self._sms is None:
+            cfg = current_app.config
+            username = cfg.get("AT_USERNAME") or cfg.get("AFRICASTALKING_USERNAME")
+            api_key = cfg.get("AT_API_KEY") or cfg.get("AFRICASTALKING_API_KEY")
+            if not username or not api_key:
+                raise ProviderNotConfigured("Africa's Talking credentials not configured")
+            import africastalking
+            africastalking.initialize(username=username, api_key=api_key)
+            self._sms = africastalking.SMS
+        return self._sms
+
+    def send(self, recipients: list, message: str) -> dict:
+        """Return {recipient: (ok, message_id_or_error)}."""
+        sms = self._client()
+        sender = current_app.config.get("AT_SENDER")
+        kwargs = {"sender_id": sender} if sender else {}
+        resp = sms.send(message, [f"+{r}" for r in recipients], **kwargs)
+
+        results = {r: (False, "no status returned") for r in recipients}
+        for item in (resp or {}).get("SMSMessageData", {}).get("Recipients", []):
+            number = str(item.get("number", "")).lstrip("+")
+            ok = str(item.get("status", "")).lower() == "success"
+            results[number] = (ok, item.get("messageId") if ok else item.get("status"))
+        return results
+
+
+class _Twilio:
+    name = "twilio"
+    max_recipients = 1
+
+    def __init__(self):
+        self._client_obj = None
+        self._sender = None
+
+    def _client(self):
+        if self._client_obj is None:
+            import os
+            cfg = current_app.config
+            sid = cfg.get("TWILIO_SID") or os.getenv("TWILIO_SID") or os.getenv("TWILIO_ACCOUNT_SID")
+            token = cfg.get("TWILIO_TOKEN") or os.getenv("TWILIO_TOKEN") or os.getenv("TWILIO_AUTH_TOKEN")
+            self._sender = cfg.get("TWILIO_FROM") or os.getenv("TWILIO_FROM")
+            if not (sid and token and self._sender):
+                raise ProviderNotConfigured("Twilio not configured")
+            try:
+                from twilio.rest import Client as TwilioClient
+            except ImportError:
+                # Optional dependency: retrying will not install it
+                raise ProviderNotConfigured("twilio package not installed")
+            self._client_obj = TwilioClient(sid, token)
+        return self._client_obj
+
+    def send(self, recipients: list, message: str) -> dict:
+        client = self._client()
+        results = {}
+        for r in recipients:
+            msg = client.messages.create(body=message, from_=self._sender, to=f"+{r}")
+            results[r] = (True, getattr(msg, "sid", None))
+        return results
+
+
+_PROVIDERS = {"africastalking": _AfricasTalking(), "twilio": _Twilio()}
+
+
+def _provider(name: str):
+    p = _PROVIDERS.get(name)
+    if p is None:
+        raise ProviderNotConfigured(f"Unknown SMS provider {name}")
+    return p
+
+
+# ---------------------------------------------------------------------
+# Rate limiting (token bucket per provider, shared through Redis)
+# ---------------------------------------------------------------------
+def parse_rates(raw: str) -> dict:
+    """'africastalking=20,twilio=1' -> {'africastalking': 20.0, 'twilio': 1.0} (msgs/sec)"""
+    rates = {}
+    for part in (raw or "").split(","):
+        if "=" in part:
+            name, rate = part.split("=", 1)
+            try:
+                rates[name.strip()] = float(rate)
+            except ValueError:
+                continue
+    return rates
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self, n: int):
+        """Block until n tokens are available (worker only)."""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Requests bigger than the bucket go through once it is full
+            if self.tokens >= min(n, self.capacity):
+                self.tokens -= n
+                return
+            time.sleep((min(n, self.capacity) - self.tokens) / self.rate)
+
+
+# Same refill / take rules as _TokenBucket, atomically on the Redis clock.
+# Returns 0 when the tokens were taken, else the seconds to wait (as a string).
+_SHARED_TAKE = """
+local rate, cap, n = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(b[1]) or cap
+local updated = tonumber(b[2]) or now
+tokens = math.min(cap, tokens + (now - updated) * rate)
+local need = math.min(n, cap)
+local wait = 0
+if tokens >= need then
+    tokens = tokens - n
+else
+    wait = (need - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(cap / rate) + 60)
+return tostring(wait)
+"""
+
+
+class _SharedTokenBucket:
+    def __init__(self, client, provider: str, rate: float):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.key = f"rentme:sms:bucket:{provider}"
+        self._take = client.register_script(_SHARED_TAKE)
+
+    def take(self, n: int):
+        """Block until n tokens are available across all workers."""
+        while True:
+            wait = float(self._take(keys=[self.key], args=[self.rate, self.capacity, n]))
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+_BUCKETS = {}
+_REDIS = {}
+
+
+def _redis_client(url: str):
+    client = _REDIS.get(url)
+    if client is None:
+        import redis
+        client = _REDIS[url] = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+    return client
+
+
+def _throttle(provider: str, n: int):
+    rate = parse_rates(current_app.config.get("SMS_RATE_LIMITS", "")).get(provider)
+    if not rate:
+        return
+    url = current_app.config.get("SMS_RATE_STORAGE_URL")
+    if url:
+        bucket = _BUCKETS.get(("shared", provider))
+        if bucket is None or bucket.rate != rate:
+            bucket = _BUCKETS[("shared", provider)] = _SharedTokenBucket(_redis_client(url), provider, rate)
+        try:
+            bucket.take(n)
+            return
+        except Exception as e:
+            log.warning("Shared SMS rate limit unavailable, using this process's bucket: %s", e)
+
+    bucket = _BUCKETS.get(provider)
+    if bucket is None or bucket.rate != rate:
+        bucket = _BUCKETS[provider] = _TokenBucket(rate)
+    bucket.take(n)
+
+
+# ---------------------------------------------------------------------
+# Producer side
+# ---------------------------------------------------------------------
+def _dedupe_key(recipient, template, period) -> Optional[str]:
+    if template and period:
+        return f"{recipient}|{template}|{period}"[:160]
+    return None
+
+
+def _row(recipient, message, template=None, period=None, provider=None, not_before=None) -> Optional[dict]:
+    number = normalize_msisdn(recipient)
+    if not number:
+        log.warning("SMS not queued: invalid recipient %r", recipient)
+        return None
+    now = datetime.utcnow()
+    return {
+        "provider": provider or current_app.config.get("SMS_PROVIDER", "africastalking"),
+        "recipient": number,
+        "message": message,
+        "template": template,
+        "period": period,
+        "dedupe_key": _dedupe_key(number, template, period),
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": not_before or now,
+        "created_at": now,
+    }
+
+
+def queue_sms(recipient, message, template=None, period=None, provider=None, not_before=None):
+    """
+    Add one message to the outbox and commit. Returns the row, or None when
+    the recipient is invalid or (recipient, template, period) was already queued.
+    """
+    data = _row(recipient, message, template, period, provider, not_before)
+    if not data:
+        return None
+
+    row = SmsOutbox(**data)
+    try:
+        with db.session.begin_nested():
+            db.session.add(row)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        log.info("SMS deduped: %s", data["dedupe_key"])
+        return None
+    return row
+
+
+def queue_sms_bulk(rows) -> int:
+    """
+    Insert many outbox rows in one statement, skipping dedupe conflicts.
+    `rows` are dicts with recipient/message and optional template/period/
+    provider/not_before. Does not commit. Returns rows handed to the DB.
+    """
+    values = [r for r in (
+        _row(d["recipient"], d["message"], d.get("template"), d.get("period"),
+             d.get("provider"), d.get("not_before"))
+        for d in rows
+    ) if r]
+    if not values:
+        return 0
+    db.session.execute(insert_ignore(SmsOutbox, ["dedupe_key"]), values)
+    return len(values)
+
+
+def send_now(recipient, message, provider=None) -> bool:
+    """Synchronous send for flows that need the result (e.g. reset codes)."""
+    number = normalize_msisdn(recipient)
+    if not number:
+        return False
+    name = provider or current_app.config.get("SMS_PROVIDER", "africastalking")
+    started = time.monotonic()
+    try:
+        ok, _ = _provider(name).send([number], message).get(number, (False, None))
+    except ProviderNotConfigured as e:
+        log.warning("SMS not sent (%s). Preview: %s", e, message[:120])
+        return False
+    except Exception:
+        log.exception("Immediate SMS via %s failed", name)
+        _record(name, 0, 1, time.monotonic() - started)
+        return False
+    _record(name, int(ok), int(not ok), time.monotonic() - started)
+    return ok
+
+
+# ---------------------------------------------------------------------
+# Consumer side (worker.py)
+# ---------------------------------------------------------------------
+def _backoff(attempts: int) -> timedelta:
+    base = current_app.config.get("SMS_RETRY_BASE_SECONDS", 30)
+    cap = current_app.config.get("SMS_RETRY_MAX_SECONDS", 3600)
+    return timedelta(seconds=min(cap, base * (2 ** max(0, attempts - 1))))
+
+
+# A claimed outbox row, read once so later commits don't reload it
+Claimed = namedtuple("Claimed", "id provider recipient message attempts")
+
+
+def _claim(batch_size: int):
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config.get("SMS_LEASE_SECONDS", 300))
+    rows = (
+        SmsOutbox.query
+        .filter(
+            or_(
+                and_(SmsOutbox.status == "pending", SmsOutbox.next_attempt_at <= now),
+                and_(SmsOutbox.status == "sending", SmsOutbox.next_attempt_at <= stale),
+            )
+        )
+        .order_by(SmsOutbox.next_attempt_at, SmsOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    claimed = []
+    for r in rows:
+        r.status = "sending"
+        r.attempts = (r.attempts or 0) + 1
+        r.next_attempt_at = now
+        claimed.append(Claimed(r.id, r.provider, r.recipient, r.message, r.attempts))
+    db.session.commit()
+    return claimed
+
+
+def _sent(row: Claimed, ref) -> dict:
+    return {
+        "id": row.id, "status": "sent", "sent_at": datetime.utcnow(),
+        "provider_message_id": str(ref) if ref else None, "last_error": None,
+    }
+
+
+def _fail(row: Claimed, error: str, retry: bool = True) -> dict:
+    max_attempts = current_app.config.get("SMS_MAX_ATTEMPTS", 5)
+    out = {"id": row.id, "status": "failed", "last_error": (error or "")[:500]}
+    if retry and row.attempts < max_attempts:
+        out.update(status="pending", next_attempt_at=datetime.utcnow() + _backoff(row.attempts))
+    return out
+
+
+def _checkpoint(results: list, unsent_ids: set):
+    """
+    Commit the results so far and renew the lease on rows still to send, so a
+    batch slowed down by the rate limit is not reclaimed (and sent twice) by
+    another worker, and a crash only resends the chunk in flight.
+    """
+    for keys in {tuple(sorted(r)) for r in results}:
+        db.session.execute(update(SmsOutbox), [r for r in results if tuple(sorted(r)) == keys])
+    if unsent_ids:
+        db.session.execute(
+            update(SmsOutbox)
+            .where(SmsOutbox.id.in_(unsent_ids), SmsOutbox.status == "sending")
+            .values(next_attempt_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    results.clear()
+
+
+def drain_sms_outbox(batch_size: int = None) -> int:
+    """
+    Send one batch of due messages, committing after every provider call.
+    Returns rows handled (0 = nothing due).
+    """
+    batch_size = batch_size or current_app.config.get("SMS_BATCH_SIZE", 500)
+    rows = _claim(batch_size)
+    if not rows:
+        return 0
+
+    # Identical text + provider -> one multi-recipient send
+    groups = {}
+    for r in rows:
+        groups.setdefault((r.provider, r.message), []).append(r)
+    unsent = {r.id for r in rows}
+    results = []
+
+    for (provider_name, message), group in groups.items():
+        try:
+            provider = _provider(provider_name)
+        except ProviderNotConfigured as e:
+            results.extend(_fail(r, str(e), retry=False) for r in group)
+            unsent.difference_update(r.id for r in group)
+            _checkpoint(results, unsent)
+            continue
+
+        for i in range(0, len(group), provider.max_recipients):
+            chunk = group[i:i + provider.max_recipients]
+            by_number = {}
+            for r in chunk:
+                by_number.setdefault(r.recipient, []).append(r)
+
+            _throttle(provider_name, len(by_number))
+            started = time.monotonic()
+            try:
+                sent = provider.send(list(by_number), message)
+            except ProviderNotConfigured as e:
+                results.extend(_fail(r, str(e), retry=False) for r in chunk)
+            except Exception as e:
+                log.exception("SMS batch via %s failed", provider_name)
+                _record(provider_name, 0, len(chunk), time.monotonic() - started)
+                results.extend(_fail(r, str(e)) for r in chunk)
+            else:
+                ok_count = 0
+                for number, chunk_rows in by_number.items():
+                    ok, ref = sent.get(number, (False, "no status returned"))
+                    for r in chunk_rows:
+                        results.append(_sent(r, ref) if ok else _fail(r, str(ref)))
+                        ok_count += bool(ok)
+                _record(provider_name, ok_count, len(chunk) - ok_count, time.monotonic() - started)
+            unsent.difference_update(r.id for r in chunk)
+            _checkpoint(results, unsent)
+
+    log.info("SMS outbox: handled %s message(s) in %s group(s)", len(rows), len(groups))
+    return len(rows)
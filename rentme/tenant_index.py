@@ -0,0 +1,306 @@
+# rentme/tenant_index.py
+"""
+In-process lookup index for C2B validation.
+
+`mpesa_validate` runs before Safaricom completes every payment, so it must
+not hit the database on the happy path. This module keeps:
+
+- business code (paybill / till / send-money number) -> owner id
+- per owner: house_key(house_no) -> tenant, normalized msisdn -> tenant
+
+house_key / house_key_sql are the one house-number normalization (case and
+spaces ignored); the confirmation path matches with the same rules, so a
+reference validation accepts is one confirmation can resolve.
+
+Owner partitions are loaded on first use. With TENANT_INDEX_WARM_ON_START the
+first lookup in a process loads everything instead (`warm()`, two queries);
+nothing is loaded at create_app, so CLI commands and the worker pay nothing.
+Partitions are bounded by TENANT_INDEX_MAX_OWNERS (least recently used are dropped) and
+expire after TENANT_INDEX_TTL seconds so writes made by other processes are
+picked up. Writes made in this process invalidate the affected partition
+immediately through mapper events. A miss always falls back to the DB; a
+tenant deleted by another process can still match for at most
+TENANT_INDEX_TTL seconds.
+
+Provides:
+- init_tenant_index(app)
+- owner_for_code(code)            -> owner id or None
+- find_tenant(owner_id, bill_ref) -> (owner_exists, IndexedTenant or None)
+- house_key(house_no) / house_key_sql(column)
+- warm()
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import event, inspect, or_, func
+
+from rentme.extensions import db
+from rentme.models import User, Tenant, LandlordSettings
+from rentme.utils import normalize_msisdn
+
+
+log = logging.getLogger(__name__)
+
+IndexedTenant = namedtuple("IndexedTenant", "id owner_id name house_no phone")
+
+
+class _Partition:
+    __slots__ = ("by_house", "by_phone", "loaded_at")
+
+    def __init__(self):
+        self.by_house = {}
+        self.by_phone = {}
+        self.loaded_at = time.monotonic()
+
+    def add(self, t: IndexedTenant):
+        if t.house_no:
+            self.by_house.setdefault(house_key(t.house_no), t)
+        msisdn = normalize_msisdn(t.phone)
+        if msisdn:
+            self.by_phone.setdefault(msisdn, t)
+
+
+def house_key(house_no: Optional[str]) -> str:
+    return (house_no or "").replace(" ", "").lower()
+
+
+def house_key_sql(column):
+    """house_key() as a SQL expression, for matching tenant.house_no in queries."""
+    return func.lower(func.replace(column, " ", ""))
+
+
+class TenantIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._codes = {}                  # business code -> owner id
+        self._codes_loaded_at = 0.0
+        self._owners = OrderedDict()      # owner id -> _Partition (LRU order)
+        self._warm_pending = False        # warm() on the first lookup
+
+    # -----------------------
+    # Config
+    # -----------------------
+    @staticmethod
+    def _ttl() -> float:
+        return float(current_app.config.get("TENANT_INDEX_TTL", 60))
+
+    @staticmethod
+    def _max_owners() -> int:
+        return int(current_app.config.get("TENANT_INDEX_MAX_OWNERS", 5000))
+
+    def _fresh(self, loaded_at: float) -> bool:
+        return time.monotonic() - loaded_at < self._ttl()
+
+    def _warm_once(self):
+        if self._warm_pending:
+            self._warm_pending = False
+            try:
+                self.warm()
+            except Exception as e:
+                db.session.rollback()
+                log.warning("Tenant index warm-up skipped: %s", e)
+
+    # -----------------------
+    # Business code -> owner
+    # -----------------------
+    def _load_codes(self):
+        rows = db.session.query(
+            LandlordSettings.user_id,
+            LandlordSettings.paybill_number,
+            LandlordSettings.till_number,
+            LandlordSettings.send_money_number,
+        ).all()
+        codes = {}
+        for user_id, paybill, till, send_money in rows:
+            for code in (paybill, till, send_money):
+                if code:
+                    codes.setdefault(code.strip(), user_id)
+        with self._lock:
+            self._codes = codes
+            self._codes_loaded_at = time.monotonic()
+
+    def owner_for_code(self, code: str) -> Optional[int]:
+        code = (code or "").strip()
+        if not code:
+            return None
+
+        self._warm_once()
+        if not self._fresh(self._codes_loaded_at):
+            self._load_codes()
+
+        owner_id = self._codes.get(code)
+        if owner_id is not None:
+            return owner_id
+
+        # Miss -> DB (settings saved by another process since the last load)
+        ls = LandlordSettings.query.filter(
+            (LandlordSettings.paybill_number == code) |
+            (LandlordSettings.till_number == code) |
+            (LandlordSettings.send_money_number == code)
+        ).first()
+        if ls:
+            with self._lock:
+                self._codes[code] = ls.user_id
+            return ls.user_id
+        return None
+
+    # -----------------------
+    # Owner partitions
+    # -----------------------
+    def _store_partitions(self, parts: dict):
+        with self._lock:
+            for owner_id, part in parts.items():
+                self._owners[owner_id] = part
+                self._owners.move_to_end(owner_id)
+            while len(self._owners) > self._max_owners():
+                self._owners.popitem(last=False)
+
+    def _load_owner(self, owner_id: int) -> Optional[_Partition]:
+        if not db.session.query(User.id).filter(User.id == owner_id).first():
+            return None
+
+        part = _Partition()
+        rows = db.session.query(
+            Tenant.id, Tenant.owner_id, Tenant.name, Tenant.house_no, Tenant.phone
+        ).filter(Tenant.owner_id == owner_id).all()
+        for row in rows:
+            part.add(IndexedTenant(*row))
+
+        self._store_partitions({owner_id: part})
+        return part
+
+    def _partition(self, owner_id: int) -> Optional[_Partition]:
+        part = self._owners.get(owner_id)
+        if part is not None and self._fresh(part.loaded_at):
+            with self._lock:
+                if owner_id in self._owners:
+                    self._owners.move_to_end(owner_id)
+            return part
+        return self._load_owner(owner_id)
+
+    def find_tenant(self, owner_id, bill_ref: str):
+        """
+        Return (owner_exists, tenant) for a validation request.
+        Same matching rules as before: house_no first, then the phone number
+        when the reference is all digits.
+        """
+        try:
+            owner_id = int(owner_id)
+        except (TypeError, ValueError):
+            return False, None
+
+        self._warm_once()
+        part = self._partition(owner_id)
+        if part is None:
+            return False, None
+
+        bill_ref = (bill_ref or "").strip()
+        if not bill_ref:
+            return True, None
+
+        hit = part.by_house.get(house_key(bill_ref))
+        if hit is None and bill_ref.isdigit():
+            msisdn = normalize_msisdn(bill_ref)
+            hit = part.by_phone.get(msisdn) if msisdn else None
+        if hit is not None:
+            return True, hit
+
+        # Miss -> DB fallback (tenant added elsewhere, or a partial phone number)
+        q = db.session.query(
+            Tenant.id, Tenant.owner_id, Tenant.name, Tenant.house_no, Tenant.phone
+        ).filter(Tenant.owner_id == owner_id)
+        conds = [house_key_sql(Tenant.house_no) == house_key(bill_ref)]
+        if bill_ref.isdigit():
+            conds.append(Tenant.phone.like(f"%{bill_ref}%"))
+        row = q.filter(or_(*conds)).first()
+        if not row:
+            return True, None
+
+        tenant = IndexedTenant(*row)
+        with self._lock:
+            part.add(tenant)
+        return True, tenant
+
+    # -----------------------
+    # Invalidation / warm-up
+    # -----------------------
+    def invalidate_owner(self, owner_id):
+        with self._lock:
+            self._owners.pop(owner_id, None)
+
+    def invalidate_codes(self):
+        with self._lock:
+            self._codes_loaded_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._codes = {}
+            self._codes_loaded_at = 0.0
+            self._owners.clear()
+
+    def warm(self):
+        """Load the code map and as many owner partitions as the cap allows (two queries)."""
+        self._load_codes()
+        owner_ids = (
+            db.session.query(Tenant.owner_id).distinct().limit(self._max_owners()).subquery()
+        )
+        rows = db.session.query(
+            Tenant.id, Tenant.owner_id, Tenant.name, Tenant.house_no, Tenant.phone
+        ).filter(Tenant.owner_id.in_(db.session.query(owner_ids.c.owner_id))).all()
+
+        parts = {}
+        for row in rows:
+            t = IndexedTenant(*row)
+            parts.setdefault(t.owner_id, _Partition()).add(t)
+        self._store_partitions(parts)
+        log.info("Tenant index warmed: %s codes, %s owners", len(self._codes), len(self._owners))
+
+
+tenant_index = TenantIndex()
+
+
+# -----------------------
+# Mapper events (same-process invalidation)
+# -----------------------
+def _on_tenant_write(mapper, connection, target):
+    tenant_index.invalidate_owner(target.owner_id)
+    # owner_id itself may have changed
+    hist = inspect(target).attrs.owner_id.history
+    for old in hist.deleted or ():
+        tenant_index.invalidate_owner(old)
+
+
+def _on_settings_write(mapper, connection, target):
+    tenant_index.invalidate_codes()
+
+
+_listeners_installed = False
+
+
+def init_tenant_index(app):
+    """Install invalidation hooks; with TENANT_INDEX_WARM_ON_START the first lookup warms the index."""
+    global _listeners_installed
+    if not _listeners_installed:
+        for ev in ("after_insert", "after_update", "after_delete"):
+            event.listen(Tenant, ev, _on_tenant_write)
+            event.listen(LandlordSettings, ev, _on_settings_write)
+        _listeners_installed = True
+
+    tenant_index._warm_pending = bool(app.config.get("TENANT_INDEX_WARM_ON_START"))
+
+
+def owner_for_code(code: str):
+    return tenant_index.owner_for_code(code)
+
+
+def find_tenant(owner_id, bill_ref: str):
+    return tenant_index.find_tenant(owner_id, bill_ref)
+
+
+def warm():
+    tenant_index.warm()
@@ -84,30 +84,32 @@ If you didn’t request this, ignore this email.
 — RentMe Team
 """
 
+    import requests
+    from rentme.metrics import timed_outbound, OUTBOUND_ERRORS
+
     try:
-        response = requests.post(
-            "https://mail-api.dev/api/send",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "from": email_from,
-                "to": to_email,
-                "subject": subject,
-                "text": body,
-            },
-            timeout=10,
-        )
-
-        # DEBUG: print response for troubleshooting
-        print(f"[DEBUG] status_code: {response.status_code}, response_text: {response.text}")
+        with timed_outbound("mail_api"):
+            response = requests.post(
+                "https://mail-api.dev/api/send",
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                },
+                json={
+                    "from": email_from,
+                    "to": to_email,
+                    "subject": subject,
+                    "text": body,
+                },
+                timeout=10,
+            )
 
         if response.status_code in (200, 202):
             log.info("Password reset email sent to %s", to_email)
             return True
 
         log.error("Mail API error %s: %s", response.status_code, response.text)
+        OUTBOUND_ERRORS.labels("mail_api").inc()
         return False
 
     except Exception as e:
@@ -115,82 +117,33 @@ If you didn’t request this, ignore this email.
         return False
 
 # ---------------------------------------------------------------------
-# Africa's Talking SMS (safe import inside function)
+# Immediate SMS (password reset codes). Bulk / receipt messages go through
+# the outbox in rentme/sms.py; both share the cached provider clients there.
 # ---------------------------------------------------------------------
 def send_sms_via_africastalking(phone_number: str, message: str) -> bool:
     """
-    Send an SMS via Africa's Talking.
-    Uses AFRICASTALKING_USERNAME and AFRICASTALKING_API_KEY from config.
-    Returns True if send succeeded (or SDK returned success), False otherwise.
+    Send an SMS via Africa's Talking right now.
+    Returns True if the provider accepted it, False otherwise.
     """
     if not current_app:
         log.error("current_app unavailable in send_sms_via_africastalking")
         return False
 
-    username = current_app.config.get("AFRICASTALKING_USERNAME")
-    api_key = current_app.config.get("AFRICASTALKING_API_KEY")
-
-    if not username or not api_key:
-        log.warning(
-            "AFRICASTALKING credentials not configured. SMS not sent. phone=%s message=%s",
-            phone_number,
-            (message[:120] + "...") if message and len(message) > 120 else message,
-        )
-        return False
-
-    # Import SDK lazily so missing dependency doesn't break app import-time
-    try:
-        # The SDK API differs across versions; handle both common patterns
-        import africastalking as at_sdk
-    except Exception as e:
-        log.exception("africastalking SDK not available: %s", e)
-        return False
-
-    try:
-        at = at_sdk.initialize(username=username, api_key=api_key)
-        sms = at.SMS
-        response = sms.send(message=message, to=[phone_number])
-        log.info("Africa's Talking SMS response: %s", response)
-        return True
-    except Exception as e:
-        log.exception("Failed to send SMS via Africa's Talking to %s: %s", phone_number, e)
-        return False
+    from rentme.sms import send_now
+    return send_now(phone_number, message, provider="africastalking")
 
 
-# ---------------------------------------------------------------------
-# Twilio support (optional). Use only if configured.
-# ---------------------------------------------------------------------
 def send_sms_via_twilio(phone_number: str, message: str) -> bool:
     """
-    Send SMS using Twilio if TWILIO_SID/TWILIO_TOKEN/TWILIO_FROM are set in config.
+    Send SMS using Twilio if TWILIO_SID/TWILIO_TOKEN/TWILIO_FROM are set.
     Returns True on success, False on failure.
     """
     if not current_app:
         log.error("current_app unavailable in send_sms_via_twilio")
         return False
 
-    sid = current_app.config.get("TWILIO_SID")
-    token = current_app.config.get("TWILIO_TOKEN")
-    sender = current_app.config.get("TWILIO_FROM")
-
-    if not sid or not token or not sender:
-        log.debug("Twilio not configured; skipping Twilio SMS.")
-        return False
-
-    try:
-        from twilio.rest import Client as TwilioClient
-    except Exception:
-        log.exception("twilio package not installed.")
-        return False
-
-    try:
-        client = TwilioClient(sid, token)
-        client.messages.create(body=message, from_=sender, to=phone_number)
-        log.info("Twilio SMS sent to %s", phone_number)
-        return True
-    except Exception as e:
-        log.exception("Failed to send SMS via Twilio to %s: %s", phone_number, e)
-        return False
+    from rentme.sms import send_now
+    return send_now(phone_number, message, provider="twilio")
 
 
 # ---------------------------------------------------------------------
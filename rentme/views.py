@@ -0,0 +1,1072 @@
+# rentme/views.py
+"""
+Web routes of the main app (dashboard, tenants, payments, reports, auth).
+
+Routes are collected on the `main` blueprint and registered by
+`rentme.factory.create_app()`. `route()` adds each view under its bare
+endpoint name ("dashboard", "tenant_list", ...), the names url_for() calls
+and templates have always used.
+"""
+
+import os
+import io
+import csv
+import json
+import random
+from datetime import datetime, date, timedelta
+from functools import wraps
+
+import pytz
+from flask import (
+    Blueprint, current_app, session, render_template, request, redirect, url_for,
+    flash, send_from_directory, jsonify, abort, Response
+)
+from flask_login import login_user, logout_user, login_required, current_user
+from flask_wtf.csrf import validate_csrf
+from werkzeug.security import generate_password_hash, check_password_hash
+from wtforms.validators import ValidationError
+from sqlalchemy import or_, func
+from sqlalchemy.orm import contains_eager, selectinload
+
+from rentme.extensions import db, limiter, login_manager
+from rentme.models import User, Tenant, Payment
+from rentme.forms import LoginForm, RegisterForm, ForgotPasswordForm, ResetPasswordForm, TenantForm
+from rentme.ledger import attach_balances, sync_tenant_charges
+from rentme.aging import BUCKETS as AGING_BUCKETS, aging_report, owner_totals, tenant_aging_map
+from rentme.audit import audit, audit_page
+from rentme.identity import load_identity, mark_session_start
+from rentme.ratelimit import route_limit
+from rentme.utils import send_sms_via_africastalking, send_reset_email, normalize_msisdn
+
+
+# -----------------------
+# Paths / timezone
+# -----------------------
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+APK_FOLDER = os.path.join(BASE_DIR, "static", "apk")
+
+NAIROBI_TZ = pytz.timezone("Africa/Nairobi")
+
+
+# -----------------------
+# Blueprint
+# -----------------------
+bp = Blueprint("main", __name__)
+
+
+def route(rule, **options):
+    """`app.route` for this module: registered on the app, endpoint unprefixed."""
+    def decorator(f):
+        endpoint = options.pop("endpoint", f.__name__)
+        bp.record_once(lambda state: state.app.add_url_rule(rule, endpoint, f, **options))
+        return f
+    return decorator
+
+
+# -----------------------
+# Login manager
+# -----------------------
+@login_manager.user_loader
+def load_user(user_id):
+    # Cached identity; sessions older than last_logout are rejected there
+    return load_identity(user_id)
+
+
+# -----------------------
+# Template filters
+# -----------------------
+@bp.app_template_filter("to_nairobi")
+def to_nairobi(dt):
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = pytz.utc.localize(dt)
+    return dt.astimezone(NAIROBI_TZ)
+
+
+# -----------------------
+# Decorators
+# -----------------------
+def ensure_apk_exists(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not os.path.isdir(APK_FOLDER):
+            flash("APK folder missing.", "danger")
+            return redirect(url_for("dashboard"))
+        apk_files = [f for f in os.listdir(APK_FOLDER) if f.lower().endswith(".apk")]
+        if not apk_files:
+            flash("No APK file found.", "warning")
+            return redirect(url_for("dashboard"))
+        kwargs["_apk_filename"] = apk_files[0]
+        return func(*args, **kwargs)
+    return wrapper
+
+def owner_required(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        tenant_id = (kwargs.get("tenant_id") 
+                     or request.view_args.get("tenant_id") 
+                     or request.form.get("tenant_id") 
+                     or request.args.get("tenant_id"))
+        if not tenant_id:
+            abort(400, description="Tenant ID missing.")
+        tenant = Tenant.query.get(int(tenant_id))
+        if not tenant:
+            abort(404, description="Tenant not found.")
+        if not current_user.is_authenticated:
+            return redirect(url_for("login", next=request.path))
+        if tenant.owner_id != current_user.id and not current_user.is_admin:
+            flash("No permission.", "danger")
+            return redirect(url_for("tenant_list"))
+        kwargs["_tenant_obj"] = tenant
+        return func(*args, **kwargs)
+    return wrapper
+
+# -----------------------
+# Routes
+# -----------------------
+@route("/register", methods=["GET", "POST"])
+@limiter.limit(route_limit("RATELIMIT_REGISTER"), methods=["POST"])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for("dashboard"))
+
+    form = RegisterForm()
+
+    if form.validate_on_submit():
+        email = form.email.data.strip().lower()
+        raw_phone = form.login_phone.data.strip() if form.login_phone.data else ""
+        phone = normalize_msisdn(raw_phone) if raw_phone else None
+
+        # 🔍 Check existing email
+        email_exists = User.query.filter_by(email=email).first()
+        if email_exists:
+            flash("Email already registered. Please login.", "warning")
+            return redirect(url_for("login"))
+
+        # 🔍 Check existing phone (only if provided & valid)
+        if phone:
+            phone_exists = User.query.filter_by(login_phone=phone).first()
+            if phone_exists:
+                flash("Phone number already registered. Please login.", "warning")
+                return redirect(url_for("login"))
+
+        # 🚨 Invalid phone provided
+        if raw_phone and not phone:
+            flash("Invalid phone number format.", "danger")
+            return redirect(url_for("register"))
+
+        # ✅ Create user
+        user = User(
+            full_name=form.full_name.data.strip(),
+            email=email,
+            login_phone=phone,
+            password_hash=generate_password_hash(form.password.data)
+        )
+
+        try:
+            db.session.add(user)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            flash("Registration failed. Please try again.", "danger")
+            return redirect(url_for("register"))
+
+        audit(
+            user,
+            "user_registered",
+            f"email:{user.email}, phone:{user.login_phone or '-'}"
+        )
+
+        flash("Registration successful! You can now login.", "success")
+        return redirect(url_for("login"))
+
+    return render_template("register.html", form=form)
+
+
+@route("/login", methods=["GET", "POST"])
+@limiter.limit(route_limit("RATELIMIT_LOGIN"), methods=["POST"])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for("dashboard"))
+
+    form = LoginForm()
+    if form.validate_on_submit():
+        identifier = form.identifier.data.strip()
+        password = form.password.data
+
+        # Try email first
+        user = User.query.filter_by(email=identifier.lower()).first()
+        # Then phone if not found
+        if not user:
+            user = User.query.filter_by(login_phone=identifier).first()
+
+        if not user or not user.check_password(password):
+            flash("Invalid credentials.", "danger")
+            return render_template("login.html", form=form)
+
+        login_user(user)
+        mark_session_start()
+        audit(user, "user_logged_in", f"id:{user.id}")
+        flash("Welcome back!", "success")
+        return redirect(request.args.get("next") or url_for("dashboard"))
+
+    return render_template("login.html", form=form)
+
+
+# -----------------------
+@route("/logout")
+@login_required
+def logout():
+    current_user.last_logout = datetime.utcnow()
+    db.session.commit()
+    logout_user()
+    flash("Logged out.", "info")
+    return redirect(url_for("login"))
+
+
+# -----------------------------------------------------
+# FORGOT PASSWORD
+# -----------------------------------------------------
+@route("/forgot-password", methods=["GET", "POST"])
+@limiter.limit(route_limit("RATELIMIT_FORGOT_PASSWORD"), methods=["POST"])
+def forgot_password():
+    form = ForgotPasswordForm()
+
+    if form.validate_on_submit():
+        value = form.email_or_phone.data.strip()
+
+        # Detect email or phone
+        if "@" in value:
+            user = User.query.filter_by(email=value.lower()).first()
+        else:
+            normalized = normalize_msisdn(value)
+            user = User.query.filter_by(login_phone=normalized).first()
+
+        if not user:
+            flash("No account found with that email or phone number.", "danger")
+            return redirect("/forgot-password")
+
+        # Generate reset code
+        code = str(random.randint(100000, 999999))
+        user.reset_code = code
+        user.reset_code_expires_at = datetime.utcnow() + timedelta(minutes=10)
+
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error saving reset code: {e}")
+            flash("Something went wrong. Try again.", "danger")
+            return redirect("/forgot-password")
+
+        # Try SMS first
+        sent_sms = send_sms_via_africastalking(user.login_phone, f"Your Rentana reset code is {code}")
+
+        # Fallback to email if SMS failed or credentials missing
+        if not sent_sms:
+            sent_email = send_reset_email(
+                user.email,
+                "Rentana Password Reset",
+                f"Your Rentana password reset code is {code}"
+            )
+            if sent_email:
+                flash("Reset code sent to your email.", "success")
+            else:
+                flash("Could not send reset code via SMS or email. Contact support.", "danger")
+        else:
+            flash("A reset code has been sent to your phone.", "success")
+
+        return redirect("/reset-password")
+
+    return render_template("forgot_password.html", form=form)
+
+# -----------------------------------------------------
+# RESET PASSWORD
+# -----------------------------------------------------
+@route("/reset-password", methods=["GET", "POST"])
+@limiter.limit(route_limit("RATELIMIT_RESET_PASSWORD"), methods=["POST"])
+def reset_password():
+    form = ResetPasswordForm()
+
+    if form.validate_on_submit():
+        identifier = form.identifier.data.strip()
+        code = form.code.data.strip()
+        password = form.password.data
+
+        # email or phone
+        if "@" in identifier:
+            user = User.query.filter_by(email=identifier.lower()).first()
+        else:
+            normalized = normalize_msisdn(identifier)
+            user = User.query.filter_by(login_phone=normalized).first()
+
+        if not user:
+            flash("Account not found.", "danger")
+            return render_template("reset_password.html", form=form)
+
+        now = datetime.utcnow()
+
+        # validate reset code
+        if user.reset_code != code:
+            flash("Invalid reset code.", "danger")
+            return render_template("reset_password.html", form=form)
+
+        if not user.reset_code_expires_at or user.reset_code_expires_at < now:
+            flash("Reset code expired.", "danger")
+            return render_template("reset_password.html", form=form)
+
+        # set new password
+        user.set_password(password)
+        user.reset_code = None
+        user.reset_code_expires_at = None
+        db.session.commit()
+
+        flash("Password changed successfully.", "success")
+        return redirect(url_for("login"))
+
+    return render_template("reset_password.html", form=form)
+
+
+# ✅ Helper Functions
+# =====================================
+#DUPLICATEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEEE
+##3def process_payment(phone, amount, receipt, note="")
+
+#manifesss
+
+@route("/manifest.json")
+def manifest():
+    return send_from_directory('static', 'manifest.json', mimetype='application/manifest+json')
+
+
+# Optional: health check
+# ----------------------
+@route("/webhook/health", methods=["GET"])
+def health_check():
+    return jsonify({"status": "ok", "message": "Webhook is alive"}), 200
+
+# ----------------------
+# Optional: simulate a test payment (offline)
+
+
+# -----------------------
+# -----------------------
+# Dashboard
+
+@route("/")
+@login_required
+def dashboard():
+    """Render landlord dashboard."""
+    return render_template("dashboard.html")
+
+
+@route("/dashboard_data")
+@login_required
+def dashboard_data():
+    """
+    Return live dashboard data as JSON:
+      - Tenant details
+      - Totals: expected, collected, outstanding
+      - Collected percentage
+    """
+
+    # 🧭 Get all tenants for this landlord (ledger totals in two grouped queries)
+    tenants = attach_balances(
+        Tenant.query
+        .filter_by(owner_id=current_user.id)
+        .order_by(Tenant.name)
+        .all(),
+        owner_id=current_user.id,
+    )
+
+    # 💰 Compute totals (based on real tenant data)
+    total_expected = sum(t.total_charged() for t in tenants)
+    total_collected = sum(t.total_paid() for t in tenants)
+
+    # Outstanding (cannot be negative even if tenant overpaid)
+    total_outstanding = round(max(total_expected - total_collected, 0), 2)
+
+    # Collection %
+    collected_percent = (
+        round((total_collected / total_expected * 100), 2)
+        if total_expected else 0.0
+    )
+
+    # 🏠 Prepare tenant info for dashboard table
+    tenants_list = []
+    for t in tenants:
+        paid = t.total_paid()
+        due = t.total_charged()
+        balance = paid - due
+
+        tenants_list.append({
+            "id": t.id,
+            "name": t.name,
+            "phone": t.phone,
+            "house_no": t.house_no,
+            "monthly_rent": float(t.monthly_rent or 0),
+            "total_paid": float(paid),
+            "total_due": float(due),
+            "balance": float(balance),
+            "formatted_balance": f"{balance:,.2f}",
+        })
+
+    # ⏳ Arrears aging (one aggregate over the landlord's rollup rows)
+    aging = owner_totals(current_user.id)
+
+    # 📤 Return dashboard stats + tenants
+    return jsonify({
+        "total_tenants": len(tenants),
+        "total_expected": round(total_expected, 2),
+        "total_collected": round(total_collected, 2),
+        "total_outstanding": total_outstanding,
+        "collected_percent": collected_percent,
+        "aging": {b: aging[b] for b in AGING_BUCKETS},
+        "tenants": tenants_list
+    })
+
+
+#payment type
+# -----------------------
+
+
+# Tenants CRUD
+# ----------------------
+
+@route("/tenants")
+@login_required
+def tenant_list():
+    q = request.args.get("q", "", type=str).strip()
+    page = request.args.get("page", 1, type=int)
+    per_page = 20
+
+    query = Tenant.query.filter(
+        Tenant.owner_id == current_user.id
+    )
+
+    # 🔎 Case-insensitive search
+    if q:
+        search = f"%{q.lower()}%"
+        query = query.filter(
+            or_(
+                func.lower(Tenant.name).like(search),
+                func.lower(Tenant.phone).like(search),
+                func.lower(Tenant.house_no).like(search),
+            )
+        )
+
+    pagination = query.order_by(
+        Tenant.house_no.asc()
+    ).paginate(
+        page=page,
+        per_page=per_page,
+        error_out=False
+    )
+
+    attach_balances(pagination.items)
+
+    # ⚡ AJAX response
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        rows_html = render_template(
+            "_tenant_rows.html",
+            tenants=pagination.items
+        )
+        pagination_html = render_template(
+            "_tenant_pagination.html",
+            pagination=pagination,
+            query=q
+        )
+        return jsonify({
+            "rows": rows_html,
+            "pagination": pagination_html
+        })
+
+    # 🧱 Normal page load
+    return render_template(
+        "tenant_list.html",
+        tenants=pagination.items,
+        pagination=pagination,
+        query=q
+    )
+
+
+@route("/tenant/add", methods=["GET", "POST"])
+@login_required
+def tenant_add():
+    form = TenantForm()
+
+    if form.validate_on_submit():
+        try:
+            move_in = form.move_in_date.data or str(date.today())
+            t = Tenant(
+                owner_id=current_user.id,
+                name=form.name.data.strip(),
+                phone=form.phone.data.strip(),
+                national_id=form.national_id.data.strip(),
+                house_no=form.house_no.data.strip(),
+                monthly_rent=float(form.monthly_rent.data),
+                move_in_date=datetime.strptime(move_in, "%Y-%m-%d").date()
+            )
+        except Exception:
+            flash("Invalid tenant data.", "danger")
+            return render_template("add_tenant.html", form=form)
+
+        db.session.add(t)
+        db.session.flush()
+        sync_tenant_charges(t)
+        db.session.commit()
+        audit(current_user, "tenant_added", meta=f"id:{t.id}")
+        flash("Tenant added.", "success")
+        return redirect(url_for("dashboard"))
+
+    return render_template("add_tenant.html", form=form)
+
+
+# ---------- EDIT TENANT ----------
+@route("/tenant/<int:tenant_id>/edit", methods=["GET", "POST"])
+@login_required
+@owner_required
+def tenant_edit(tenant_id, _tenant_obj=None):
+
+    # Ensure tenant object exists
+    t = _tenant_obj or Tenant.query.get_or_404(tenant_id)
+
+    if request.method == "POST":
+
+        # Validate CSRF
+        try:
+            validate_csrf(request.form.get("csrf_token"))
+        except ValidationError:
+            flash("Invalid or missing CSRF token. Please refresh the page.", "danger")
+            return render_template("edit_tenants.html", tenant=t)
+
+        # Update fields
+        t.name = (request.form.get("name") or "").strip()
+        t.phone = (request.form.get("phone") or "").strip()
+        t.national_id = (request.form.get("national_id") or "").strip()
+        t.house_no = (request.form.get("house_no") or "").strip()
+
+        try:
+            t.monthly_rent = float(request.form.get("monthly_rent") or t.monthly_rent)
+        except ValueError:
+            flash("Monthly rent must be a valid number.", "danger")
+            return render_template("edit_tenants.html", tenant=t)
+
+        # Move-in date
+        move_in = request.form.get("move_in_date") or str(t.move_in_date)
+        try:
+            t.move_in_date = datetime.strptime(move_in, "%Y-%m-%d").date()
+        except ValueError:
+            flash("Move-in date must be in format YYYY-MM-DD.", "danger")
+            return render_template("edit_tenants.html", tenant=t)
+
+        sync_tenant_charges(t)
+        db.session.commit()
+        audit(current_user, "tenant_edited", meta=f"id:{t.id}")
+
+        flash("Tenant updated successfully!", "success")
+        return redirect(url_for("tenant_list"))
+
+    return render_template("edit_tenants.html", tenant=t)
+
+
+# ---------- DELETE TENANT ----------
+@route("/tenant/<int:tenant_id>/delete", methods=["POST"])
+@login_required
+@owner_required
+def tenant_delete(tenant_id, _tenant_obj=None):
+
+    # Lookup object if decorator didn't inject it
+    t = _tenant_obj or Tenant.query.get_or_404(tenant_id)
+
+    # Validate CSRF
+    try:
+        validate_csrf(request.form.get("csrf_token"))
+    except ValidationError:
+        flash("Invalid or missing CSRF token. Try again.", "danger")
+        return redirect(url_for("tenant_list"))
+
+    db.session.delete(t)
+    db.session.commit()
+
+    audit(current_user, "tenant_deleted", meta=f"id:{tenant_id}")
+    flash("Tenant deleted successfully!", "info")
+
+    return redirect(url_for("tenant_list"))
+
+
+# ---------- BULK DELETE ----------
+# -----------------------
+@route("/tenants/bulk-delete", methods=["POST"])
+@login_required
+def tenant_bulk_delete():
+
+    # Validate CSRF
+    try:
+        validate_csrf(request.form.get("csrf_token"))
+    except ValidationError:
+        flash("Invalid CSRF token. Bulk delete cancelled.", "danger")
+        return redirect(url_for("tenant_list"))
+
+    ids = request.form.getlist("tenant_ids")
+
+    if not ids:
+        flash("No tenants selected.", "warning")
+        return redirect(url_for("tenant_list"))
+
+    # Children loaded up front: the delete cascade would fetch them per tenant
+    q = Tenant.query.options(
+        selectinload(Tenant.payments), selectinload(Tenant.charges)
+    ).filter(Tenant.id.in_(ids))
+
+    if not current_user.is_admin:
+        q = q.filter(Tenant.owner_id == current_user.id)
+
+    tenants = q.all()
+    count = len(tenants)
+
+    if count == 0:
+        flash("No tenants found or permission denied.", "warning")
+        return redirect(url_for("tenant_list"))
+
+    try:
+        for tenant in tenants:
+            db.session.delete(tenant)
+
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Bulk tenant delete failed")
+        flash("Bulk delete failed. No changes were made.", "danger")
+        return redirect(url_for("tenant_list"))
+
+    # Audit AFTER successful commit only
+    audit(
+        current_user,
+        "tenants_bulk_deleted",
+        meta=f"count={count}, ids={','.join(ids)}",
+    )
+
+    flash(f"{count} tenant(s) deleted successfully.", "success")
+    return redirect(url_for("tenant_list"))
+# -----------------------
+# Payments CRUD
+# -----------------------
+@route("/payment/add", methods=["GET", "POST"], endpoint="payment_add")
+@login_required
+@owner_required
+def payment_add(_tenant_obj=None, tenant_id=None):
+    tenant = _tenant_obj
+
+    # 🧩 SAFETY: Always resolve tenant if not injected
+    if tenant is None:
+        # Try URL kwarg first (from /payment/add?tenant_id=X or route param)
+        tid = tenant_id or request.args.get("tenant_id") or request.form.get("tenant_id")
+        if tid:
+            try:
+                tid_int = int(tid)
+            except ValueError:
+                tid_int = None
+            if tid_int:
+                tenant = Tenant.query.filter_by(id=tid_int, owner_id=current_user.id).first()
+
+    # If still no tenant → redirect
+    if tenant is None:
+        flash("Bad request: Tenant not found or missing tenant ID.", "danger")
+        return redirect(url_for("tenant_list"))
+
+    if request.method == "POST":
+        # 🔐 1) Get password from form (filled by popup / modal JS)
+        password = (request.form.get("password_confirm") or "").strip()
+
+        if not password:
+            flash("Password confirmation is required to add a payment.", "danger")
+            return render_template("add_payment.html", tenant=tenant)
+
+        # 🔐 2) Verify user password using your User model method
+        try:
+            is_valid = current_user.check_password(password)
+        except AttributeError:
+            # Fallback if your User model doesn't have check_password()
+            from werkzeug.security import check_password_hash
+            is_valid = check_password_hash(current_user.password_hash, password)
+
+        if not is_valid:
+            flash("Incorrect password. Payment was not added.", "danger")
+            return render_template("add_payment.html", tenant=tenant)
+
+        # ✅ 3) Validate amount
+        try:
+            amount = float(request.form.get("amount") or 0)
+        except ValueError:
+            flash("Amount must be a number.", "danger")
+            return render_template("add_payment.html", tenant=tenant)
+
+        if amount <= 0:
+            flash("Amount must be greater than zero.", "danger")
+            return render_template("add_payment.html", tenant=tenant)
+
+        note = (request.form.get("note") or "").strip()
+
+        # ✅ 4) Auto-generate unique transaction ID
+        import uuid
+        transaction_id = request.form.get("transaction_id")
+        if not transaction_id or transaction_id.strip() == "":
+            transaction_id = f"MANUAL-{uuid.uuid4().hex[:8].upper()}"
+
+        from datetime import datetime
+        p = Payment(
+            tenant_id=tenant.id,
+            amount=amount,
+            note=note,
+            transaction_id=transaction_id,
+            paid_at=datetime.utcnow()
+        )
+
+        # ✅ 5) Commit safely
+        try:
+            db.session.add(p)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[ERROR] Payment commit failed: {e}")
+            flash("Error: Payment could not be saved. Please try again.", "danger")
+            return render_template("add_payment.html", tenant=tenant)
+
+        # ✅ 6) Audit log
+        audit(
+            current_user,
+            "payment_added",
+            meta=f"payment_id:{p.id}, tenant_id:{tenant.id}, transaction_id:{transaction_id}"
+        )
+
+        flash(f"✅ Payment recorded successfully — Amount: {amount}, ID: {transaction_id}", "success")
+        return redirect(url_for("dashboard"))
+
+    # GET
+    return render_template("add_payment.html", tenant=tenant)
+
+
+@route("/payment/<int:payment_id>/edit", methods=["GET", "POST"])
+@login_required
+def payment_edit(payment_id):
+    p = Payment.query.get_or_404(payment_id)
+    if p.tenant.owner_id != current_user.id and not current_user.is_admin:
+        flash("Not authorized.", "danger")
+        return redirect(url_for("tenant_list"))
+    if request.method == "POST":
+        try:
+            p.amount = float(request.form.get("amount") or p.amount)
+        except ValueError:
+            flash("Amount must be a number.", "danger")
+            return render_template("payment_edit.html", payment=p)
+        p.note = request.form.get("note") or ""
+        db.session.commit()
+        audit(current_user, "payment_edited", meta=f"id:{p.id}")
+        flash("Payment updated.", "success")
+        return redirect(url_for("dashboard"))
+    return render_template("payment_edit.html", payment=p)
+
+
+@route("/payments")
+@login_required
+def payment_list():
+    payments = (Payment.query.join(Tenant)
+                .options(contains_eager(Payment.tenant))
+                .filter(Tenant.owner_id == current_user.id)
+                .order_by(Payment.paid_at.desc())
+                .all())
+    return render_template("payment_list.html", payments=payments)
+
+
+# Bulk pay
+@route('/bulk_pay', methods=['POST'])
+@login_required
+def bulk_pay():
+    tenant_ids = request.form.getlist('tenant_ids')
+    amount_raw = request.form.get('amount')
+    if not tenant_ids or not amount_raw:
+        flash("Tenant(s) or amount missing.", "warning")
+        return redirect(url_for("tenant_list"))
+    try:
+        amount = float(amount_raw)
+    except ValueError:
+        flash("Invalid amount.", "danger")
+        return redirect(url_for("tenant_list"))
+    try:
+        ids = {int(tid) for tid in tenant_ids}
+    except ValueError:
+        flash("Invalid tenant selection.", "danger")
+        return redirect(url_for("tenant_list"))
+
+    import uuid
+    from rentme.aging import refresh_tenants
+    from rentme.collection_stats import add_payment_deltas
+
+    q = db.session.query(Tenant.id).filter(Tenant.id.in_(ids))
+    if not current_user.is_admin:
+        q = q.filter(Tenant.owner_id == current_user.id)
+    paid_at = datetime.utcnow()
+    rows = [
+        {"tenant_id": tid, "amount": amount, "note": "Bulk payment", "paid_at": paid_at,
+         "transaction_id": f"BULK-{uuid.uuid4().hex[:8].upper()}"}
+        for (tid,) in q.all()
+    ]
+    created = len(rows)
+    if rows:
+        # One multi-row INSERT; it skips the Payment mapper hooks, so refresh the rollups here
+        db.session.execute(Payment.__table__.insert(), rows)
+        refresh_tenants([r["tenant_id"] for r in rows])
+        period = paid_at.date().replace(day=1)
+        add_payment_deltas({(r["tenant_id"], period): [amount, 1] for r in rows})
+    db.session.commit()
+    audit(current_user, "bulk_pay", meta=f"ids:{','.join(tenant_ids)},amount:{amount}")
+    flash(f"Bulk payments created for {created} tenant(s).", "success")
+    return redirect(url_for("dashboard"))
+
+
+# -----------------------
+# Exports
+# -----------------------
+def make_csv_response(csv_text: str, filename="export.csv"):
+    return Response(csv_text, mimetype="text/csv",
+                    headers={"Content-disposition": f"attachment; filename={filename}"})
+
+
+@route("/export/tenants.csv")
+@login_required
+def export_tenants_csv():
+    base_q = Tenant.query
+    if not current_user.is_admin:
+        base_q = base_q.filter_by(owner_id=current_user.id)
+    si = io.StringIO()
+    cw = csv.writer(si)
+    cw.writerow(["id","name","phone","national_id","house_no","monthly_rent","move_in_date","total_paid","total_due","balance",
+                 *AGING_BUCKETS])
+    tenants = base_q.order_by(Tenant.name).all()
+    owner_filter = None if current_user.is_admin else current_user.id
+    attach_balances(tenants, owner_id=owner_filter)
+    aging = tenant_aging_map(owner_id=owner_filter)
+    for t in tenants:
+        a = aging.get(t.id)
+        cw.writerow([
+            t.id, t.name, t.phone, t.national_id, t.house_no,
+            f"{t.monthly_rent:.2f}", t.move_in_date.isoformat(),
+            f"{t.total_paid():.2f}", f"{t.total_charged():.2f}", f"{t.balance:.2f}",
+            *(f"{getattr(a, b) if a else 0.0:.2f}" for b in AGING_BUCKETS),
+        ])
+    return make_csv_response(si.getvalue(), "tenants_export.csv")
+
+
+# -----------------------
+# Month-close reports (snapshot reads only)
+# -----------------------
+def _period_arg(default=None):
+    raw = request.args.get("period")
+    if not raw:
+        return default
+    try:
+        return datetime.strptime(raw, "%Y-%m").date()
+    except ValueError:
+        abort(400, description="period must be YYYY-MM")
+
+
+@route("/reports/month-close")
+@login_required
+def report_month_close():
+    from rentme.month_close import month_report, previous_period
+
+    period = _period_arg(previous_period())
+    report = month_report(current_user.id, period)
+    if report is None:
+        return jsonify({"error": "Month not closed yet", "period": period.strftime("%Y-%m")}), 404
+    return jsonify(report)
+
+
+@route("/reports/aging")
+@login_required
+def report_aging():
+    """Arrears by age bucket with the top tenants in each (rollup reads only)."""
+    top = min(max(request.args.get("top", 5, type=int), 1), 50)
+    return jsonify(aging_report(current_user.id, top=top))
+
+
+@route("/reports/collections")
+@login_required
+def report_collections():
+    """Collected vs expected per month for the chart (one rollup read)."""
+    from rentme.collection_stats import collections_series
+
+    months = min(max(request.args.get("months", 24, type=int), 1), 60)
+    return jsonify({"months": collections_series(current_user.id, months=months)})
+
+
+@route("/tenant/<int:tenant_id>/statement")
+@login_required
+@owner_required
+def tenant_statement_view(tenant_id, _tenant_obj=None):
+    from rentme.month_close import tenant_statement
+
+    year = request.args.get("year", date.today().year, type=int)
+    return jsonify({
+        "tenant_id": tenant_id,
+        "year": year,
+        "months": tenant_statement(tenant_id, year),
+    })
+
+
+@route("/audit")
+@login_required
+def audit_view():
+    """Audit trail, newest first, keyset-paginated (?before=<cursor>)."""
+    user_id = current_user.id
+    if current_user.is_admin:
+        user_id = request.args.get("user_id", type=int)
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 200)
+    try:
+        rows, next_cursor = audit_page(user_id=user_id, before=request.args.get("before"), limit=limit)
+    except ValueError:
+        abort(400, description="bad cursor")
+
+    if request.args.get("format") == "json":
+        return jsonify({
+            "events": [
+                {"id": r.id, "user_id": r.user_id, "action": r.action, "meta": r.meta,
+                 "created_at": r.created_at.isoformat()}
+                for r in rows
+            ],
+            "next": next_cursor,
+        })
+    return render_template("audit_log.html", events=rows, next_cursor=next_cursor, user_id=user_id)
+
+
+@route("/admin/jobs")
+@login_required
+def admin_jobs():
+    """Recent scheduled job runs with durations (admin only)."""
+    if not current_user.is_admin:
+        abort(403)
+    from rentme.scheduler import job_stats
+
+    return jsonify({"jobs": job_stats(limit=request.args.get("limit", 20, type=int))})
+
+
+#daraja register
+
+@route("/register_daraja", methods=["POST"])
+def register_daraja():
+    env = request.form.get("env", "sandbox")
+    key = request.form.get("consumer_key")
+    secret = request.form.get("consumer_secret")
+    shortcode = request.form.get("shortcode")
+    callback = request.form.get("callback_url")
+
+    # Pulls in requests; only needed for this one admin action
+    from register_daraja_live import register_urls
+
+    base_url = "https://api.safaricom.co.ke" if env == "live" else "https://sandbox.safaricom.co.ke"
+    result = register_urls(env.upper(), base_url, key, secret, shortcode, callback, live=(env == "live"))
+    return jsonify(result)
+
+
+@route("/export/payments.csv")
+@login_required
+def export_payments_csv():
+    base_q = Payment.query.join(Tenant).options(contains_eager(Payment.tenant))
+    if not current_user.is_admin:
+        base_q = base_q.filter(Tenant.owner_id == current_user.id)
+    si = io.StringIO()
+    cw = csv.writer(si)
+    cw.writerow(["id","tenant_id","tenant_name","amount","note","paid_at"])
+    for p in base_q.order_by(Payment.paid_at.desc()).all():
+        cw.writerow([p.id, p.tenant_id, p.tenant.name, f"{p.amount:.2f}", p.note or "", p.paid_at.isoformat()])
+    return make_csv_response(si.getvalue(), "payments_export.csv")
+
+
+# -----------------------
+# APK & PWA
+# -----------------------
+@route("/apk/download")
+@login_required
+@ensure_apk_exists
+def apk_download(_apk_filename=None):
+    return send_from_directory(APK_FOLDER, _apk_filename, as_attachment=True)
+
+
+@route("/apk/latest")
+@login_required
+@ensure_apk_exists
+def apk_latest(_apk_filename=None):
+    return jsonify({"filename": _apk_filename, "url": url_for("apk_download")})
+
+
+@route("/service-worker.js")
+def service_worker():
+    return send_from_directory(current_app.static_folder, "service-worker.js")
+
+
+# -----------------------
+# Context processors / errors
+# -----------------------
+
+@bp.app_context_processor
+def inject_now():
+    now = datetime.now(NAIROBI_TZ)
+    return {
+        "current_year": now.year,
+        "today": now.date(),
+        "date": date,
+        "datetime": datetime,
+    }
+
+
+@bp.app_errorhandler(403)
+def forbidden(e):
+    return render_template("error.html", code=403, message="Forbidden"), 403
+
+
+@bp.app_errorhandler(404)
+def not_found(e):
+    return render_template("error.html", code=404, message="Not Found"), 404
+
+
+@bp.app_errorhandler(500)
+def server_error(e):
+    current_app.logger.exception("Internal Server Error", exc_info=e)
+    return render_template("error.html", code=500, message="Server Error"), 500
+
+
+# -----------------------
+# Compatibility / Aliases
+# -----------------------
+
+@route("/add_tenant")
+@login_required
+def add_tenant_alias():
+    return redirect(url_for("tenant_add"))
+
+
+@route("/edit_tenant/<int:tenant_id>")
+@login_required
+def edit_tenant_alias(tenant_id):
+    return redirect(url_for("tenant_edit", tenant_id=tenant_id))
+
+
+@route("/add_payment")
+@login_required
+def add_payment_alias():
+    tenant_id = request.args.get("tenant_id")
+    if tenant_id:
+        return redirect(url_for("payment_add", tenant_id=tenant_id))
+    return redirect(url_for("payment_list"))
+
+
+@route("/payment/edit-redirect")
+@login_required
+def payment_edit_redirect():
+    return redirect(url_for("payment_list"))
+
+
+# -----------------------
@@ -1,17 +1,66 @@
 """
 Background worker for Rentana
-Runs scheduled jobs ONLY ONCE (safe for production)
+- Runs the periodic jobs in rentme/scheduler.py (persistent, with catch-up)
+- Drains the M-Pesa confirmation inbox (MPESA_INGEST_MODE=queue)
+- Delivers the SMS outbox, in its own thread: a batch held back by the SMS
+  rate limit must not delay payment confirmations
 """
 
-from rentme.app import create_app
+import os
+import time
+import logging
+import threading
+
+from rentme.factory import create_app
+from rentme.mpesa_queue import drain_callbacks
+from rentme.sms import drain_sms_outbox, sms_metrics
 from rentme.scheduler import start_scheduler
+from rentme.metrics import start_worker_metrics
+
+logger = logging.getLogger("rentme.worker")
+
+# Seconds to sleep when the inbox is empty
+POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", 1.0))
+# Seconds between SMS throughput / latency log lines
+METRICS_INTERVAL = float(os.getenv("WORKER_METRICS_INTERVAL", 60))
+
+# No web setup (blueprints, CSRF, login, limiter): the worker serves no requests
+app = create_app(web=False)
+
+
+def run_consumer(drain, on_idle=None):
+    """Call `drain` forever; sleeps only when it found nothing to do."""
+    while True:
+        handled = 0
+        try:
+            with app.app_context():
+                handled = drain()
+        except Exception:
+            logger.exception("%s iteration failed", drain.__name__)
+        if on_idle is not None:
+            on_idle()
+        if not handled:
+            time.sleep(POLL_INTERVAL)
+
+
+def _sms_metrics_logger():
+    last = [time.monotonic()]
+
+    def log_metrics():
+        if time.monotonic() - last[0] >= METRICS_INTERVAL:
+            last[0] = time.monotonic()
+            for provider, m in sms_metrics().items():
+                logger.info("SMS metrics", extra={"provider": provider, **m})
+    return log_metrics
 
-app = create_app()
 
 if __name__ == "__main__":
-    start_scheduler()
+    start_worker_metrics(app)
+    start_scheduler(app)
+
+    threading.Thread(
+        target=run_consumer, args=(drain_sms_outbox, _sms_metrics_logger()), name="sms-outbox", daemon=True,
+    ).start()
 
     # Keep process alive
-    import time
-    while True:
-        time.sleep(60)
+    run_consumer(drain_callbacks)